@@ -1,11 +1,17 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 from .database import get_db
@@ -20,27 +26,194 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# How long a resolved user is reused before `users` is queried again.
+# Set to 0 to look the user up on every request.
+#
+# The cache is per process. A change to a user (deactivation, losing admin
+# rights) invalidates it right away in the worker that made the change, and
+# in the other workers when the `users` change notification reaches them
+# over the PostgreSQL change bus (app.change_bus). Without the bus (another
+# database, CHANGE_BUS_ENABLED=false, or while its connection is down) other
+# workers keep honouring the old principal for up to this many seconds.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+
+# Password hashing. Raising BCRYPT_ROUNDS makes existing hashes "deprecated";
+# they are transparently rehashed at the new cost on the user's next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# Worker threads reserved for bcrypt. Each hash or verify costs ~250 ms of CPU,
+# so this caps how many cores a burst of logins can take from the rest of the API.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token")
 
+@dataclass(frozen=True)
+class UserPrincipal:
+    """The authenticated user as seen by route handlers."""
+    id: int
+    username: str
+    is_active: bool
+    is_admin: bool
+
+class PrincipalCache:
+    """Short-lived, thread-safe cache of user principals keyed by token subject."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, UserPrincipal]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, subject: str) -> Optional[UserPrincipal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[subject]
+            self.misses += 1
+            return None
+
+    def put(self, subject: str, principal: UserPrincipal):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, principal)
+
+    def invalidate(self, subject: Optional[str] = None, user_id: Optional[int] = None):
+        """Drop cached entries for a token subject and/or a user id."""
+        with self._lock:
+            for key, (_, principal) in list(self._entries.items()):
+                if key == subject or (user_id is not None and principal.id == user_id):
+                    del self._entries[key]
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "ttl_seconds": self.ttl_seconds,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+user_cache = PrincipalCache(AUTH_CACHE_TTL_SECONDS)
+
+def load_principal(db: Session, username: str) -> Optional[UserPrincipal]:
+    """Resolve a token subject to a principal, using the cache when possible."""
+    principal = user_cache.get(username)
+    if principal is not None:
+        return principal
+    row = db.query(User.id, User.username, User.is_active, User.is_admin).filter(
+        User.username == username
+    ).first()
+    if row is None:
+        return None
+    principal = UserPrincipal(id=row.id, username=row.username, is_active=bool(row.is_active), is_admin=bool(row.is_admin))
+    user_cache.put(username, principal)
+    return principal
+
+class PasswordHasher:
+    """Bounded thread pool that runs all bcrypt work off the event loop.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism
+    without the pickling overhead of a process pool. Work beyond the pool size
+    waits in the executor queue; its depth is tracked for diagnostics.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="freelims-bcrypt")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+
+    def _run(self, func, args):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def submit(self, func, *args):
+        with self._lock:
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        return self._executor.submit(self._run, func, args)
+
+    async def run(self, func, *args):
+        """Run `func` in the pool and await the result from a coroutine."""
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    def run_sync(self, func, *args):
+        """Run `func` in the pool and block the calling (worker) thread for the result."""
+        return self.submit(func, *args).result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "queue_depth": self.queued,
+                "max_queue_depth": self.max_queue_depth,
+                "running": self.running,
+                "completed": self.completed,
+            }
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS)
+
 def verify_password(plain_password, hashed_password):
     """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.run_sync(pwd_context.verify, plain_password, hashed_password)
 
 def get_password_hash(password):
     """Generate a password hash."""
-    return pwd_context.hash(password)
+    return password_hasher.run_sync(pwd_context.hash, password)
 
-def authenticate_user(db: Session, username: str, password: str):
-    """Authenticate a user by username and password."""
-    user = db.query(User).filter(User.username == username).first()
+def _get_user_by_username(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
+
+def _store_password_hash(db: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+    db.refresh(user)
+
+async def authenticate_user(db: Session, username: str, password: str):
+    """Authenticate a user by username and password.
+
+    Database access runs in the worker thread pool and bcrypt in the password
+    hasher pool, so the event loop stays free while logins are checked. Hashes
+    made with outdated settings are upgraded on a successful login.
+    """
+    user = await run_in_threadpool(_get_user_by_username, db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hasher.run(pwd_context.verify_and_update, password, user.hashed_password)
+    if not valid:
         return False
+    if new_hash:
+        await run_in_threadpool(_store_password_hash, db, user, new_hash)
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -54,8 +227,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get the current user from the JWT token."""
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """Get the current user principal from the JWT token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -69,18 +242,29 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = load_principal(db, token_data.username)
     if user is None:
         raise credentials_exception
     return user
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+def admin_principal_from_token(db: Session, token: str) -> Optional[UserPrincipal]:
+    """The principal of a bearer token if it belongs to an active admin, else None."""
+    try:
+        username = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+    principal = load_principal(db, username) if username else None
+    if principal is None or not principal.is_active or not principal.is_admin:
+        return None
+    return principal
+
+async def get_current_active_user(current_user: UserPrincipal = Depends(get_current_user)):
     """Get the current active user."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-async def get_current_admin_user(current_user: User = Depends(get_current_active_user)):
+async def get_current_admin_user(current_user: UserPrincipal = Depends(get_current_active_user)):
     """Get the current admin user."""
     if not current_user.is_admin:
         raise HTTPException(
@@ -0,0 +1,176 @@
+"""
+Cross-worker change fan-out over PostgreSQL LISTEN/NOTIFY.
+
+Statement triggers on the main tables (see the `batch_change_notifications`
+migration) send a small JSON payload on `CHANGE_CHANNEL` for every insert,
+update and delete statement, with the ids of the rows it touched in chunks
+of `NOTIFY_IDS_PER_PAYLOAD`, whichever process made the change: any uvicorn
+worker, or a maintenance script such as `add_analyst.py`. Each worker holds one
+dedicated listening connection, watched with `loop.add_reader`, and relays
+the payloads into its notification dispatcher and from there to the
+Socket.IO rooms of the clients connected to that worker.
+
+Changes to `users` also drop the affected principals from this worker's
+authentication cache, so a deactivation or demotion made on another worker
+takes effect immediately.
+
+While the listener is connected, the dispatcher ignores in-process
+publishes, since the trigger already covers them. If the connection drops,
+in-process publishing resumes until the listener reconnects.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Optional
+
+import psycopg2
+import psycopg2.extensions
+from sqlalchemy import text
+
+from .auth import user_cache
+from .database import engine
+from .notifications import dispatcher as default_dispatcher
+
+logger = logging.getLogger(__name__)
+
+# Must match the channel used by the freelims_notify_change() trigger function
+CHANGE_CHANNEL = "freelims_changes"
+CHANGE_BUS_ENABLED = os.getenv("CHANGE_BUS_ENABLED", "true").lower() in ("1", "true", "yes")
+CHANGE_BUS_RECONNECT_SECONDS = float(os.getenv("CHANGE_BUS_RECONNECT_SECONDS", "5"))
+# Keeps each payload well below PostgreSQL's 8000 byte NOTIFY limit; the
+# trigger function uses the same chunk size
+NOTIFY_IDS_PER_PAYLOAD = 500
+
+def publish_in_transaction(db, resource, action, ids, channel=CHANGE_CHANNEL):
+    """Queue change notifications that PostgreSQL delivers to every worker when `db` commits.
+
+    For events that do not touch a table with a notify trigger, such as
+    items passing their expiration date. Ids are sent in chunks, all in one
+    statement.
+    """
+    ids = list(ids)
+    payloads = [
+        json.dumps({"resource": resource, "action": action, "ids": ids[start:start + NOTIFY_IDS_PER_PAYLOAD]})
+        for start in range(0, len(ids), NOTIFY_IDS_PER_PAYLOAD)
+    ]
+    if payloads:
+        db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": channel, "payloads": payloads},
+        )
+
+class ChangeListener:
+    """LISTEN on the change channel and relay notifications to the dispatcher."""
+
+    def __init__(self, bind=engine, dispatcher=default_dispatcher, channel=CHANGE_CHANNEL,
+                 reconnect_seconds=CHANGE_BUS_RECONNECT_SECONDS):
+        self.bind = bind
+        self.dispatcher = dispatcher
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self.connection = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return self.connection is not None
+
+    async def start(self) -> bool:
+        """Start listening if the database supports it. Returns whether the bus is active."""
+        if not CHANGE_BUS_ENABLED or self.bind.dialect.name != "postgresql":
+            return False
+        self._loop = asyncio.get_running_loop()
+        try:
+            await self._connect()
+        except Exception as exc:
+            logger.warning("Change bus unavailable, notifying in-process only: %s", exc)
+            self._schedule_reconnect()
+        return self.active
+
+    async def stop(self):
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        self._close()
+        self._loop = None
+
+    async def _connect(self):
+        connection = await self._loop.run_in_executor(None, self._open_connection)
+        if connection is None:
+            return False
+        self.connection = connection
+        self._loop.add_reader(connection.fileno(), self._on_readable)
+        self.dispatcher.bus_active = True
+        logger.info("Listening for database changes on %s", self.channel)
+        return True
+
+    def _open_connection(self):
+        """Open the dedicated LISTEN connection (runs in a worker thread)."""
+        dsn = self.bind.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        connection = psycopg2.connect(dsn, keepalives=1, keepalives_idle=30)
+        connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_proc WHERE proname = 'freelims_notify_change'")
+            if cursor.fetchone() is None:
+                # Without the triggers nothing would ever be published
+                logger.warning("Change notify triggers are not installed; run the database migrations")
+                connection.close()
+                return None
+            cursor.execute(f"LISTEN {self.channel}")
+        return connection
+
+    def _on_readable(self):
+        try:
+            self.connection.poll()
+        except psycopg2.Error as exc:
+            logger.warning("Change bus connection lost: %s", exc)
+            self._close()
+            self._schedule_reconnect()
+            return
+        while self.connection.notifies:
+            self.relay(self.connection.notifies.pop(0).payload)
+
+    def relay(self, payload: str):
+        """Forward one NOTIFY payload to the local dispatcher (and the user cache)."""
+        try:
+            change = json.loads(payload)
+            # "id" is the single-row payload of the original per-row triggers
+            ids = change["ids"] if "ids" in change else [change["id"]]
+            if not isinstance(ids, list):
+                raise TypeError("ids is not a list")
+            if change["resource"] == "users":
+                for user_id in ids:
+                    user_cache.invalidate(user_id=user_id)
+            self.dispatcher.relay(change["resource"], change["action"], ids)
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed change notification: %r", payload)
+
+    def _close(self):
+        self.dispatcher.bus_active = False
+        connection, self.connection = self.connection, None
+        if connection is None:
+            return
+        try:
+            if self._loop and not self._loop.is_closed():
+                self._loop.remove_reader(connection.fileno())
+            connection.close()
+        except Exception:
+            pass
+
+    def _schedule_reconnect(self):
+        if self._loop and (self._reconnect_task is None or self._reconnect_task.done()):
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while self._loop and not self.active:
+            await asyncio.sleep(self.reconnect_seconds)
+            try:
+                if not await self._connect():
+                    return
+            except Exception as exc:
+                logger.warning("Change bus reconnect failed: %s", exc)
+
+listener = ChangeListener()
@@ -1,7 +1,13 @@
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+import anyio.to_thread
+import bisect
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -15,9 +21,97 @@ DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
 DB_SCHEMA_PATH = os.getenv("DB_SCHEMA_PATH", "/Users/Shared/SDrive/freelims_db")
 
+# Number of worker threads available for blocking database work. Route handlers
+# are plain `def` functions, so FastAPI runs them (and their `get_db` sessions)
+# in this thread pool instead of on the event loop.
+DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", "40"))
+
+# Connection pool settings. pool_size + max_overflow is the most connections
+# a single worker process will open; keep it below PostgreSQL's max_connections
+# divided by the number of uvicorn workers.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Upper bounds (milliseconds) of the pool wait time histogram buckets
+POOL_WAIT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+class PoolMetrics:
+    """Thread-safe counters for connection checkouts and how long they waited."""
+
+    def __init__(self, buckets_ms=POOL_WAIT_BUCKETS_MS):
+        self.buckets_ms = list(buckets_ms)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            # One extra bucket for waits above the largest bound (+Inf)
+            self.wait_counts = [0] * (len(self.buckets_ms) + 1)
+
+    def observe_wait(self, seconds, timed_out=False):
+        index = bisect.bisect_left(self.buckets_ms, seconds * 1000)
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self.wait_counts[index] += 1
+
+    def snapshot(self):
+        with self._lock:
+            observed = self.checkouts + self.timeouts
+            bounds = self.buckets_ms + ["+Inf"]
+            return {
+                "checkouts_total": self.checkouts,
+                "timeouts_total": self.timeouts,
+                "wait_ms_avg": round(self.wait_seconds_total * 1000 / observed, 3) if observed else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_histogram_ms": [
+                    {"le": bound, "count": count} for bound, count in zip(bounds, self.wait_counts)
+                ],
+            }
+
+pool_metrics = PoolMetrics()
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        # Kept for get_pool_status; QueuePool only stores it privately
+        self.max_overflow = max_overflow
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            pool_metrics.observe_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.observe_wait(time.perf_counter() - start)
+        return connection
+
 # Create SQLAlchemy engine
 SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=MeteredQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -25,6 +119,32 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create Base class
 Base = declarative_base()
 
+def configure_db_threadpool():
+    """Size the worker thread pool used for synchronous route handlers.
+
+    Must be called from inside the running event loop (e.g. the app lifespan),
+    since anyio keeps one default thread limiter per loop.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = DB_THREADPOOL_SIZE
+    return limiter
+
+def get_pool_status(bind=None):
+    """Live connection pool statistics for the health and diagnostics endpoints."""
+    pool = (bind or engine).pool
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "max_overflow": getattr(pool, "max_overflow", None),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "timeout_seconds": pool.timeout(),
+        })
+    status.update(pool_metrics.snapshot())
+    return status
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
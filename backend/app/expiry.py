@@ -0,0 +1,160 @@
+"""
+Expiring inventory: indexed lookups and a background sweeper.
+
+`expiring_items` answers "what expires in the next 30 days" with a range
+scan on the `inventory_items.expiration_date` index.
+
+The sweeper runs inside the API process (started from the FastAPI
+lifespan) every `EXPIRY_SWEEP_INTERVAL_SECONDS`. It keeps two high-water
+marks in `expiry_sweep_state`: how far ahead items have been reported as
+expiring, and up to when they have been reported as expired. Each sweep
+only reads the index range between the stored mark and now (or now plus
+the warning window), so old rows are never rescanned.
+
+The marks only cover time passing. Items created, imported or edited since
+the previous sweep with an expiration date behind the marks (already
+expired, or inside the warning window) are looked up by their
+`created_at`/`updated_at` instead, using the delta sync indexes. Such an
+item that was already reported, e.g. one whose quantity changed, is
+reported again, which clients treat as a refresh. Each sweep reports what
+it found as one batched `inventory` notification with `expiring` and
+`expired` ids. The state row is locked while sweeping, so with several
+workers each sweep's findings are reported once.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import anyio.to_thread
+from sqlalchemy import or_
+
+from .change_bus import publish_in_transaction
+from .database import SessionLocal
+from .ledger import as_utc
+from .models import ExpirySweepState, InventoryItem
+from .notifications import dispatcher as default_dispatcher
+
+logger = logging.getLogger(__name__)
+
+EXPIRY_SWEEP_INTERVAL_SECONDS = float(os.getenv("EXPIRY_SWEEP_INTERVAL_SECONDS", "3600"))
+# Items are reported as expiring this many days before their expiration date
+EXPIRY_WARNING_DAYS = float(os.getenv("EXPIRY_WARNING_DAYS", "30"))
+
+_STATE_ID = 1
+_WINDOW_UNITS = {"h": "hours", "d": "days", "w": "weeks"}
+
+def parse_window(value) -> timedelta:
+    """Parse a window such as "30d", "12h" or "2w"; a bare number means days."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([hdw]?)\s*", str(value or "").lower())
+    if not match:
+        raise ValueError(f"Invalid time window: {value!r}")
+    amount, unit = match.groups()
+    return timedelta(**{_WINDOW_UNITS[unit or "d"]: float(amount)})
+
+def expiring_items(db, within: timedelta, include_expired=True, now=None):
+    """Query for items expiring within `within` from now (unordered)."""
+    now = now or datetime.utcnow()
+    query = db.query(InventoryItem).filter(InventoryItem.expiration_date <= now + within)
+    if not include_expired:
+        query = query.filter(InventoryItem.expiration_date > now)
+    return query
+
+def _ids_between(db, after, through):
+    query = db.query(InventoryItem.id).filter(InventoryItem.expiration_date <= through)
+    if after is not None:
+        query = query.filter(InventoryItem.expiration_date > after)
+    return [row.id for row in query.order_by(InventoryItem.expiration_date, InventoryItem.id)]
+
+def _changed_since(db, since, through):
+    """(id, expiration_date) of items created or edited after `since` that expire by `through`."""
+    return db.query(InventoryItem.id, InventoryItem.expiration_date).filter(
+        or_(InventoryItem.created_at > since, InventoryItem.updated_at > since),
+        InventoryItem.expiration_date <= through,
+    ).order_by(InventoryItem.expiration_date, InventoryItem.id).all()
+
+class ExpirySweeper:
+    """Periodically report items that started expiring or expired since the last sweep."""
+
+    def __init__(self, session_factory=SessionLocal, dispatcher=default_dispatcher,
+                 interval_seconds=EXPIRY_SWEEP_INTERVAL_SECONDS, warning_days=EXPIRY_WARNING_DAYS):
+        self.session_factory = session_factory
+        self.dispatcher = dispatcher
+        self.interval_seconds = interval_seconds
+        self.warning = timedelta(days=warning_days)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sweeping on the running event loop. A zero interval disables the sweeper."""
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await anyio.to_thread.run_sync(self.sweep)
+            except Exception:
+                logger.exception("Expiry sweep failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def sweep(self, now=None) -> Dict[str, List[int]]:
+        """Advance the high-water marks and notify about the items in between."""
+        # created_at/updated_at and swept_at are timestamptz, so compare them
+        # with an aware time; expiration dates and the marks are naive UTC
+        swept_at = as_utc(now)
+        now = swept_at.replace(tzinfo=None)
+        db = self.session_factory()
+        try:
+            state = db.query(ExpirySweepState).filter(
+                ExpirySweepState.id == _STATE_ID
+            ).with_for_update().first()
+            if state is None:
+                state = ExpirySweepState(id=_STATE_ID)
+                db.add(state)
+
+            found = {"expiring": {}, "expired": {}}
+            expiring_through = now + self.warning
+            if state.expiring_through is None or expiring_through > state.expiring_through:
+                found["expiring"].update(dict.fromkeys(
+                    _ids_between(db, max(state.expiring_through or now, now), expiring_through)
+                ))
+                state.expiring_through = expiring_through
+            if state.expired_through is None or now > state.expired_through:
+                found["expired"].update(dict.fromkeys(_ids_between(db, state.expired_through, now)))
+                state.expired_through = now
+            if state.swept_at is not None:
+                # Added or edited behind the marks since the previous sweep
+                for item_id, expiration_date in _changed_since(db, as_utc(state.swept_at), expiring_through):
+                    found["expired" if expiration_date <= now else "expiring"][item_id] = None
+            state.swept_at = swept_at
+            found = {action: list(ids) for action, ids in found.items() if ids}
+
+            if found and self.dispatcher.bus_active:
+                # Delivered to every worker by PostgreSQL once the marks commit
+                for action, ids in found.items():
+                    publish_in_transaction(db, "inventory", action, ids)
+            db.commit()
+        finally:
+            db.close()
+
+        if found and not self.dispatcher.bus_active:
+            # Published together, so clients receive one batched message
+            for action, ids in found.items():
+                self.dispatcher.publish("inventory", action, ids)
+        if found:
+            logger.info("Expiry sweep: %s", {action: len(ids) for action, ids in found.items()})
+        return found
+
+sweeper = ExpirySweeper()
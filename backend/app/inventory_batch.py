@@ -0,0 +1,137 @@
+"""
+Batch inventory consumption, e.g. every reagent used by one experiment.
+
+A batch is all-or-nothing. Every line is validated up front: the items are
+loaded with one IN query (with their chemicals, for unit conversion), the
+experiment is checked once, and the quantities each item would end up with
+are computed from the sum of its lines. If any line is invalid the whole
+batch is rejected with a per-line error list and nothing is written.
+
+Otherwise each affected item gets one atomic quantity update (see
+`app.stock.adjust_item_quantity`), the InventoryChange and audit rows are
+written with multi-row INSERTs, and everything is committed together.
+"""
+
+from collections import defaultdict
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+
+from .models import (
+    Experiment as ExperimentModel,
+    InventoryAudit as InventoryAuditModel,
+    InventoryChange as InventoryChangeModel,
+    InventoryItem as InventoryItemModel,
+)
+from .stock import adjust_item_quantity
+from .units import UnitConversionError, convert
+
+def _rejected(errors):
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail={"message": "Inventory change batch rejected", "errors": errors},
+    )
+
+def apply_change_batch(db, user_id, batch):
+    """Validate and apply an InventoryChangeBatchCreate. Returns the per-line results."""
+    if batch.experiment_id is not None:
+        experiment = db.query(ExperimentModel.id).filter(ExperimentModel.id == batch.experiment_id).first()
+        if experiment is None:
+            raise HTTPException(status_code=404, detail="Experiment not found")
+
+    item_ids = {line.inventory_item_id for line in batch.lines}
+    items = {
+        item.id: item
+        for item in db.query(InventoryItemModel)
+        .options(joinedload(InventoryItemModel.chemical))
+        .filter(InventoryItemModel.id.in_(item_ids))
+    }
+
+    errors = []
+    amounts = []  # change amount of each line, in its item's unit
+    totals = defaultdict(float)
+    for number, line in enumerate(batch.lines):
+        item = items.get(line.inventory_item_id)
+        if item is None:
+            errors.append({"line": number, "error": "Inventory item not found"})
+            amounts.append(None)
+            continue
+        amount = line.change_amount
+        if line.unit:
+            chemical = item.chemical
+            try:
+                amount = convert(
+                    line.change_amount, line.unit, item.unit,
+                    density=chemical.density if chemical else None,
+                    molecular_weight=chemical.molecular_weight if chemical else None,
+                )
+            except UnitConversionError as exc:
+                errors.append({"line": number, "error": str(exc)})
+                amounts.append(None)
+                continue
+        amounts.append(amount)
+        totals[item.id] += amount
+
+    for number, line in enumerate(batch.lines):
+        item = items.get(line.inventory_item_id)
+        if item is not None and amounts[number] is not None and (item.quantity or 0) + totals[item.id] < 0:
+            errors.append({"line": number, "error": "Inventory quantity cannot be negative"})
+    if errors:
+        raise _rejected(sorted(errors, key=lambda error: error["line"]))
+
+    # One atomic update per item; a concurrent change that would now take an
+    # item below zero aborts the whole batch
+    running = {}
+    try:
+        for item_id in sorted(totals):
+            old_quantity, _ = adjust_item_quantity(db, item_id, totals[item_id], items[item_id].unit)
+            running[item_id] = old_quantity
+    except HTTPException as exc:
+        db.rollback()
+        raise _rejected([
+            {"line": number, "error": exc.detail}
+            for number, line in enumerate(batch.lines) if line.inventory_item_id == item_id
+        ])
+
+    results = []
+    for number, line in enumerate(batch.lines):
+        old_quantity = running[line.inventory_item_id]
+        running[line.inventory_item_id] = old_quantity + amounts[number]
+        results.append({
+            "line": number,
+            "inventory_item_id": line.inventory_item_id,
+            "change_amount": amounts[number],
+            "old_quantity": old_quantity,
+            "new_quantity": running[line.inventory_item_id],
+        })
+
+    change_ids = db.execute(
+        insert(InventoryChangeModel).returning(InventoryChangeModel.id, sort_by_parameter_order=True),
+        [
+            {
+                "inventory_item_id": line.inventory_item_id,
+                "user_id": user_id,
+                "change_amount": result["change_amount"],
+                "reason": line.reason or batch.reason,
+                "experiment_id": batch.experiment_id,
+            }
+            for line, result in zip(batch.lines, results)
+        ],
+    ).scalars().all()
+    db.execute(insert(InventoryAuditModel), [
+        {
+            "inventory_item_id": result["inventory_item_id"],
+            "user_id": user_id,
+            "field_name": "quantity",
+            "old_value": str(result["old_quantity"]),
+            "new_value": str(result["new_quantity"]),
+            "action": "UPDATE",
+        }
+        for result in results
+    ])
+    db.commit()
+
+    for result, change_id in zip(results, change_ids):
+        result["change_id"] = change_id
+    return results
@@ -0,0 +1,271 @@
+"""
+Bulk inventory import from CSV or XLSX uploads.
+
+Rows are streamed from the upload and processed in batches: every batch
+resolves its chemicals (by CAS number) and locations (by name) with one IN
+query each, then inserts the inventory items, their initial InventoryChange
+rows and their CREATE audit rows with multi-row INSERTs. Each batch is
+committed on its own, so a bad row only costs that row, and the caller gets
+a per-row error report at the end.
+
+Expected columns (header names are case-insensitive):
+    cas_number, location, quantity, unit, batch_number, expiration_date
+"""
+
+import codecs
+import csv
+import io
+import math
+import os
+import zipfile
+from datetime import date, datetime
+
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import (
+    Chemical as ChemicalModel,
+    InventoryAudit as InventoryAuditModel,
+    InventoryChange as InventoryChangeModel,
+    InventoryItem as InventoryItemModel,
+    Location as LocationModel,
+)
+from .stock import apply_stock_deltas, canonical_columns, item_deltas
+
+IMPORT_BATCH_SIZE = int(os.getenv("INVENTORY_IMPORT_BATCH_SIZE", "1000"))
+REQUIRED_COLUMNS = ("cas_number", "location", "quantity", "unit")
+OPTIONAL_COLUMNS = ("batch_number", "expiration_date")
+
+class RowError(ValueError):
+    """A row that cannot be imported; the message goes into the error report."""
+
+def _normalize_header(name):
+    return str(name or "").strip().lower().replace(" ", "_")
+
+def _check_encoding(upload: UploadFile):
+    """Reject a CSV that is not UTF-8 before any of its rows are imported."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        for chunk in iter(lambda: upload.file.read(64 * 1024), b""):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV file is not UTF-8 encoded; save it as \"CSV UTF-8\" and upload it again"
+        )
+    upload.file.seek(0)
+
+def _iter_csv(upload: UploadFile):
+    _check_encoding(upload)
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    yield [_normalize_header(name) for name in header]
+    for values in reader:
+        yield values
+
+def _iter_xlsx(upload: UploadFile):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="XLSX import requires the openpyxl package; upload a CSV file instead"
+        )
+    try:
+        workbook = load_workbook(upload.file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError):
+        # Not a zip archive, or one without the parts of a workbook
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is not a valid XLSX workbook"
+        )
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield [_normalize_header(name) for name in header]
+        for values in rows:
+            yield list(values)
+    finally:
+        workbook.close()
+
+def iter_upload_rows(upload: UploadFile):
+    """Yield (row_number, {column: value}) for each data row of the upload.
+
+    Row numbers match what a spreadsheet shows, so the header is row 1.
+    """
+    filename = (upload.filename or "").lower()
+    is_xlsx = filename.endswith(".xlsx") or (upload.content_type or "").endswith("spreadsheetml.sheet")
+    rows = _iter_xlsx(upload) if is_xlsx else _iter_csv(upload)
+
+    header = next(rows, None)
+    if header is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty")
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Missing required columns: {', '.join(missing)}"
+        )
+
+    for row_number, values in enumerate(rows, start=2):
+        if not any(value not in (None, "") for value in values):
+            continue  # Skip blank lines
+        yield row_number, dict(zip(header, values))
+
+def _text(value):
+    if value is None:
+        return ""
+    return str(value).strip()
+
+def _parse_expiration(value):
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        return datetime.fromisoformat(_text(value))
+    except ValueError:
+        raise RowError(f"Invalid expiration_date '{value}', expected YYYY-MM-DD")
+
+def parse_row(row):
+    """Validate one row and return the cleaned values, or raise RowError."""
+    cleaned = {column: _text(row.get(column)) for column in REQUIRED_COLUMNS}
+    for column in REQUIRED_COLUMNS:
+        if not cleaned[column]:
+            raise RowError(f"Missing {column}")
+    try:
+        cleaned["quantity"] = float(cleaned["quantity"])
+    except ValueError:
+        raise RowError(f"Invalid quantity '{cleaned['quantity']}'")
+    if not math.isfinite(cleaned["quantity"]):
+        raise RowError(f"Invalid quantity '{row.get('quantity')}'")
+    if cleaned["quantity"] < 0:
+        raise RowError("Quantity cannot be negative")
+    cleaned["batch_number"] = _text(row.get("batch_number")) or None
+    cleaned["expiration_date"] = _parse_expiration(row.get("expiration_date"))
+    return cleaned
+
+class InventoryImporter:
+    """Imports parsed rows in batches on behalf of one user."""
+
+    def __init__(self, db, user_id, batch_size=None):
+        self.db = db
+        self.user_id = user_id
+        self.batch_size = batch_size or IMPORT_BATCH_SIZE
+        self.chemicals = {}  # cas_number -> (id, name)
+        self.locations = {}  # name -> id
+        self.total_rows = 0
+        self.item_ids = []
+        self.errors = []
+
+    def run(self, rows):
+        """Import every (row_number, row) pair and return the report."""
+        batch = []
+        for row_number, row in rows:
+            self.total_rows += 1
+            try:
+                batch.append((row_number, parse_row(row)))
+            except RowError as exc:
+                self.errors.append({"row": row_number, "error": str(exc)})
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch)
+                batch = []
+        if batch:
+            self._import_batch(batch)
+        return {
+            "total_rows": self.total_rows,
+            "imported": len(self.item_ids),
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+        }
+
+    def _resolve(self, batch):
+        """Load any chemicals and locations in the batch that are not cached yet."""
+        cas_numbers = {row["cas_number"] for _, row in batch} - set(self.chemicals)
+        if cas_numbers:
+            for chemical_id, cas_number, name in self.db.query(
+                ChemicalModel.id, ChemicalModel.cas_number, ChemicalModel.name
+            ).filter(ChemicalModel.cas_number.in_(cas_numbers)):
+                self.chemicals[cas_number] = (chemical_id, name)
+
+        names = {row["location"] for _, row in batch} - set(self.locations)
+        if names:
+            for location_id, name in self.db.query(
+                LocationModel.id, LocationModel.name
+            ).filter(LocationModel.name.in_(names)):
+                self.locations[name] = location_id
+
+    def _import_batch(self, batch):
+        self._resolve(batch)
+
+        valid = []
+        for row_number, row in batch:
+            if row["cas_number"] not in self.chemicals:
+                self.errors.append({"row": row_number, "error": f"Chemical with CAS number {row['cas_number']} not found"})
+            elif row["location"] not in self.locations:
+                self.errors.append({"row": row_number, "error": f"Location '{row['location']}' not found"})
+            else:
+                valid.append((row_number, row))
+        if not valid:
+            return
+
+        items = [
+            {
+                "chemical_id": self.chemicals[row["cas_number"]][0],
+                "location_id": self.locations[row["location"]],
+                "quantity": row["quantity"],
+                "unit": row["unit"],
+                "batch_number": row["batch_number"],
+                "expiration_date": row["expiration_date"],
+                **canonical_columns(row["quantity"], row["unit"]),
+            }
+            for _, row in valid
+        ]
+        try:
+            item_ids = self.db.execute(
+                insert(InventoryItemModel).returning(InventoryItemModel.id, sort_by_parameter_order=True),
+                items,
+            ).scalars().all()
+
+            self.db.execute(insert(InventoryChangeModel), [
+                {
+                    "inventory_item_id": item_id,
+                    "user_id": self.user_id,
+                    "change_amount": row["quantity"],
+                    "reason": "Bulk import",
+                }
+                for item_id, (_, row) in zip(item_ids, valid)
+            ])
+            self.db.execute(insert(InventoryAuditModel), [
+                {
+                    "inventory_item_id": item_id,
+                    "user_id": self.user_id,
+                    "field_name": "all",
+                    "old_value": "",
+                    "new_value": (
+                        f"Chemical: {self.chemicals[row['cas_number']][1]}, Location: {row['location']}, "
+                        f"Quantity: {row['quantity']}, Unit: {row['unit']}, Batch: {row['batch_number']}"
+                    ),
+                    "action": "CREATE",
+                }
+                for item_id, (_, row) in zip(item_ids, valid)
+            ])
+            # Core inserts bypass the ORM flush hook that maintains stock_levels
+            apply_stock_deltas(self.db, item_deltas(items))
+            self.db.commit()
+        except SQLAlchemyError as exc:
+            self.db.rollback()
+            message = f"Batch rejected by the database: {exc.__class__.__name__}"
+            self.errors.extend({"row": row_number, "error": message} for row_number, _ in valid)
+            return
+
+        self.item_ids.extend(item_ids)
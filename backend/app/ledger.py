@@ -0,0 +1,185 @@
+"""
+Inventory ledger: item balances at any point in time.
+
+`inventory_changes` is an append-only ledger. Every write of an item's
+quantity (creation, import, manual update, consumption, batches) appends
+the delta in the same transaction, so the sum of an item's changes up to a
+time is its balance at that time, in the item's unit. `InventoryItem.quantity`
+is the cached head of that ledger.
+
+Summing the whole history gets slower as the ledger grows, so balances are
+checkpointed in `inventory_balance_snapshots`. A balance "as of" a time is
+the latest snapshot at or before it plus the changes between the two,
+which is at most one snapshot interval of rows, read from the
+`(inventory_item_id, timestamp)` index. Snapshots are only written for
+items that changed since their previous one.
+
+The snapshotter runs inside the API process (started from the FastAPI
+lifespan) every `LEDGER_SNAPSHOT_INTERVAL_SECONDS`. It checkpoints
+`LEDGER_SNAPSHOT_DELAY_SECONDS` in the past: change timestamps are set when
+their transaction starts, so a snapshot taken right up to now could miss a
+change still being committed. Several workers may each take snapshots;
+extra checkpoints are harmless.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import anyio.to_thread
+from sqlalchemy import and_, func, insert, or_, select
+
+from .database import SessionLocal
+from .models import InventoryBalanceSnapshot, InventoryChange, InventoryItem
+
+logger = logging.getLogger(__name__)
+
+LEDGER_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("LEDGER_SNAPSHOT_INTERVAL_SECONDS", "86400"))
+LEDGER_SNAPSHOT_DELAY_SECONDS = float(os.getenv("LEDGER_SNAPSHOT_DELAY_SECONDS", "300"))
+
+def as_utc(at=None):
+    """`at` (default now) as an aware UTC datetime; naive values are taken to be UTC."""
+    if at is None:
+        return datetime.now(timezone.utc)
+    if at.tzinfo is None:
+        return at.replace(tzinfo=timezone.utc)
+    return at.astimezone(timezone.utc)
+
+def _filtered(stmt, column, item_ids):
+    return stmt if item_ids is None else stmt.where(column.in_(item_ids))
+
+def balances_at(db, at, item_ids=None, chemical_id=None, location_id=None):
+    """Balances of inventory items as of `at`.
+
+    Returns rows with the item's id, chemical_id, location_id and unit, the
+    snapshot used (`snapshot_at`, `snapshot_quantity`, both None if there was
+    none), the `tail` delta and `tail_changes` count read after it, and the
+    resulting `quantity`. Items without any change by `at` are left out.
+    """
+    at = as_utc(at)
+    snapshots = InventoryBalanceSnapshot
+    latest = _filtered(
+        select(snapshots.inventory_item_id, func.max(snapshots.taken_at).label("taken_at"))
+        .where(snapshots.taken_at <= at),
+        snapshots.inventory_item_id, item_ids,
+    ).group_by(snapshots.inventory_item_id).subquery()
+    snapshot = (
+        select(snapshots.inventory_item_id, snapshots.taken_at, snapshots.quantity)
+        .join(latest, and_(
+            snapshots.inventory_item_id == latest.c.inventory_item_id,
+            snapshots.taken_at == latest.c.taken_at,
+        ))
+        .subquery()
+    )
+    tail = _filtered(
+        select(
+            InventoryChange.inventory_item_id,
+            func.sum(InventoryChange.change_amount).label("delta"),
+            func.count(InventoryChange.id).label("changes"),
+        )
+        .outerjoin(snapshot, snapshot.c.inventory_item_id == InventoryChange.inventory_item_id)
+        .where(
+            InventoryChange.timestamp <= at,
+            or_(snapshot.c.taken_at.is_(None), InventoryChange.timestamp > snapshot.c.taken_at),
+        ),
+        InventoryChange.inventory_item_id, item_ids,
+    ).group_by(InventoryChange.inventory_item_id).subquery()
+
+    query = (
+        db.query(
+            InventoryItem.id,
+            InventoryItem.chemical_id,
+            InventoryItem.location_id,
+            InventoryItem.unit,
+            snapshot.c.taken_at.label("snapshot_at"),
+            snapshot.c.quantity.label("snapshot_quantity"),
+            tail.c.delta,
+            tail.c.changes,
+        )
+        .outerjoin(snapshot, snapshot.c.inventory_item_id == InventoryItem.id)
+        .outerjoin(tail, tail.c.inventory_item_id == InventoryItem.id)
+        .filter(or_(snapshot.c.taken_at.isnot(None), tail.c.changes.isnot(None)))
+    )
+    if item_ids is not None:
+        query = query.filter(InventoryItem.id.in_(item_ids))
+    if chemical_id:
+        query = query.filter(InventoryItem.chemical_id == chemical_id)
+    if location_id:
+        query = query.filter(InventoryItem.location_id == location_id)
+
+    return [
+        {
+            "inventory_item_id": row.id,
+            "chemical_id": row.chemical_id,
+            "location_id": row.location_id,
+            "unit": row.unit,
+            "at": at,
+            "quantity": (row.snapshot_quantity or 0.0) + (row.delta or 0.0),
+            "snapshot_at": row.snapshot_at,
+            "tail_changes": row.changes or 0,
+        }
+        for row in query.order_by(InventoryItem.id)
+    ]
+
+def balance_at(db, item_id, at):
+    """Balance of one item as of `at`, or None if the item had no changes by then."""
+    rows = balances_at(db, at, item_ids=[item_id])
+    return rows[0] if rows else None
+
+def take_snapshots(db, at):
+    """Checkpoint the balance as of `at` of every item that changed since its last snapshot."""
+    rows = [row for row in balances_at(db, at) if row["tail_changes"]]
+    if rows:
+        db.execute(insert(InventoryBalanceSnapshot), [
+            {"inventory_item_id": row["inventory_item_id"], "taken_at": row["at"], "quantity": row["quantity"]}
+            for row in rows
+        ])
+    db.commit()
+    return len(rows)
+
+class LedgerSnapshotter:
+    """Periodically checkpoint inventory balances."""
+
+    def __init__(self, session_factory=SessionLocal, interval_seconds=LEDGER_SNAPSHOT_INTERVAL_SECONDS,
+                 delay_seconds=LEDGER_SNAPSHOT_DELAY_SECONDS):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.delay = timedelta(seconds=delay_seconds)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start snapshotting on the running event loop. A zero interval disables the snapshotter."""
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await anyio.to_thread.run_sync(self.snapshot)
+            except Exception:
+                logger.exception("Ledger snapshot failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def snapshot(self, now=None) -> int:
+        """Checkpoint balances as of `now` minus the delay. Returns the number of snapshots."""
+        db = self.session_factory()
+        try:
+            count = take_snapshots(db, as_utc(now) - self.delay)
+        finally:
+            db.close()
+        if count:
+            logger.info("Ledger snapshot: %d items", count)
+        return count
+
+snapshotter = LedgerSnapshotter()
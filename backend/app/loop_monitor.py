@@ -0,0 +1,182 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A task started from the FastAPI lifespan sleeps for
+`LOOP_LAG_INTERVAL_MS` at a time and measures how much later than
+requested it woke up. The difference is how long the loop was busy or
+blocked, and is recorded in the `freelims_event_loop_lag_seconds`
+histogram.
+
+Lag alone does not say what blocked the loop, and by the time the loop
+runs again the culprit has returned. A watchdog thread therefore checks
+the task's wake-up deadline; once the loop is `LOOP_BLOCK_THRESHOLD_MS`
+late it captures the stack of the event-loop thread while it is still
+blocked. The stack is attributed to the route handler in it (matched
+against the app's routes) and to the innermost frame in the `app`
+package, e.g. `auth.py:authenticate_user`. When the loop resumes, the
+measured lag is charged to that call site, a warning with the stack is
+logged, and the worst call sites are kept for
+`GET /api/diagnostics/event-loop`.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+from .metrics import event_loop_lag
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "500"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+# Distinct blocking call sites kept for the diagnostics endpoint
+LOOP_BLOCK_SITES = 50
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class LoopLagMonitor:
+    """Periodically measure event-loop scheduling lag and find what blocks the loop."""
+
+    def __init__(self, interval_seconds=LOOP_LAG_INTERVAL_MS / 1000,
+                 threshold_seconds=LOOP_BLOCK_THRESHOLD_MS / 1000, max_sites=LOOP_BLOCK_SITES):
+        self.interval_seconds = interval_seconds
+        self.threshold_seconds = threshold_seconds
+        self.max_sites = max_sites
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._loop_thread_id: Optional[int] = None
+        # time.monotonic() by which the loop should have woken up, None while not sleeping
+        self._deadline: Optional[float] = None
+        self._capture: Optional[dict] = None
+        self._handlers: Dict[object, tuple] = {}
+        self._sites: Dict[tuple, dict] = {}
+
+    def register_routes(self, app):
+        """Learn which code objects are route handlers, to name them in reports."""
+        for route in getattr(app, "routes", ()):
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(inspect.unwrap(endpoint), "__code__", None) if endpoint else None
+            if code is not None:
+                self._handlers[code] = (getattr(route, "path", ""), endpoint.__name__)
+
+    def start(self, app=None):
+        """Start measuring on the running event loop. A zero interval disables the monitor."""
+        if self.interval_seconds <= 0 or self._task is not None:
+            return
+        if app is not None:
+            self.register_routes(app)
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        if self.threshold_seconds > 0:
+            self._stopping.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval_seconds
+            self._deadline = time.monotonic() + self.interval_seconds + self.threshold_seconds
+            await asyncio.sleep(self.interval_seconds)
+            self._deadline = None
+            self.record(max(loop.time() - expected, 0.0))
+
+    def _watch(self):
+        poll = max(self.threshold_seconds / 2, 0.005)
+        while not self._stopping.wait(poll):
+            deadline = self._deadline
+            if deadline is not None and self._capture is None and time.monotonic() > deadline:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._capture = self.describe(frame)
+
+    def describe(self, frame):
+        """Route, handler, innermost app call site and formatted stack of `frame`."""
+        stack = traceback.extract_stack(frame)
+        route = handler = site = None
+        current = frame
+        while current is not None and route is None:
+            if current.f_code in self._handlers:
+                route, handler = self._handlers[current.f_code]
+            current = current.f_back
+        for entry in reversed(stack):
+            if os.path.abspath(entry.filename).startswith(_APP_DIR + os.sep) and entry.filename != __file__:
+                site = f"{os.path.relpath(entry.filename, _APP_DIR)}:{entry.lineno} {entry.name}"
+                break
+        return {
+            "route": route,
+            "handler": handler,
+            "site": site or f"{stack[-1].filename}:{stack[-1].lineno} {stack[-1].name}",
+            "stack": "".join(traceback.format_list(stack)),
+        }
+
+    def record(self, lag):
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        event_loop_lag.observe(lag)
+        capture, self._capture = self._capture, None
+        if capture is not None and lag >= self.threshold_seconds:
+            self._record_blocking(capture, lag)
+
+    def _record_blocking(self, capture, lag):
+        logger.warning(
+            "Event loop blocked for %.0f ms in %s (route %s, handler %s)\n%s",
+            lag * 1000, capture["site"], capture["route"], capture["handler"], capture["stack"],
+        )
+        key = (capture["route"], capture["handler"], capture["site"])
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                if len(self._sites) >= self.max_sites:
+                    # Forget the call site that has blocked the loop the least
+                    del self._sites[min(self._sites, key=lambda k: self._sites[k]["total_ms"])]
+                site = self._sites[key] = {
+                    "route": capture["route"], "handler": capture["handler"], "site": capture["site"],
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                }
+            site["count"] += 1
+            site["total_ms"] += lag * 1000
+            site["max_ms"] = max(site["max_ms"], lag * 1000)
+            site["last_seen"] = time.time()
+            site["stack"] = capture["stack"]
+
+    def stats(self):
+        """Lag figures and the call sites that blocked the loop longest, worst first."""
+        with self._lock:
+            sites = sorted((dict(site) for site in self._sites.values()), key=lambda site: -site["total_ms"])
+        for site in sites:
+            site["total_ms"] = round(site["total_ms"], 3)
+            site["max_ms"] = round(site["max_ms"], 3)
+        return {
+            "running": self._task is not None,
+            "interval_ms": self.interval_seconds * 1000,
+            "threshold_ms": self.threshold_seconds * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "blocking_calls": sites,
+        }
+
+monitor = LoopLagMonitor()
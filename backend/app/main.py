@@ -1,7 +1,8 @@
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
 import uvicorn
 import os
 from dotenv import load_dotenv
@@ -10,7 +11,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import local modules
-from app.database import engine, get_db
+from app.database import engine, get_db, configure_db_threadpool, get_pool_status
 from app.models import Base
 from app.routers.auth import router as auth_router
 from app.routers.chemicals import router as chemicals_router
@@ -20,15 +21,48 @@ from app.routers.users import router as users_router
 from app.routers.settings import router as settings_router
 from app.routers.tests import router as tests_router
 from app.routers.locations import router as locations_router
+from app.routers.diagnostics import router as diagnostics_router
+from app.routers.sync import router as sync_router
 from app.websockets import setup_socketio  # Import WebSocket setup function
+from app.notifications import dispatcher
+from app.change_bus import listener as change_listener
+from app.expiry import sweeper as expiry_sweeper
+from app.ledger import snapshotter as ledger_snapshotter
+from app.sync import pruner as tombstone_pruner
+from app.query_stats import QueryStatsMiddleware, instrument_engine
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry as metrics_registry
+from app.loop_monitor import monitor as loop_monitor
+from app.profiler import ProfileRequestMiddleware
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Count and time the SQL of each request (see app.query_stats)
+instrument_engine(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks"""
+    configure_db_threadpool()
+    dispatcher.start()
+    await change_listener.start()
+    expiry_sweeper.start()
+    ledger_snapshotter.start()
+    tombstone_pruner.start()
+    loop_monitor.start(app)
+    yield
+    await loop_monitor.stop()
+    await tombstone_pruner.stop()
+    await ledger_snapshotter.stop()
+    await expiry_sweeper.stop()
+    await change_listener.stop()
+    await dispatcher.stop()
+
 app = FastAPI(
     title="FreeLIMS API",
     description="Laboratory Information Management System API",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -51,8 +85,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],  # Keyset pagination cursor, inventory item versions, SQL timings
 )
 
+# Profiles requests sent with ?__profile=1 when PROFILE_REQUESTS_ENABLED is set
+app.add_middleware(ProfileRequestMiddleware)
+# Prometheus metrics per route; added first so it runs inside QueryStatsMiddleware
+app.add_middleware(MetricsMiddleware)
+# Server-Timing headers and the slow request log
+app.add_middleware(QueryStatsMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix="/api", tags=["Authentication"])
 app.include_router(users_router, prefix="/api/users", tags=["Users"])
@@ -62,6 +104,8 @@ app.include_router(experiments_router, prefix="/api/experiments", tags=["Experim
 app.include_router(settings_router, prefix="/api/settings", tags=["Settings"])
 app.include_router(tests_router)
 app.include_router(locations_router, prefix="/api/locations", tags=["Locations"])
+app.include_router(diagnostics_router, prefix="/api/diagnostics", tags=["Diagnostics"])
+app.include_router(sync_router, prefix="/api/sync", tags=["Sync"])
 
 # Setup WebSockets
 setup_socketio(app)
@@ -74,7 +118,21 @@ async def root():
 @app.get("/api/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "version": "0.1.0"}
+    pool = get_pool_status()
+    return {
+        "status": "healthy",
+        "version": "0.1.0",
+        "database_pool": {
+            key: pool[key]
+            for key in ("size", "checked_out", "overflow", "timeouts_total", "wait_ms_max")
+            if key in pool
+        },
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker process"""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True) 
\ No newline at end of file
@@ -0,0 +1,310 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+`GET /metrics` renders every metric registered here for a local Prometheus
+to scrape. The primitives are deliberately small: counters and histograms
+are a dictionary update under a lock, and gauges that mirror existing state
+(pool status, connected Socket.IO clients, process memory) are read by a
+callback only when scraped, so nothing is paid for them per request.
+
+HTTP requests are measured by `MetricsMiddleware`, per route template
+rather than raw path so the number of series stays bounded. It runs inside
+`app.query_stats.QueryStatsMiddleware` and also reports each request's SQL
+statements per route.
+"""
+
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .database import get_pool_status, pool_metrics
+from .query_stats import current_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds of the default latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labelvalues, amount=1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0.0)
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values]
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labelvalues):
+        state = self._values.get(labelvalues)
+        return state[2] if state else 0
+
+    def render(self):
+        with self._lock:
+            values = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._values.items()]
+        lines = []
+        for labels, counts, total, count in values:
+            lines.extend(_histogram_lines(self.name, self.labelnames, labels, self.buckets, counts, total, count))
+        return lines
+
+def _histogram_lines(name, labelnames, labels, bounds, counts, total, count):
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip(list(bounds) + [float("inf")], counts):
+        cumulative += bucket_count
+        lines.append(f"{name}_bucket{_labels(labelnames, labels, [('le', _number(bound))])} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labelnames, labels)} {_number(total)}")
+    lines.append(f"{name}_count{_labels(labelnames, labels)} {count}")
+    return lines
+
+class GaugeCallback(Metric):
+    """Gauge whose samples are read from `collect()` at scrape time.
+
+    `collect` returns (labelvalues, value) pairs.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, collect: Callable[[], Iterable[Tuple[Tuple, float]]], labelnames=(),
+                 kind="gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def render(self):
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in self.collect()]
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, collect, labelnames=(), kind="gauge"):
+        return self.register(GaugeCallback(name, documentation, collect, labelnames, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            samples = metric.render()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# HTTP
+http_requests = registry.counter(
+    "freelims_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "freelims_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+)
+
+# Database
+db_queries = registry.counter(
+    "freelims_db_queries_total", "SQL statements executed by requests, by route.", ("route",)
+)
+db_query_seconds = registry.counter(
+    "freelims_db_query_seconds_total", "Time spent in SQL statements by requests, by route.", ("route",)
+)
+db_queries_per_request = registry.histogram(
+    "freelims_db_queries_per_request", "SQL statements per request, by route.", ("route",), QUERY_COUNT_BUCKETS
+)
+
+class _PoolWaitHistogram(Metric):
+    """Renders the checkout wait histogram kept by app.database.pool_metrics."""
+
+    kind = "histogram"
+
+    def render(self):
+        snapshot = pool_metrics.snapshot()
+        counts = [bucket["count"] for bucket in snapshot["wait_histogram_ms"]]
+        bounds = [bound / 1000 for bound in pool_metrics.buckets_ms]
+        return _histogram_lines(self.name, (), (), bounds, counts, snapshot["wait_seconds_total"], sum(counts))
+
+registry.register(_PoolWaitHistogram(
+    "freelims_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection."
+))
+registry.gauge_callback(
+    "freelims_db_pool_checkout_timeouts_total", "Connection checkouts that timed out.",
+    lambda: [((), pool_metrics.snapshot()["timeouts_total"])], kind="counter",
+)
+
+def _pool_connections():
+    status = get_pool_status()
+    return [((state,), status[state]) for state in ("checked_out", "checked_in", "overflow") if state in status]
+
+registry.gauge_callback(
+    "freelims_db_pool_connections", "Database connections in the pool by state.", _pool_connections, ("state",)
+)
+
+# Socket.IO (updated by app.websockets and app.notifications)
+socket_emits = registry.counter(
+    "freelims_socketio_emits_total", "Change notifications emitted to Socket.IO rooms.", ("resource",)
+)
+socket_bytes_out = registry.counter(
+    "freelims_socketio_bytes_out_total", "Approximate payload bytes sent to Socket.IO clients.", ("resource",)
+)
+notify_latency = registry.histogram(
+    "freelims_notify_latency_seconds", "Time from a change being published to its notification being emitted.",
+    ("resource",),
+)
+
+def register_connected_clients(connected_clients):
+    """Expose the number of clients subscribed to each resource."""
+    registry.gauge_callback(
+        "freelims_socketio_connected_clients", "Socket.IO clients subscribed per resource.",
+        lambda: [((name,), len(sids)) for name, sids in list(connected_clients.items())], ("resource",),
+    )
+
+# Process
+event_loop_lag = registry.histogram(
+    "freelims_event_loop_lag_seconds", "How late the event loop ran a scheduled callback.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def _resident_memory():
+    try:
+        with open("/proc/self/statm") as statm:
+            return [((), int(statm.read().split()[1]) * _PAGE_SIZE)]
+    except (OSError, IndexError, ValueError):
+        if resource is None:
+            return []
+        # No /proc (macOS): fall back to the peak, reported in bytes there
+        return [((), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)]
+
+def _cpu_seconds():
+    if resource is None:
+        return []
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return [((), usage.ru_utime + usage.ru_stime)]
+
+registry.gauge_callback("process_resident_memory_bytes", "Resident memory size in bytes.", _resident_memory)
+registry.gauge_callback("process_cpu_seconds_total", "User and system CPU time in seconds.", _cpu_seconds,
+                        kind="counter")
+_started = time.time()
+registry.gauge_callback("process_start_time_seconds", "Start time of the process since the Unix epoch.",
+                        lambda: [((), _started)])
+
+def route_label(scope):
+    """Route template for metric labels; never the raw path, which is unbounded."""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if scope.get("endpoint") is not None and scope.get("root_path"):
+        # Mounted sub-application such as Socket.IO
+        return scope["root_path"]
+    return "<unmatched>"
+
+class MetricsMiddleware:
+    """ASGI middleware recording HTTP latency, status and SQL per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = route_label(scope)
+            method = scope.get("method", "")
+            http_requests.inc(method, route, str(status_code))
+            http_request_duration.observe(time.perf_counter() - start, method, route)
+            stats = current_stats()
+            if stats is not None:
+                db_queries.inc(route, amount=stats.count)
+                db_query_seconds.inc(route, amount=stats.seconds)
+                db_queries_per_request.observe(stats.count, route)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, Table
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, Table, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -70,6 +70,7 @@ class Chemical(Base, ModelMixin):
     cas_number = Column(String, unique=True, index=True)
     formula = Column(String)
     molecular_weight = Column(Float)
+    density = Column(Float, nullable=True)  # g/mL, for mass/volume conversion
     description = Column(Text)
     hazard_information = Column(Text)
     storage_conditions = Column(String)
@@ -82,6 +83,12 @@ class Chemical(Base, ModelMixin):
     experiments = relationship("Experiment", secondary=experiment_chemical, back_populates="chemicals")
     audit_logs = relationship("ChemicalAudit", back_populates="chemical")
 
+    # Delta sync indexes (see app.sync)
+    __table_args__ = (
+        Index("ix_chemicals_created_at", "created_at"),
+        Index("ix_chemicals_updated_at", "updated_at"),
+    )
+
 class Category(Base, ModelMixin):
     __tablename__ = "categories"
 
@@ -98,11 +105,19 @@ class Location(Base, ModelMixin):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
     description = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     inventory_items = relationship("InventoryItem", back_populates="location")
     audit_logs = relationship("LocationAudit", back_populates="location")
 
+    # Delta sync indexes (see app.sync)
+    __table_args__ = (
+        Index("ix_locations_created_at", "created_at"),
+        Index("ix_locations_updated_at", "updated_at"),
+    )
+
 class InventoryItem(Base, ModelMixin):
     __tablename__ = "inventory_items"
 
@@ -111,10 +126,15 @@ class InventoryItem(Base, ModelMixin):
     location_id = Column(Integer, ForeignKey("locations.id"))
     quantity = Column(Float)
     unit = Column(String)
+    # quantity/unit in the canonical unit of its dimension, kept in sync by app.stock
+    canonical_quantity = Column(Float)
+    canonical_unit = Column(String)
     batch_number = Column(String, index=True)
-    expiration_date = Column(DateTime)
+    expiration_date = Column(DateTime, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Optimistic concurrency: bumped on every write, exposed as the item's ETag
+    version = Column(Integer, nullable=False, default=1)
 
     # Relationships
     chemical = relationship("Chemical", back_populates="inventory_items")
@@ -122,6 +142,13 @@ class InventoryItem(Base, ModelMixin):
     inventory_changes = relationship("InventoryChange", back_populates="inventory_item")
     audit_logs = relationship("InventoryAudit", back_populates="inventory_item")
 
+    # Delta sync indexes (see app.sync)
+    __table_args__ = (
+        Index("ix_inventory_items_created_at", "created_at"),
+        Index("ix_inventory_items_updated_at", "updated_at"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
 class InventoryChange(Base, ModelMixin):
     __tablename__ = "inventory_changes"
 
@@ -138,6 +165,12 @@ class InventoryChange(Base, ModelMixin):
     user = relationship("User", back_populates="inventory_changes")
     experiment = relationship("Experiment", back_populates="inventory_changes")
 
+    # Keyset pagination indexes for the newest-first listings
+    __table_args__ = (
+        Index("ix_inventory_changes_timestamp_id", "timestamp", "id"),
+        Index("ix_inventory_changes_item_timestamp_id", "inventory_item_id", "timestamp", "id"),
+    )
+
 class InventoryAudit(Base, ModelMixin):
     __tablename__ = "inventory_audits"
 
@@ -154,6 +187,12 @@ class InventoryAudit(Base, ModelMixin):
     inventory_item = relationship("InventoryItem", back_populates="audit_logs")
     user = relationship("User", back_populates="inventory_audits")
 
+    # Keyset pagination indexes for the newest-first listings
+    __table_args__ = (
+        Index("ix_inventory_audits_timestamp_id", "timestamp", "id"),
+        Index("ix_inventory_audits_item_timestamp_id", "inventory_item_id", "timestamp", "id"),
+    )
+
 class Experiment(Base, ModelMixin):
     __tablename__ = "experiments"
 
@@ -257,4 +296,58 @@ class LocationAudit(Base, ModelMixin):
 
     # Relationships
     location = relationship("Location", back_populates="audit_logs")
-    user = relationship("User", back_populates="location_audits") 
\ No newline at end of file
+    user = relationship("User", back_populates="location_audits") 
+
+class DeletedRecord(Base, ModelMixin):
+    """Tombstone left behind when a synced row is deleted (see app.sync)."""
+    __tablename__ = "deleted_records"
+
+    id = Column(Integer, primary_key=True, index=True)
+    resource = Column(String, nullable=False)  # "inventory", "chemicals", "locations"
+    record_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_deleted_records_resource_deleted_at", "resource", "deleted_at"),
+    )
+
+class StockLevel(Base, ModelMixin):
+    """Current quantity of a chemical at a location, in canonical units (see app.stock)."""
+    __tablename__ = "stock_levels"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chemical_id = Column(Integer, ForeignKey("chemicals.id"), nullable=False)
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
+    unit = Column(String, nullable=False)  # canonical unit, see app.units
+    quantity = Column(Float, nullable=False, default=0.0)
+    item_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("chemical_id", "location_id", "unit", name="uq_stock_levels_chemical_location_unit"),
+        Index("ix_stock_levels_location_id", "location_id"),
+    )
+
+class ExpirySweepState(Base, ModelMixin):
+    """How far the expiry sweeper has got (see app.expiry). A single row."""
+    __tablename__ = "expiry_sweep_state"
+
+    id = Column(Integer, primary_key=True)
+    # Items expiring up to these times have already been reported
+    expiring_through = Column(DateTime, nullable=True)
+    expired_through = Column(DateTime, nullable=True)
+    swept_at = Column(DateTime(timezone=True), nullable=True)
+
+class InventoryBalanceSnapshot(Base, ModelMixin):
+    """Balance of an inventory item at a point in time (see app.ledger)."""
+    __tablename__ = "inventory_balance_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id"), nullable=False)
+    # Sum of the item's inventory changes with a timestamp up to and including this
+    taken_at = Column(DateTime(timezone=True), nullable=False)
+    quantity = Column(Float, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("inventory_item_id", "taken_at", name="uq_inventory_balance_snapshots_item_taken_at"),
+    )
@@ -0,0 +1,112 @@
+"""
+Coalescing dispatcher for real-time change notifications.
+
+Route handlers call `dispatcher.publish()` after committing a change. Events
+are queued on the event loop and, after a short batching window, merged per
+resource into a single Socket.IO message listing the changed ids by action.
+A bulk change of 500 items therefore reaches each client as one message
+rather than 500, and the HTTP response never waits on the emit.
+
+With several workers, changes arrive through the PostgreSQL change bus
+(app.change_bus) instead, which calls `relay()` with the ids of every
+committed insert, update or delete statement; in-process publishes are then
+skipped so nothing is sent twice.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+from .metrics import notify_latency
+from .websockets import notify_clients
+
+logger = logging.getLogger(__name__)
+
+# How long events for a resource are collected before they are sent (0 sends
+# on the next loop iteration, still merging events published in the meantime)
+NOTIFY_BATCH_WINDOW_MS = float(os.getenv("NOTIFY_BATCH_WINDOW_MS", "200"))
+
+class NotificationDispatcher:
+    """Batch change events per resource and emit them off the request path."""
+
+    def __init__(self, window_seconds: float = NOTIFY_BATCH_WINDOW_MS / 1000):
+        self.window_seconds = window_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # resource -> action -> ids, in the order they were first seen
+        self._pending: Dict[str, Dict[str, Dict[int, None]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # resource -> loop time its oldest pending event was queued
+        self._queued_at: Dict[str, float] = {}
+        self._tasks = set()
+        # Set by the change bus while it is relaying database notifications
+        self.bus_active = False
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Bind the dispatcher to the event loop that owns the Socket.IO server."""
+        self._loop = loop or asyncio.get_running_loop()
+
+    async def stop(self):
+        """Send anything still pending and detach from the loop."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for resource in list(self._pending):
+            self._flush(resource)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._loop = None
+
+    def publish(self, resource: str, action: str, ids: Iterable[int]):
+        """Queue a change notification. Safe to call from any thread."""
+        loop = self._loop
+        if self.bus_active:
+            # The database trigger publishes this change to every worker
+            return
+        if loop is None or loop.is_closed():
+            # Not serving (scripts, tests without a lifespan): nobody to notify
+            return
+        ids = list(ids)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._enqueue(resource, action, ids)
+        else:
+            loop.call_soon_threadsafe(self._enqueue, resource, action, ids)
+
+    def relay(self, resource: str, action: str, ids: Iterable[int]):
+        """Queue a change received from the change bus. Must run on the event loop."""
+        if self._loop is not None:
+            self._enqueue(resource, action, list(ids))
+
+    def _enqueue(self, resource: str, action: str, ids: List[int]):
+        actions = self._pending.setdefault(resource, {})
+        actions.setdefault(action, {}).update(dict.fromkeys(ids))
+        if resource not in self._timers:
+            self._queued_at[resource] = self._loop.time()
+            self._timers[resource] = self._loop.call_later(self.window_seconds, self._flush, resource)
+
+    def _flush(self, resource: str):
+        self._timers.pop(resource, None)
+        queued_at = self._queued_at.pop(resource, None)
+        actions = self._pending.pop(resource, None)
+        if not actions:
+            return
+        changes = [{'action': action, 'ids': list(ids)} for action, ids in actions.items()]
+        data = {'changes': changes, 'count': sum(len(change['ids']) for change in changes)}
+        task = asyncio.ensure_future(self._send(resource, data, queued_at), loop=self._loop)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, resource: str, data: dict, queued_at: Optional[float] = None):
+        try:
+            await notify_clients(resource, 'batch', data)
+        except Exception:
+            logger.exception("Failed to send %s notifications", resource)
+        else:
+            if queued_at is not None:
+                notify_latency.observe(asyncio.get_running_loop().time() - queued_at, resource)
+
+dispatcher = NotificationDispatcher()
@@ -0,0 +1,82 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Offset paging makes the database walk and discard every row before the
+requested page, so deep pages get slower as tables grow. Keyset paging
+remembers the sort key of the last row returned and asks for rows strictly
+after it, which an index on the sort key answers in constant time.
+
+Cursors are opaque to clients: a URL-safe base64 encoding of the sort key
+values of the last row on the page. The next cursor is returned in the
+`X-Next-Cursor` response header so list endpoints keep their existing
+response bodies.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values):
+    """Encode a sequence of sort key values as an opaque cursor string."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor produced by encode_cursor for the given key columns."""
+    invalid = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise invalid
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise invalid
+
+    decoded = []
+    for column, value in zip(columns, values):
+        try:
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif column.type.python_type is int:
+                value = int(value)
+        except (TypeError, ValueError):
+            raise invalid
+        decoded.append(value)
+    return decoded
+
+def paginate(query, columns, response: Response, skip=0, limit=100, after=None, descending=True):
+    """Return one page of `query` ordered by `columns`.
+
+    With `after` set, rows are fetched by keyset from that cursor and `skip`
+    is ignored; otherwise the classic offset/limit is applied. Either way the
+    response gets an `X-Next-Cursor` header when more rows are available.
+    The last column must be unique (normally the primary key) so the order
+    is total.
+    """
+    order = [column.desc() if descending else column.asc() for column in columns]
+    query = query.order_by(*order)
+
+    if after:
+        values = decode_cursor(after, columns)
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+    elif skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if rows:
+            last = rows[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                [getattr(last, column.key) for column in columns]
+            )
+    return rows
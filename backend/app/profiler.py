@@ -0,0 +1,223 @@
+"""
+On-demand statistical profiler for the running API process.
+
+`SamplingProfiler` wakes every few milliseconds, reads the current stack of
+every thread with `sys._current_frames()` and counts identical stacks. It
+needs no tracing hooks, so the process runs at full speed between samples
+and it can be used on the live server. Results are exported as collapsed
+stacks (`thread;outer;inner count`, the input of flamegraph.pl and
+speedscope) or as a speedscope JSON document.
+
+`GET /api/diagnostics/profile` profiles the whole process for N seconds.
+With `PROFILE_REQUESTS_ENABLED`, `ProfileRequestMiddleware` also profiles
+single requests sent with `?__profile=1` (or `?__profile=speedscope`) and
+returns the profile instead of the normal response. Only the threads
+running the request's handler are kept. Like the endpoint, this needs an
+admin's bearer token; other callers get the normal response.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from enum import Enum
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+import anyio.to_thread
+
+from .auth import admin_principal_from_token
+from .database import SessionLocal
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_REQUESTS_ENABLED = os.getenv("PROFILE_REQUESTS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+class ProfileFormat(str, Enum):
+    collapsed = "collapsed"
+    speedscope = "speedscope"
+
+# One whole-process profile at a time
+profile_lock = threading.Lock()
+
+Frame = Tuple[str, str, int]  # function, file, first line
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+class SamplingProfiler:
+    """Sample the stacks of all threads (or those `keep` accepts) at an interval."""
+
+    def __init__(self, interval_seconds=PROFILE_INTERVAL_MS / 1000,
+                 keep: Optional[Callable[[object], bool]] = None):
+        self.interval_seconds = max(interval_seconds, 0.001)
+        self.keep = keep
+        self.samples: Counter = Counter()  # (thread name, stack root first) -> count
+        self.sample_count = 0
+        self.started = self.stopped = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.keep is not None and not self.keep(frame)):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[(names.get(ident, str(ident)), tuple(stack))] += 1
+        self.sample_count += 1
+
+    def run(self, seconds):
+        """Sample in the calling thread for `seconds`."""
+        self.started = time.time()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self._stopping.is_set():
+            self.sample()
+            self._stopping.wait(self.interval_seconds)
+        self.stopped = time.time()
+        return self
+
+    def start(self):
+        """Sample in a background thread until `stop()`."""
+        self._thread = threading.Thread(target=self.run, args=(float("inf"),), name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, one `thread;frame;...;frame count` line per distinct stack."""
+        lines = []
+        for (thread, stack), count in sorted(self.samples.items(), key=lambda item: -item[1]):
+            frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{thread};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name="FreeLIMS API") -> dict:
+        """Speedscope file format: one sampled profile per thread, weights in seconds."""
+        frames: Dict[Frame, int] = {}
+        profiles: Dict[str, dict] = {}
+        duration = (self.stopped or time.time()) - (self.started or time.time())
+        for (thread, stack), count in self.samples.items():
+            profile = profiles.get(thread)
+            if profile is None:
+                profile = profiles[thread] = {
+                    "type": "sampled", "name": thread, "unit": "seconds",
+                    "startValue": 0, "endValue": duration, "samples": [], "weights": [],
+                }
+            profile["samples"].append([frames.setdefault(frame, len(frames)) for frame in stack])
+            profile["weights"].append(count * self.interval_seconds)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "freelims",
+            "activeProfileIndex": 0,
+            "shared": {"frames": [
+                {"name": frame_name, "file": filename, "line": line}
+                for (frame_name, filename, line) in frames
+            ]},
+            "profiles": list(profiles.values()),
+        }
+
+    def export(self, fmt):
+        """(body, media type) in the requested format."""
+        if fmt == ProfileFormat.speedscope:
+            return json.dumps(self.speedscope()), "application/json"
+        return self.collapsed(), "text/plain; charset=utf-8"
+
+def _runs(code, frame):
+    """Whether `code` is anywhere on the stack ending at `frame`."""
+    while frame is not None:
+        if frame.f_code is code:
+            return True
+        frame = frame.f_back
+    return False
+
+def _bearer_token(scope):
+    value = dict(scope.get("headers") or []).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = value.partition(" ")
+    return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+
+def is_admin_request(scope, session_factory=SessionLocal) -> bool:
+    """Whether the request carries an active admin's bearer token."""
+    token = _bearer_token(scope)
+    if token is None:
+        return False
+    db = session_factory()
+    try:
+        return admin_principal_from_token(db, token) is not None
+    finally:
+        db.close()
+
+class ProfileRequestMiddleware:
+    """ASGI middleware profiling requests that carry `?__profile=1`.
+
+    The profile replaces the response. Stacks are kept only for threads
+    running the route's handler, whether that is the event loop (async
+    handlers) or a worker thread (sync handlers). Requests without an
+    admin's bearer token are served normally, so profiles (which include
+    file paths and stacks) are no easier to get than from the endpoint.
+    """
+
+    def __init__(self, app, enabled=PROFILE_REQUESTS_ENABLED, interval_seconds=PROFILE_INTERVAL_MS / 1000,
+                 session_factory=SessionLocal):
+        self.app = app
+        self.enabled = enabled
+        self.interval_seconds = interval_seconds
+        self.session_factory = session_factory
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or b"__profile=" not in scope.get("query_string", b""):
+            await self.app(scope, receive, send)
+            return
+        fmt = parse_qs(scope["query_string"].decode()).get("__profile", [""])[0]
+        if fmt not in ("1", ProfileFormat.collapsed.value, ProfileFormat.speedscope.value) or not (
+            await anyio.to_thread.run_sync(is_admin_request, scope, self.session_factory)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        def keep(frame):
+            # The router adds the endpoint to the scope once the request is matched
+            endpoint = scope.get("endpoint")
+            code = getattr(endpoint, "__code__", None)
+            return code is not None and _runs(code, frame)
+
+        profiler = SamplingProfiler(self.interval_seconds, keep).start()
+        status = None
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+
+        body, media_type = profiler.export(
+            ProfileFormat.speedscope if fmt == ProfileFormat.speedscope.value else ProfileFormat.collapsed
+        )
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", media_type.encode()),
+                (b"x-profiled-status", str(status).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body.encode()})
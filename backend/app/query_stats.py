@@ -0,0 +1,208 @@
+"""
+Per-request SQL instrumentation.
+
+`instrument_engine` hooks `before_cursor_execute`/`after_cursor_execute` on
+an engine and charges every statement to the request being served:
+statement count, total database time and the slowest statement. Requests
+are tracked with a context variable set by `QueryStatsMiddleware`, which
+also reaches the worker threads running the synchronous route handlers.
+Statements executed outside a request (background tasks) are not counted.
+
+Every response carries the numbers as a `Server-Timing` header, so they
+show up in the browser devtools. Requests slower than `SLOW_REQUEST_MS`, or
+with a statement slower than `SLOW_QUERY_MS`, are also written to the
+`app.query_stats.slow` logger as one JSON object per line, with normalized
+SQL and the shape (types, not values) of the bind parameters.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(__name__ + ".slow")
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists: IN (%(id_1_1)s, %(id_1_2)s, ...) or IN (?, ?, ...)
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:%\(\w+\)s|\?|:\w+|\$\d+)\s*,)+\s*(?:%\(\w+\)s|\?|:\w+|\$\d+)\s*\)", re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w%$])-?\d+(?:\.\d+)?\b")
+
+def normalize_sql(statement):
+    """Collapse whitespace, literals and IN lists so equivalent statements compare equal."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    return _IN_LIST.sub("IN (...)", statement)
+
+def _type_name(value):
+    return "null" if value is None else type(value).__name__
+
+def param_shape(parameters, executemany=False):
+    """Types of the bind parameters, never their values."""
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "row": param_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: _type_name(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_type_name(value) for value in parameters]
+    return _type_name(parameters)
+
+class QueryStats:
+    """SQL statements executed while serving one request."""
+
+    __slots__ = ("count", "seconds", "slowest_seconds", "slowest_statement", "slowest_parameters",
+                 "slowest_executemany", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+        self.slowest_parameters = None
+        self.slowest_executemany = False
+        # Compiled statements are cached by SQLAlchemy, so this mostly counts
+        # references to the same string objects
+        self.statements = Counter()
+
+    def record(self, statement, parameters, executemany, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+            self.slowest_parameters = parameters
+            self.slowest_executemany = executemany
+
+    def summary(self):
+        """JSON-serializable summary with normalized SQL."""
+        summary = {
+            "queries": self.count,
+            "db_ms": round(self.seconds * 1000, 3),
+            "slowest": None,
+            "most_repeated": None,
+        }
+        if self.slowest_statement is not None:
+            summary["slowest"] = {
+                "ms": round(self.slowest_seconds * 1000, 3),
+                "sql": normalize_sql(self.slowest_statement),
+                "params": param_shape(self.slowest_parameters, self.slowest_executemany),
+            }
+        if self.statements:
+            statement, count = self.statements.most_common(1)[0]
+            if count > 1:
+                summary["most_repeated"] = {"count": count, "sql": normalize_sql(statement)}
+        return summary
+
+def current_stats() -> Optional[QueryStats]:
+    """Statistics of the request being served, if any."""
+    return _current.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        starts = conn.info.get("query_start")
+        if starts:
+            stats.record(statement, parameters, executemany, time.perf_counter() - starts.pop())
+
+def instrument_engine(engine):
+    """Charge statements executed on `engine` to the current request. Idempotent."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+def route_name(scope):
+    """Path template and handler of the route that served `scope`, once routed."""
+    route = scope.get("route")
+    endpoint = scope.get("endpoint")
+    return (
+        getattr(route, "path", None) or scope.get("path", ""),
+        getattr(endpoint, "__name__", None),
+    )
+
+def server_timing(stats, total_seconds):
+    metrics = [f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"']
+    if stats.slowest_statement is not None:
+        metrics.append(f'db-slowest;dur={stats.slowest_seconds * 1000:.1f}')
+    metrics.append(f"app;dur={total_seconds * 1000:.1f}")
+    return ", ".join(metrics)
+
+class QueryStatsMiddleware:
+    """ASGI middleware that tracks the SQL of each HTTP request.
+
+    Adds a `Server-Timing` header and logs slow requests. Statements run by
+    streaming responses after the headers are sent are logged but not in
+    the header.
+    """
+
+    def __init__(self, app, slow_request_ms=SLOW_REQUEST_MS, slow_query_ms=SLOW_QUERY_MS,
+                 server_timing=SERVER_TIMING_ENABLED):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.slow_query_ms = slow_query_ms
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(stats, time.perf_counter() - start).encode()))
+                    origin = dict(scope.get("headers") or []).get(b"origin")
+                    if origin:
+                        # Lets the frontend, served from another port, see the timings
+                        headers.append((b"timing-allow-origin", origin))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._log_if_slow(scope, stats, status_code, time.perf_counter() - start)
+
+    def _log_if_slow(self, scope, stats, status_code, seconds):
+        duration_ms = seconds * 1000
+        if duration_ms < self.slow_request_ms and stats.slowest_seconds * 1000 < self.slow_query_ms:
+            return
+        path, handler = route_name(scope)
+        record = {
+            "method": scope.get("method"),
+            "route": path,
+            "handler": handler,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 3),
+            **stats.summary(),
+        }
+        slow_logger.warning(json.dumps(record, default=str))
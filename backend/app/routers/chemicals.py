@@ -2,11 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from sqlalchemy import or_
+from datetime import datetime
 
 from ..database import get_db
-from ..schemas import Chemical, ChemicalCreate, ChemicalUpdate, ChemicalAuditCreate
+from ..schemas import Chemical, ChemicalCreate, ChemicalUpdate, ChemicalAuditCreate, ChemicalSearchResult
 from ..models import Chemical as ChemicalModel, Category as CategoryModel, ChemicalAudit as ChemicalAuditModel
 from ..auth import get_current_active_user
+from ..search import search_chemicals, typeahead_chemicals
+from ..export import ExportFormat, export_response
 
 router = APIRouter()
 
@@ -24,7 +27,7 @@ def create_audit_log(db: Session, user_id: int, chemical_id: int, field_name: st
     db.commit()
 
 @router.post("/", response_model=Chemical, status_code=status.HTTP_201_CREATED)
-async def create_chemical(
+def create_chemical(
     chemical: ChemicalCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -47,6 +50,7 @@ async def create_chemical(
         cas_number=chemical.cas_number,
         formula=chemical.formula,
         molecular_weight=chemical.molecular_weight,
+        density=chemical.density,
         description=chemical.description,
         hazard_information=chemical.hazard_information,
         storage_conditions=chemical.storage_conditions
@@ -63,7 +67,7 @@ async def create_chemical(
     return db_chemical
 
 @router.get("/", response_model=List[Chemical])
-async def read_chemicals(
+def read_chemicals(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
@@ -71,26 +75,61 @@ async def read_chemicals(
     current_user = Depends(get_current_active_user)
 ):
     """
-    Get all chemicals with optional search.
+    Get all chemicals with optional search. Search results are ordered by relevance.
     """
     query = db.query(ChemicalModel)
     
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                ChemicalModel.name.ilike(search_term),
-                ChemicalModel.cas_number.ilike(search_term),
-                ChemicalModel.formula.ilike(search_term),
-                ChemicalModel.description.ilike(search_term)
-            )
-        )
+        query = search_chemicals(db, query, search)
     
     chemicals = query.offset(skip).limit(limit).all()
     return chemicals
 
+@router.get("/search", response_model=List[ChemicalSearchResult])
+def search_chemicals_typeahead(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Search-as-you-type lookup returning the best matching chemicals.
+    """
+    return typeahead_chemicals(db, q, limit)
+
+@router.get("/audit-logs/export")
+def export_chemical_audit_logs(
+    fmt: ExportFormat = Query(ExportFormat.csv, alias="format"),
+    gzip: bool = False,
+    chemical_id: Optional[int] = None,
+    action: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Stream the complete chemical audit trail as CSV or NDJSON, oldest first.
+    """
+    query = db.query(ChemicalAuditModel)
+    
+    if chemical_id:
+        query = query.filter(ChemicalAuditModel.chemical_id == chemical_id)
+    
+    if action:
+        query = query.filter(ChemicalAuditModel.action == action)
+    
+    if start_date:
+        query = query.filter(ChemicalAuditModel.timestamp >= start_date)
+    
+    if end_date:
+        query = query.filter(ChemicalAuditModel.timestamp <= end_date)
+    
+    query = query.order_by(ChemicalAuditModel.timestamp, ChemicalAuditModel.id)
+    return export_response(db, query, ChemicalAuditModel.__table__.columns, "chemical_audits", fmt, gzip)
+
 @router.get("/{chemical_id}", response_model=Chemical)
-async def read_chemical(
+def read_chemical(
     chemical_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -104,7 +143,7 @@ async def read_chemical(
     return db_chemical
 
 @router.put("/{chemical_id}", response_model=Chemical)
-async def update_chemical(
+def update_chemical(
     chemical_id: int, 
     chemical_update: ChemicalUpdate,
     db: Session = Depends(get_db),
@@ -143,6 +182,8 @@ async def update_chemical(
         db_chemical.formula = chemical_update.formula
     if chemical_update.molecular_weight is not None:
         db_chemical.molecular_weight = chemical_update.molecular_weight
+    if chemical_update.density is not None:
+        db_chemical.density = chemical_update.density
     if chemical_update.description is not None:
         db_chemical.description = chemical_update.description
     if chemical_update.hazard_information is not None:
@@ -162,7 +203,7 @@ async def update_chemical(
     return db_chemical
 
 @router.delete("/{chemical_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_chemical(
+def delete_chemical(
     chemical_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
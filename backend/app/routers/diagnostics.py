@@ -0,0 +1,64 @@
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from ..database import get_pool_status
+from ..auth import get_current_admin_user, user_cache, password_hasher
+from ..loop_monitor import monitor as loop_monitor
+from ..profiler import PROFILE_INTERVAL_MS, PROFILE_MAX_SECONDS, ProfileFormat, SamplingProfiler, profile_lock
+
+router = APIRouter(dependencies=[Depends(get_current_admin_user)])
+
+@router.get("/pool")
+def read_pool_diagnostics():
+    """
+    Live database connection pool statistics. Admin only.
+    """
+    return get_pool_status()
+
+@router.get("/auth-cache")
+def read_auth_cache_diagnostics():
+    """
+    Hit rate and size of the authenticated user cache. Admin only.
+    """
+    return user_cache.stats()
+
+@router.get("/password-hasher")
+def read_password_hasher_diagnostics():
+    """
+    Queue depth and throughput of the bcrypt worker pool. Admin only.
+    """
+    return password_hasher.stats()
+
+@router.get("/event-loop")
+def read_event_loop_diagnostics():
+    """
+    Event-loop lag and the call sites that blocked the loop longest. Admin only.
+    """
+    return loop_monitor.stats()
+
+@router.get("/profile")
+def profile_process(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(PROFILE_INTERVAL_MS, ge=1, le=1000),
+    fmt: ProfileFormat = Query(ProfileFormat.collapsed, alias="format"),
+):
+    """
+    Sample the stacks of every thread in this process for `seconds` and
+    return them as collapsed stacks (for flamegraph.pl) or speedscope JSON.
+    Admin only; one profile runs at a time.
+    """
+    if not profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running")
+    try:
+        profiler = SamplingProfiler(interval_ms / 1000).run(seconds)
+    finally:
+        profile_lock.release()
+
+    body, media_type = profiler.export(fmt)
+    extension = "speedscope.json" if fmt == ProfileFormat.speedscope else "collapsed.txt"
+    filename = f"freelims-profile-{time.strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return Response(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Profile-Samples": str(profiler.sample_count),
+    })
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from sqlalchemy import or_
 from datetime import datetime
@@ -11,8 +11,12 @@ from ..auth import get_current_active_user, get_current_user
 
 router = APIRouter()
 
+# Collections nested in the Experiment response model, each loaded with one
+# IN query for the whole page rather than lazily per experiment
+EXPERIMENT_LOADERS = (selectinload(ExperimentModel.notes), selectinload(ExperimentModel.chemicals))
+
 @router.post("/", response_model=Experiment, status_code=status.HTTP_201_CREATED)
-async def create_experiment(
+def create_experiment(
     experiment: ExperimentCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -50,7 +54,7 @@ async def create_experiment(
     return db_experiment
 
 @router.get("/", response_model=List[Experiment])
-async def read_experiments(
+def read_experiments(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
@@ -61,7 +65,7 @@ async def read_experiments(
     """
     Get all experiments with optional filtering.
     """
-    query = db.query(ExperimentModel)
+    query = db.query(ExperimentModel).options(*EXPERIMENT_LOADERS)
     
     # Filter by user if not admin
     if not current_user.is_admin:
@@ -83,7 +87,7 @@ async def read_experiments(
     return experiments
 
 @router.get("/{experiment_id}", response_model=Experiment)
-async def read_experiment(
+def read_experiment(
     experiment_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -91,7 +95,7 @@ async def read_experiment(
     """
     Get a specific experiment by ID.
     """
-    db_experiment = db.query(ExperimentModel).filter(ExperimentModel.id == experiment_id).first()
+    db_experiment = db.query(ExperimentModel).options(*EXPERIMENT_LOADERS).filter(ExperimentModel.id == experiment_id).first()
     if db_experiment is None:
         raise HTTPException(status_code=404, detail="Experiment not found")
     
@@ -105,7 +109,7 @@ async def read_experiment(
     return db_experiment
 
 @router.put("/{experiment_id}", response_model=Experiment)
-async def update_experiment(
+def update_experiment(
     experiment_id: int,
     experiment: ExperimentUpdate,
     db: Session = Depends(get_db),
@@ -156,7 +160,7 @@ async def update_experiment(
     return db_experiment
 
 @router.delete("/{experiment_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_experiment(
+def delete_experiment(
     experiment_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -181,7 +185,7 @@ async def delete_experiment(
     return None
 
 @router.post("/{experiment_id}/notes", response_model=ExperimentNote, status_code=status.HTTP_201_CREATED)
-async def create_experiment_note(
+def create_experiment_note(
     experiment_id: int,
     note: ExperimentNoteCreate,
     db: Session = Depends(get_db),
@@ -212,7 +216,7 @@ async def create_experiment_note(
     return db_note
 
 @router.get("/{experiment_id}/notes", response_model=List[ExperimentNote])
-async def read_experiment_notes(
+def read_experiment_notes(
     experiment_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -1,18 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File, Header
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.exc import StaleDataError
+from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import or_
+from sqlalchemy import func
 
 from ..database import get_db
-from ..schemas import InventoryItem, InventoryItemCreate, InventoryItemUpdate, InventoryChange, InventoryChangeCreate, InventoryAudit, InventoryAuditCreate
-from ..models import InventoryItem as InventoryItemModel, InventoryChange as InventoryChangeModel, Chemical as ChemicalModel, Location as LocationModel, InventoryAudit as InventoryAuditModel
-from ..auth import get_current_active_user, get_current_user
-from ..websockets import notify_clients  # Import the notify_clients function
+from ..schemas import InventoryItem, InventoryItemCreate, InventoryItemUpdate, InventoryChange, InventoryChangeCreate, InventoryAudit, InventoryAuditCreate, InventoryImportResult, InventoryChangeBatchCreate, InventoryChangeBatchResult, ChemicalStockSummary, LocationStockSummary, StockRebuildResult, InventoryBalance, LedgerSnapshotResult
+from ..models import InventoryItem as InventoryItemModel, InventoryChange as InventoryChangeModel, Chemical as ChemicalModel, Location as LocationModel, InventoryAudit as InventoryAuditModel, StockLevel as StockLevelModel, Experiment as ExperimentModel
+from ..auth import get_current_active_user, get_current_user, get_current_admin_user
+from ..pagination import paginate
+from ..search import search_inventory
+from ..inventory_import import InventoryImporter, iter_upload_rows
+from ..inventory_batch import apply_change_batch
+from ..export import ExportFormat, export_response
+from ..notifications import dispatcher
+from ..stock import adjust_item_quantity, rebuild_stock_levels
+from ..units import UnitConversionError, convert, to_canonical
+from ..expiry import expiring_items, parse_window
+from ..ledger import as_utc, balance_at, balances_at, take_snapshots
 
 router = APIRouter()
 
+# Relationships nested in the InventoryItem response model, loaded with the
+# items rather than lazily per row while serializing
+ITEM_LOADERS = (joinedload(InventoryItemModel.chemical), joinedload(InventoryItemModel.location))
+
+def item_etag(db_item):
+    """ETag of an inventory item; changes whenever the item is written."""
+    return f'"{db_item.version}"'
+
 @router.post("/items", response_model=InventoryItem, status_code=status.HTTP_201_CREATED)
-async def create_inventory_item(
+def create_inventory_item(
     item: InventoryItemCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -64,15 +83,37 @@ async def create_inventory_item(
     db.add(audit_record)
     db.commit()
     
-    # Notify all connected clients about the new inventory item
-    await notify_clients('inventory', 'create', db_item.as_dict())
+    # Notify subscribed clients about the new inventory item
+    dispatcher.publish('inventory', 'create', [db_item.id])
     
     return db_item
 
+@router.post("/import", response_model=InventoryImportResult)
+def import_inventory_items(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Bulk import inventory items from a CSV or XLSX file.
+
+    Chemicals are matched by `cas_number` and locations by `location` name.
+    Valid rows are imported even if others fail; failures are listed per row.
+    """
+    importer = InventoryImporter(db, current_user.id)
+    report = importer.run(iter_upload_rows(file))
+    
+    if importer.item_ids:
+        dispatcher.publish('inventory', 'create', importer.item_ids)
+    
+    return report
+
 @router.get("/items", response_model=List[InventoryItem])
-async def read_inventory_items(
+def read_inventory_items(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
     search: Optional[str] = None,
     chemical_id: Optional[int] = None,
     location_id: Optional[int] = None,
@@ -81,8 +122,12 @@ async def read_inventory_items(
 ):
     """
     Get all inventory items with optional filtering.
+
+    Pass the `X-Next-Cursor` response header back as `after` to fetch the
+    next page by keyset instead of offset. Search results are ordered by
+    relevance and paged with `skip` only.
     """
-    query = db.query(InventoryItemModel)
+    query = db.query(InventoryItemModel).options(*ITEM_LOADERS)
     
     if chemical_id:
         query = query.filter(InventoryItemModel.chemical_id == chemical_id)
@@ -91,46 +136,210 @@ async def read_inventory_items(
         query = query.filter(InventoryItemModel.location_id == location_id)
     
     if search:
-        search_term = f"%{search}%"
-        query = query.join(ChemicalModel).filter(
-            or_(
-                ChemicalModel.name.ilike(search_term),
-                ChemicalModel.cas_number.ilike(search_term),
-                InventoryItemModel.batch_number.ilike(search_term)
+        if after:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Search results are ordered by relevance; page them with skip instead of after"
             )
-        )
+        query = search_inventory(db, query.join(ChemicalModel), search)
+        return query.offset(skip).limit(limit).all()
     
-    items = query.offset(skip).limit(limit).all()
+    items = paginate(query, [InventoryItemModel.id], response, skip, limit, after, descending=False)
     return items
 
+@router.get("/expiring", response_model=List[InventoryItem])
+def read_expiring_inventory_items(
+    response: Response,
+    within: str = "30d",
+    include_expired: bool = True,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Get inventory items expiring within a window such as `30d`, `12h` or
+    `2w`, soonest first. Already expired items are included unless
+    `include_expired` is false.
+    """
+    try:
+        window = parse_window(within)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    
+    query = expiring_items(db, window, include_expired).options(*ITEM_LOADERS)
+    return paginate(
+        query, [InventoryItemModel.expiration_date, InventoryItemModel.id], response, skip, limit, after,
+        descending=False
+    )
+
+@router.get("/summary/chemicals", response_model=List[ChemicalStockSummary])
+def read_stock_by_chemical(
+    chemical_id: Optional[int] = None,
+    unit: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Total stock per chemical across all locations, in canonical units
+    (g, mL, mol). A chemical stocked in several dimensions gets one row per unit.
+    """
+    query = db.query(
+        StockLevelModel.chemical_id,
+        ChemicalModel.name.label("chemical_name"),
+        StockLevelModel.unit,
+        func.sum(StockLevelModel.quantity).label("quantity"),
+        func.sum(StockLevelModel.item_count).label("item_count"),
+        func.count(StockLevelModel.location_id).label("location_count"),
+    ).join(ChemicalModel, ChemicalModel.id == StockLevelModel.chemical_id)
+    
+    if chemical_id:
+        query = query.filter(StockLevelModel.chemical_id == chemical_id)
+    
+    if unit:
+        query = query.filter(StockLevelModel.unit == to_canonical(1, unit)[1])
+    
+    query = query.group_by(StockLevelModel.chemical_id, ChemicalModel.name, StockLevelModel.unit)
+    return query.order_by(ChemicalModel.name, StockLevelModel.chemical_id, StockLevelModel.unit).all()
+
+@router.get("/summary/locations", response_model=List[LocationStockSummary])
+def read_stock_by_location(
+    location_id: Optional[int] = None,
+    chemical_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Stock of each chemical at each location, in canonical units (g, mL, mol).
+    """
+    query = db.query(
+        StockLevelModel.location_id,
+        LocationModel.name.label("location_name"),
+        StockLevelModel.chemical_id,
+        ChemicalModel.name.label("chemical_name"),
+        StockLevelModel.unit,
+        StockLevelModel.quantity,
+        StockLevelModel.item_count,
+    ).join(LocationModel, LocationModel.id == StockLevelModel.location_id
+    ).join(ChemicalModel, ChemicalModel.id == StockLevelModel.chemical_id)
+    
+    if location_id:
+        query = query.filter(StockLevelModel.location_id == location_id)
+    
+    if chemical_id:
+        query = query.filter(StockLevelModel.chemical_id == chemical_id)
+    
+    return query.order_by(LocationModel.name, ChemicalModel.name, StockLevelModel.unit).all()
+
+@router.post("/summary/rebuild", response_model=StockRebuildResult)
+def rebuild_stock_summary(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_admin_user)
+):
+    """
+    Recompute the stock aggregates from every inventory item. Admin only.
+    """
+    return {"rows": rebuild_stock_levels(db)}
+
 @router.get("/items/{item_id}", response_model=InventoryItem)
-async def read_inventory_item(
+def read_inventory_item(
     item_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """
     Get a specific inventory item by ID.
+
+    The `ETag` header can be sent back as `If-Match` when updating the item.
     """
-    db_item = db.query(InventoryItemModel).filter(InventoryItemModel.id == item_id).first()
+    db_item = db.query(InventoryItemModel).options(*ITEM_LOADERS).filter(InventoryItemModel.id == item_id).first()
     if db_item is None:
         raise HTTPException(status_code=404, detail="Inventory item not found")
+    response.headers["ETag"] = item_etag(db_item)
     return db_item
 
+@router.get("/items/{item_id}/balance", response_model=InventoryBalance)
+def read_inventory_item_balance(
+    item_id: int,
+    at: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Get an inventory item's balance as of `at` (default now), in the item's
+    unit, from its latest ledger snapshot and the changes recorded since.
+    """
+    db_item = db.query(InventoryItemModel).filter(InventoryItemModel.id == item_id).first()
+    if db_item is None:
+        raise HTTPException(status_code=404, detail="Inventory item not found")
+    
+    balance = balance_at(db, item_id, at)
+    if balance is None:
+        # The item had no recorded stock yet at that time
+        balance = {
+            "inventory_item_id": db_item.id,
+            "chemical_id": db_item.chemical_id,
+            "location_id": db_item.location_id,
+            "unit": db_item.unit,
+            "at": as_utc(at),
+            "quantity": 0.0,
+        }
+    return balance
+
+@router.get("/balances", response_model=List[InventoryBalance])
+def read_inventory_balances(
+    at: Optional[datetime] = None,
+    chemical_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Balances of every inventory item as of `at` (default now), for audits.
+    Items with no recorded stock by then are left out.
+    """
+    return balances_at(db, at, chemical_id=chemical_id, location_id=location_id)
+
+@router.post("/balances/snapshot", response_model=LedgerSnapshotResult)
+def snapshot_inventory_balances(
+    at: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_admin_user)
+):
+    """
+    Checkpoint the balance as of `at` (default now) of every item changed
+    since its previous snapshot. Admin only.
+    """
+    return {"snapshots": take_snapshots(db, as_utc(at))}
+
 @router.put("/items/{item_id}", response_model=InventoryItem)
-async def update_inventory_item(
+def update_inventory_item(
     item_id: int,
     item: InventoryItemUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """
     Update an inventory item by ID.
+
+    With an `If-Match` header the update is only applied if the item has not
+    changed since that ETag was read (412 otherwise). An item changed by
+    someone else while this request is running is never overwritten (409).
     """
     db_item = db.query(InventoryItemModel).filter(InventoryItemModel.id == item_id).first()
     if db_item is None:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     
+    if if_match is not None and if_match.strip() not in ("*", item_etag(db_item), f"W/{item_etag(db_item)}"):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Inventory item has been modified since it was read"
+        )
+    
     # Check if chemical exists if being updated
     if item.chemical_id is not None and item.chemical_id != db_item.chemical_id:
         chemical = db.query(ChemicalModel).filter(ChemicalModel.id == item.chemical_id).first()
@@ -248,22 +457,34 @@ async def update_inventory_item(
         # Update quantity
         db_item.quantity = item.quantity
     
-    db.commit()
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Inventory item was modified concurrently, please retry"
+        )
     db.refresh(db_item)
+    response.headers["ETag"] = item_etag(db_item)
     
     # Notify all connected clients about the updated inventory item
-    await notify_clients('inventory', 'update', db_item.as_dict())
+    dispatcher.publish('inventory', 'update', [db_item.id])
     
     return db_item
 
 @router.post("/changes", response_model=InventoryChange, status_code=status.HTTP_201_CREATED)
-async def create_inventory_change(
+def create_inventory_change(
     change: InventoryChangeCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """
     Record an inventory change (consumption or addition).
+
+    `change_amount` is in the item's unit unless `unit` is given, in which
+    case it is converted, using the chemical's density or molecular weight
+    when the units measure different quantities.
     """
     # Check if inventory item exists
     db_item = db.query(InventoryItemModel).filter(InventoryItemModel.id == change.inventory_item_id).first()
@@ -276,15 +497,28 @@ async def create_inventory_change(
         if not experiment:
             raise HTTPException(status_code=404, detail="Experiment not found")
     
-    # Record old quantity before change
-    old_quantity = db_item.quantity
-    new_quantity = db_item.quantity + change.change_amount
+    # Express the change in the item's unit, e.g. 250 mL drawn from a 2.5 L bottle
+    change_amount = change.change_amount
+    if change.unit:
+        chemical = db_item.chemical
+        try:
+            change_amount = convert(
+                change.change_amount, change.unit, db_item.unit,
+                density=chemical.density if chemical else None,
+                molecular_weight=chemical.molecular_weight if chemical else None,
+            )
+        except UnitConversionError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    
+    # Apply the change atomically in the database; concurrent changes to the
+    # same item are serialized by the row lock the UPDATE takes
+    old_quantity, new_quantity = adjust_item_quantity(db, db_item.id, change_amount, db_item.unit)
     
     # Create inventory change record
     db_change = InventoryChangeModel(
         inventory_item_id=change.inventory_item_id,
         user_id=current_user.id,
-        change_amount=change.change_amount,
+        change_amount=change_amount,
         reason=change.reason,
         experiment_id=change.experiment_id
     )
@@ -301,48 +535,77 @@ async def create_inventory_change(
     )
     db.add(audit_record)
     
-    # Update inventory quantity
-    db_item.quantity = new_quantity
-    
-    # Check if quantity is negative
-    if db_item.quantity < 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Inventory quantity cannot be negative"
-        )
-    
     db.commit()
     db.refresh(db_change)
-    db.refresh(db_item)  # Refresh the item to get updated quantity
     
     # Notify all connected clients about the inventory change
-    await notify_clients('inventory', 'update', db_item.as_dict())
+    dispatcher.publish('inventory', 'update', [db_item.id])
     
     return db_change
 
+@router.post("/changes/batch", response_model=InventoryChangeBatchResult, status_code=status.HTTP_201_CREATED)
+def create_inventory_change_batch(
+    batch: InventoryChangeBatchCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Record several inventory changes at once, e.g. every reagent consumed by
+    an experiment. Either every line is applied or none is; a rejected batch
+    lists the error of each failing line.
+    """
+    results = apply_change_batch(db, current_user.id, batch)
+    
+    # One coalesced notification for every item touched by the batch
+    dispatcher.publish('inventory', 'update', sorted({result["inventory_item_id"] for result in results}))
+    
+    return {"experiment_id": batch.experiment_id, "changes": results}
+
 @router.get("/changes", response_model=List[InventoryChange])
-async def read_inventory_changes(
+def read_inventory_changes(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
     inventory_item_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """
-    Get inventory changes with optional filtering.
+    Get inventory changes with optional filtering, newest first.
+
+    Pass the `X-Next-Cursor` response header back as `after` to fetch the
+    next page by keyset instead of offset.
     """
     query = db.query(InventoryChangeModel)
     
     if inventory_item_id:
         query = query.filter(InventoryChangeModel.inventory_item_id == inventory_item_id)
     
-    changes = query.order_by(InventoryChangeModel.timestamp.desc()).offset(skip).limit(limit).all()
+    changes = paginate(
+        query, [InventoryChangeModel.timestamp, InventoryChangeModel.id], response, skip, limit, after
+    )
     return changes
 
+def filter_inventory_audits(query, inventory_item_id=None, field_name=None, action=None):
+    """Apply the inventory audit log filters shared by the list and export endpoints."""
+    if inventory_item_id:
+        query = query.filter(InventoryAuditModel.inventory_item_id == inventory_item_id)
+    
+    if field_name:
+        query = query.filter(InventoryAuditModel.field_name == field_name)
+    
+    if action:
+        query = query.filter(InventoryAuditModel.action == action)
+    
+    return query
+
 @router.get("/audit", response_model=List[InventoryAudit])
-async def read_inventory_audit_logs(
+def read_inventory_audit_logs(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
     inventory_item_id: Optional[int] = None,
     field_name: Optional[str] = None,
     action: Optional[str] = None,
@@ -350,18 +613,31 @@ async def read_inventory_audit_logs(
     current_user = Depends(get_current_active_user)
 ):
     """
-    Get inventory audit logs with optional filtering.
+    Get inventory audit logs with optional filtering, newest first.
+
+    Pass the `X-Next-Cursor` response header back as `after` to fetch the
+    next page by keyset instead of offset.
     """
-    query = db.query(InventoryAuditModel)
-    
-    if inventory_item_id:
-        query = query.filter(InventoryAuditModel.inventory_item_id == inventory_item_id)
+    query = filter_inventory_audits(db.query(InventoryAuditModel), inventory_item_id, field_name, action)
     
-    if field_name:
-        query = query.filter(InventoryAuditModel.field_name == field_name)
-    
-    if action:
-        query = query.filter(InventoryAuditModel.action == action)
-    
-    audit_logs = query.order_by(InventoryAuditModel.timestamp.desc()).offset(skip).limit(limit).all()
-    return audit_logs 
\ No newline at end of file
+    audit_logs = paginate(
+        query, [InventoryAuditModel.timestamp, InventoryAuditModel.id], response, skip, limit, after
+    )
+    return audit_logs 
+
+@router.get("/audit/export")
+def export_inventory_audit_logs(
+    fmt: ExportFormat = Query(ExportFormat.csv, alias="format"),
+    gzip: bool = False,
+    inventory_item_id: Optional[int] = None,
+    field_name: Optional[str] = None,
+    action: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Stream the complete inventory audit trail as CSV or NDJSON, oldest first.
+    """
+    query = filter_inventory_audits(db.query(InventoryAuditModel), inventory_item_id, field_name, action)
+    query = query.order_by(InventoryAuditModel.timestamp, InventoryAuditModel.id)
+    return export_response(db, query, InventoryAuditModel.__table__.columns, "inventory_audits", fmt, gzip)
@@ -8,6 +8,7 @@ from ..database import get_db
 from ..schemas import Location, LocationCreate, LocationUpdate, LocationAuditCreate, LocationAudit
 from ..models import Location as LocationModel, LocationAudit as LocationAuditModel, User as UserModel
 from ..auth import get_current_active_user
+from ..export import ExportFormat, export_response
 
 router = APIRouter()
 
@@ -25,7 +26,7 @@ def create_audit_log(db: Session, user_id: int, location_id: int, field_name: st
     db.commit()
 
 @router.post("/", response_model=Location, status_code=status.HTTP_201_CREATED)
-async def create_location(
+def create_location(
     location: LocationCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -58,7 +59,7 @@ async def create_location(
     return db_location
 
 @router.get("/", response_model=List[Location])
-async def read_locations(
+def read_locations(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
@@ -82,7 +83,7 @@ async def read_locations(
     return locations
 
 @router.get("/{location_id}", response_model=Location)
-async def read_location(
+def read_location(
     location_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -96,7 +97,7 @@ async def read_location(
     return location
 
 @router.put("/{location_id}", response_model=Location)
-async def update_location(
+def update_location(
     location_id: int, 
     location_update: LocationUpdate,
     db: Session = Depends(get_db),
@@ -143,7 +144,7 @@ async def update_location(
     return db_location
 
 @router.delete("/{location_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_location(
+def delete_location(
     location_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
@@ -169,20 +170,8 @@ async def delete_location(
     db.commit()
     return None
 
-@router.get("/audit-logs/", response_model=List[LocationAudit])
-async def get_location_audit_logs(
-    location_id: Optional[int] = None,
-    action: Optional[str] = None,
-    start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_active_user)
-):
-    """
-    Retrieve audit logs for locations with optional filtering.
-    """
+def filter_location_audits(db: Session, location_id=None, action=None, start_date=None, end_date=None):
+    """Build the location audit log query shared by the list and export endpoints."""
     query = db.query(LocationAuditModel).join(UserModel, LocationAuditModel.user_id == UserModel.id)
     
     if location_id:
@@ -197,6 +186,42 @@ async def get_location_audit_logs(
     if end_date:
         query = query.filter(LocationAuditModel.timestamp <= end_date)
     
+    return query
+
+@router.get("/audit-logs/export")
+def export_location_audit_logs(
+    fmt: ExportFormat = Query(ExportFormat.csv, alias="format"),
+    gzip: bool = False,
+    location_id: Optional[int] = None,
+    action: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Stream the complete location audit trail as CSV or NDJSON, oldest first.
+    """
+    query = filter_location_audits(db, location_id, action, start_date, end_date)
+    query = query.order_by(LocationAuditModel.timestamp, LocationAuditModel.id)
+    return export_response(db, query, LocationAuditModel.__table__.columns, "location_audits", fmt, gzip)
+
+@router.get("/audit-logs/", response_model=List[LocationAudit])
+def get_location_audit_logs(
+    location_id: Optional[int] = None,
+    action: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Retrieve audit logs for locations with optional filtering.
+    """
+    query = filter_location_audits(db, location_id, action, start_date, end_date)
+    
     # Order by timestamp (most recent first)
     query = query.order_by(LocationAuditModel.timestamp.desc())
     
@@ -204,7 +229,7 @@ async def get_location_audit_logs(
     return audit_logs
 
 @router.get("/{location_id}/audit-logs/", response_model=List[LocationAudit])
-async def get_audit_logs_for_location(
+def get_audit_logs_for_location(
     location_id: int,
     action: Optional[str] = None,
     start_date: Optional[datetime] = None,
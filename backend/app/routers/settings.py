@@ -10,7 +10,7 @@ from ..auth import get_current_admin_user, get_current_active_user
 router = APIRouter()
 
 @router.get("/", response_model=SystemSettings)
-async def get_settings(
+def get_settings(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
@@ -27,7 +27,7 @@ async def get_settings(
     return settings
 
 @router.put("/", response_model=SystemSettings)
-async def update_settings(
+def update_settings(
     settings: SystemSettingsUpdate,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_admin_user)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from ..database import get_db
+from ..schemas import SyncResponse
+from ..auth import get_current_active_user
+from ..sync import SYNC_RESOURCES, collect_changes, parse_watermark
+
+router = APIRouter()
+
+@router.get("", response_model=SyncResponse)
+def read_changes(
+    since: Optional[str] = Query(None, description="Watermark returned by the previous sync"),
+    resource: Optional[List[str]] = Query(None, description=f"Resources to sync: {', '.join(SYNC_RESOURCES)}"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Ids created, updated or deleted since a watermark, per resource.
+    Resources flagged `reset` must be reloaded in full.
+    """
+    unknown = [name for name in resource or [] if name not in SYNC_RESOURCES]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sync resource: {', '.join(unknown)}"
+        )
+    watermark = parse_watermark(since) if since else None
+    return collect_changes(db, since=watermark, resources=resource)
@@ -1,6 +1,6 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from .. import schemas, models, database
 from ..dependencies import get_current_active_user
 
@@ -10,6 +10,10 @@ router = APIRouter(
     dependencies=[Depends(get_current_active_user)],
 )
 
+# Analysts are nested in the Test response model; load them for the whole
+# page with one IN query rather than lazily per test
+TEST_LOADERS = (selectinload(models.Test.analysts),)
+
 @router.get("/", response_model=List[schemas.Test])
 def read_tests(
     skip: int = 0, 
@@ -17,7 +21,7 @@ def read_tests(
     db: Session = Depends(database.get_db),
     current_user: schemas.User = Depends(get_current_active_user)
 ):
-    return db.query(models.Test).offset(skip).limit(limit).all()
+    return db.query(models.Test).options(*TEST_LOADERS).order_by(models.Test.id).offset(skip).limit(limit).all()
 
 @router.post("/", response_model=schemas.Test, status_code=status.HTTP_201_CREATED)
 def create_test(
@@ -58,7 +62,7 @@ def read_test(
     db: Session = Depends(database.get_db),
     current_user: schemas.User = Depends(get_current_active_user)
 ):
-    db_test = db.query(models.Test).filter(models.Test.id == test_id).first()
+    db_test = db.query(models.Test).options(*TEST_LOADERS).filter(models.Test.id == test_id).first()
     if db_test is None:
         raise HTTPException(status_code=404, detail="Test not found")
     return db_test
@@ -5,26 +5,36 @@ from typing import List
 from ..database import get_db
 from ..schemas import User, UserUpdate
 from ..models import User as UserModel
-from ..auth import get_current_active_user, get_current_admin_user, get_password_hash
+from ..auth import get_current_active_user, get_current_admin_user, get_password_hash, user_cache, UserPrincipal
 
 router = APIRouter()
 
 @router.get("/me", response_model=User)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+def read_users_me(
+    principal: UserPrincipal = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
     """
     Get current user information.
     """
+    current_user = db.query(UserModel).filter(UserModel.id == principal.id).first()
+    if current_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
     return current_user
 
 @router.put("/me", response_model=User)
-async def update_user_me(
+def update_user_me(
     user_update: UserUpdate,
-    current_user: UserModel = Depends(get_current_active_user),
+    principal: UserPrincipal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
     Update current user information.
     """
+    current_user = db.query(UserModel).filter(UserModel.id == principal.id).first()
+    if current_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
     # Check if email is being updated and is already taken
     if user_update.email and user_update.email != current_user.email:
         db_user = db.query(UserModel).filter(UserModel.email == user_update.email).first()
@@ -55,13 +65,16 @@ async def update_user_me(
     
     db.commit()
     db.refresh(current_user)
+    
+    # Drop the cached principal so the next request sees the change
+    user_cache.invalidate(principal.username, user_id=principal.id)
     return current_user
 
 @router.get("/", response_model=List[User])
-async def read_users(
+def read_users(
     skip: int = 0,
     limit: int = 100,
-    current_user: UserModel = Depends(get_current_admin_user),
+    current_user: UserPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -71,9 +84,9 @@ async def read_users(
     return users
 
 @router.get("/{user_id}", response_model=User)
-async def read_user(
+def read_user(
     user_id: int,
-    current_user: UserModel = Depends(get_current_admin_user),
+    current_user: UserPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -85,10 +98,10 @@ async def read_user(
     return db_user
 
 @router.put("/{user_id}", response_model=User)
-async def update_user(
+def update_user(
     user_id: int,
     user_update: UserUpdate,
-    current_user: UserModel = Depends(get_current_admin_user),
+    current_user: UserPrincipal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -130,4 +143,7 @@ async def update_user(
     
     db.commit()
     db.refresh(db_user)
+    
+    # Drop the cached principal so a deactivation takes effect immediately
+    user_cache.invalidate(user_id=db_user.id)
     return db_user 
\ No newline at end of file
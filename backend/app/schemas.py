@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 # User schemas
@@ -34,6 +34,7 @@ class ChemicalBase(BaseModel):
     cas_number: Optional[str] = None
     formula: Optional[str] = None
     molecular_weight: Optional[float] = None
+    density: Optional[float] = None
     description: Optional[str] = None
     hazard_information: Optional[str] = None
     storage_conditions: Optional[str] = None
@@ -46,6 +47,7 @@ class ChemicalUpdate(BaseModel):
     cas_number: Optional[str] = None
     formula: Optional[str] = None
     molecular_weight: Optional[float] = None
+    density: Optional[float] = None
     description: Optional[str] = None
     hazard_information: Optional[str] = None
     storage_conditions: Optional[str] = None
@@ -58,6 +60,16 @@ class Chemical(ChemicalBase):
     class Config:
         orm_mode = True
 
+class ChemicalSearchResult(BaseModel):
+    id: int
+    name: str
+    cas_number: Optional[str] = None
+    formula: Optional[str] = None
+    score: float
+
+    class Config:
+        from_attributes = True
+
 # Category schemas
 class CategoryBase(BaseModel):
     name: str
@@ -116,6 +128,9 @@ class InventoryItemUpdate(BaseModel):
 
 class InventoryItem(InventoryItemBase):
     id: int
+    canonical_quantity: Optional[float] = None
+    canonical_unit: Optional[str] = None
+    version: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     chemical: Chemical
@@ -124,6 +139,63 @@ class InventoryItem(InventoryItemBase):
     class Config:
         orm_mode = True
 
+# Inventory import schemas
+class InventoryImportError(BaseModel):
+    row: int
+    error: str
+
+class InventoryImportResult(BaseModel):
+    total_rows: int
+    imported: int
+    failed: int
+    errors: List[InventoryImportError] = []
+
+# Stock summary schemas
+class ChemicalStockSummary(BaseModel):
+    chemical_id: int
+    chemical_name: str
+    unit: str
+    quantity: float
+    item_count: int
+    location_count: int
+
+class LocationStockSummary(BaseModel):
+    location_id: int
+    location_name: str
+    chemical_id: int
+    chemical_name: str
+    unit: str
+    quantity: float
+    item_count: int
+
+class StockRebuildResult(BaseModel):
+    rows: int
+
+# Inventory ledger schemas
+class InventoryBalance(BaseModel):
+    inventory_item_id: int
+    chemical_id: Optional[int] = None
+    location_id: Optional[int] = None
+    unit: Optional[str] = None
+    at: datetime
+    quantity: float
+    # Checkpoint the balance was computed from, and how many changes followed it
+    snapshot_at: Optional[datetime] = None
+    tail_changes: int = 0
+
+class LedgerSnapshotResult(BaseModel):
+    snapshots: int
+
+# Delta sync schemas
+class SyncResourceChanges(BaseModel):
+    reset: bool
+    upserted: List[int] = []
+    deleted: List[int] = []
+
+class SyncResponse(BaseModel):
+    watermark: datetime
+    changes: Dict[str, SyncResourceChanges]
+
 # Inventory Change schemas
 class InventoryChangeBase(BaseModel):
     inventory_item_id: int
@@ -132,7 +204,8 @@ class InventoryChangeBase(BaseModel):
     experiment_id: Optional[int] = None
 
 class InventoryChangeCreate(InventoryChangeBase):
-    pass
+    # Unit of change_amount when it differs from the item's unit
+    unit: Optional[str] = None
 
 class InventoryChange(InventoryChangeBase):
     id: int
@@ -142,6 +215,29 @@ class InventoryChange(InventoryChangeBase):
     class Config:
         orm_mode = True
 
+class InventoryChangeBatchLine(BaseModel):
+    inventory_item_id: int
+    change_amount: float
+    unit: Optional[str] = None
+    reason: Optional[str] = None  # defaults to the batch reason
+
+class InventoryChangeBatchCreate(BaseModel):
+    reason: str
+    experiment_id: Optional[int] = None
+    lines: List[InventoryChangeBatchLine] = Field(..., min_length=1, max_length=500)
+
+class InventoryChangeBatchLineResult(BaseModel):
+    line: int
+    inventory_item_id: int
+    change_id: int
+    change_amount: float
+    old_quantity: float
+    new_quantity: float
+
+class InventoryChangeBatchResult(BaseModel):
+    experiment_id: Optional[int] = None
+    changes: List[InventoryChangeBatchLineResult]
+
 # Inventory Audit schemas
 class InventoryAuditBase(BaseModel):
     inventory_item_id: int
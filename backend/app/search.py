@@ -0,0 +1,117 @@
+"""
+Ranked text search over chemicals and inventory.
+
+On PostgreSQL the queries are written so the planner can use the pg_trgm GIN
+indexes on chemical name, CAS number, formula and batch number (substring
+ILIKE and the `%` similarity operator) and the full-text GIN index on the
+chemical description. Results are ordered by trigram similarity and
+full-text rank.
+
+Other databases (SQLite in tests and benchmarks) fall back to plain ILIKE
+matching with a simple exact/prefix/substring score, so the endpoints behave
+the same without the extension.
+"""
+
+from sqlalchemy import case, func, literal, or_
+
+from .models import Chemical, InventoryItem
+
+# Text search configuration used by the description index; the query
+# expression must match the index expression exactly for it to be used.
+FTS_CONFIG = "english"
+
+# Terms shorter than this cannot use trigram indexes, so typeahead switches
+# to an index-backed prefix match on the lower-cased name.
+MIN_TRIGRAM_LENGTH = 3
+
+def _is_postgresql(db):
+    return db.get_bind().dialect.name == "postgresql"
+
+def _like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def description_tsvector():
+    return func.to_tsvector(FTS_CONFIG, func.coalesce(Chemical.description, ""))
+
+def chemical_match(db, term):
+    """WHERE clause matching chemicals against a search term."""
+    pattern = _like_pattern(term)
+    clauses = [
+        Chemical.name.ilike(pattern, escape="\\"),
+        Chemical.cas_number.ilike(pattern, escape="\\"),
+        Chemical.formula.ilike(pattern, escape="\\"),
+    ]
+    if _is_postgresql(db):
+        clauses.append(Chemical.name.op("%")(term))
+        clauses.append(description_tsvector().op("@@")(func.plainto_tsquery(FTS_CONFIG, term)))
+    else:
+        clauses.append(Chemical.description.ilike(pattern, escape="\\"))
+    return or_(*clauses)
+
+def chemical_rank(db, term):
+    """Relevance score for a chemical, higher is better."""
+    if _is_postgresql(db):
+        return func.greatest(
+            func.similarity(Chemical.name, term),
+            func.similarity(func.coalesce(Chemical.cas_number, ""), term),
+            func.similarity(func.coalesce(Chemical.formula, ""), term),
+            func.ts_rank(description_tsvector(), func.plainto_tsquery(FTS_CONFIG, term)) * 0.5,
+        )
+
+    lowered = term.lower()
+    name = func.lower(Chemical.name)
+    return case(
+        (name == lowered, 1.0),
+        (func.lower(Chemical.cas_number) == lowered, 0.95),
+        (name.like(f"{lowered}%"), 0.8),
+        (name.like(f"%{lowered}%"), 0.6),
+        (func.lower(func.coalesce(Chemical.cas_number, "")).like(f"%{lowered}%"), 0.5),
+        (func.lower(func.coalesce(Chemical.formula, "")).like(f"%{lowered}%"), 0.4),
+        else_=0.2,
+    )
+
+def search_chemicals(db, query, term):
+    """Filter a Chemical query by `term` and order it by relevance."""
+    rank = chemical_rank(db, term)
+    return query.filter(chemical_match(db, term)).order_by(rank.desc(), Chemical.name, Chemical.id)
+
+def typeahead_chemicals(db, term, limit=10):
+    """Lightweight (id, name, cas_number, formula, score) rows for search-as-you-type."""
+    columns = [Chemical.id, Chemical.name, Chemical.cas_number, Chemical.formula]
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        escaped = _like_pattern(term)[1:]
+        query = db.query(*columns, literal(1.0).label("score")).filter(
+            func.lower(Chemical.name).like(escaped.lower(), escape="\\")
+        ).order_by(func.lower(Chemical.name), Chemical.id)
+    else:
+        rank = chemical_rank(db, term)
+        query = db.query(*columns, rank.label("score")).filter(
+            chemical_match(db, term)
+        ).order_by(rank.desc(), Chemical.name, Chemical.id)
+    return query.limit(limit).all()
+
+def inventory_match(db, term):
+    """WHERE clause matching inventory items (joined to Chemical) against a search term."""
+    pattern = _like_pattern(term)
+    clauses = [
+        Chemical.name.ilike(pattern, escape="\\"),
+        Chemical.cas_number.ilike(pattern, escape="\\"),
+        InventoryItem.batch_number.ilike(pattern, escape="\\"),
+    ]
+    if _is_postgresql(db):
+        clauses.append(Chemical.name.op("%")(term))
+    return or_(*clauses)
+
+def inventory_rank(db, term):
+    """Relevance score for an inventory item (joined to Chemical): its chemical's
+    score, with an exact batch number match first."""
+    return case(
+        (func.lower(func.coalesce(InventoryItem.batch_number, "")) == term.lower(), 1.0),
+        else_=chemical_rank(db, term),
+    )
+
+def search_inventory(db, query, term):
+    """Filter an InventoryItem query joined to Chemical by `term` and order it by relevance."""
+    rank = inventory_rank(db, term)
+    return query.filter(inventory_match(db, term)).order_by(rank.desc(), InventoryItem.id)
@@ -0,0 +1,212 @@
+"""
+Current-stock aggregates per chemical and location.
+
+`stock_levels` holds one row per (chemical, location, canonical unit) with
+the summed quantity and number of inventory items, so "how much acetone do
+we have" or "what is in Freezer 3" reads a handful of rows instead of every
+inventory item.
+
+Each item also stores its quantity in canonical units (`canonical_quantity`,
+`canonical_unit`), filled in by a `before_flush` hook, so SQL can sum items
+directly.
+
+The table is maintained incrementally. An `after_flush` hook turns every
+ORM insert, update and delete of an InventoryItem into quantity deltas, and
+Core bulk inserts (see app.inventory_import) apply theirs with
+`apply_stock_deltas`. Deltas are applied with an atomic upsert, so
+concurrent writers never overwrite each other's totals. `rebuild_stock_levels`
+recomputes the table from scratch, e.g. after the migration that adds it.
+
+Quantity changes go through `adjust_item_quantity`, a single conditional
+`UPDATE ... SET quantity = quantity + :delta ... RETURNING`, so concurrent
+consumption of the same item never loses an update and can never take the
+quantity below zero.
+"""
+
+from collections import defaultdict
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, event, func, inspect, insert, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import InventoryItem, StockLevel
+from .units import convert_many, to_canonical
+
+# Attributes of an inventory item that move stock between aggregate rows
+_STOCK_FIELDS = ("chemical_id", "location_id", "quantity", "unit")
+
+def stock_key(chemical_id, location_id, quantity, unit):
+    """((chemical_id, location_id, canonical unit), canonical quantity) for one item."""
+    canonical_quantity, canonical_unit = to_canonical(quantity, unit)
+    return (chemical_id, location_id, canonical_unit), canonical_quantity
+
+def canonical_columns(quantity, unit):
+    """Values of the canonical quantity columns for an item."""
+    canonical_quantity, canonical_unit = to_canonical(quantity, unit)
+    return {"canonical_quantity": canonical_quantity, "canonical_unit": canonical_unit}
+
+def item_deltas(items):
+    """Stock deltas for newly created items given as dicts of column values."""
+    deltas = defaultdict(lambda: [0.0, 0])
+    for item in items:
+        _add(deltas, +1, *(item.get(field) for field in _STOCK_FIELDS))
+    return deltas
+
+def _add(deltas, sign, chemical_id, location_id, quantity, unit):
+    if chemical_id is None or location_id is None:
+        return
+    key, canonical_quantity = stock_key(chemical_id, location_id, quantity, unit)
+    deltas[key][0] += sign * canonical_quantity
+    deltas[key][1] += sign
+
+def _old_values(obj):
+    """Stock fields of `obj` as they were before the pending changes."""
+    state = inspect(obj)
+    values = []
+    for field in _STOCK_FIELDS:
+        history = state.attrs[field].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.added:
+            # Previously unset
+            values.append(None)
+        else:
+            values.append(getattr(obj, field))
+    return values
+
+@event.listens_for(Session, "before_flush")
+def _set_canonical_quantities(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, InventoryItem):
+            for column, value in canonical_columns(obj.quantity, obj.unit).items():
+                if getattr(obj, column) != value:
+                    setattr(obj, column, value)
+
+@event.listens_for(Session, "after_flush")
+def _track_item_changes(session, flush_context):
+    deltas = defaultdict(lambda: [0.0, 0])
+    for obj in session.new:
+        if isinstance(obj, InventoryItem):
+            _add(deltas, +1, *(getattr(obj, field) for field in _STOCK_FIELDS))
+    for obj in session.dirty:
+        if isinstance(obj, InventoryItem) and any(
+            inspect(obj).attrs[field].history.has_changes() for field in _STOCK_FIELDS
+        ):
+            _add(deltas, -1, *_old_values(obj))
+            _add(deltas, +1, *(getattr(obj, field) for field in _STOCK_FIELDS))
+    for obj in session.deleted:
+        if isinstance(obj, InventoryItem):
+            _add(deltas, -1, *_old_values(obj))
+    if deltas:
+        apply_stock_deltas(session.connection(), deltas)
+
+def _upsert(bind):
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(StockLevel)
+    if dialect == "sqlite":
+        return sqlite.insert(StockLevel)
+    return None
+
+def apply_stock_deltas(bind, deltas):
+    """Add {(chemical_id, location_id, unit): [quantity, item_count]} to `stock_levels`.
+
+    `bind` is a Session or Connection taking part in the caller's transaction.
+    Rows left without items are removed.
+    """
+    deltas = {key: value for key, value in deltas.items() if value[0] or value[1]}
+    if not deltas:
+        return
+    if isinstance(bind, Session):
+        bind = bind.connection()
+    stmt = _upsert(bind)
+    for (chemical_id, location_id, unit), (quantity, count) in deltas.items():
+        values = dict(chemical_id=chemical_id, location_id=location_id, unit=unit)
+        if stmt is not None:
+            bind.execute(stmt.values(quantity=quantity, item_count=count, **values).on_conflict_do_update(
+                index_elements=["chemical_id", "location_id", "unit"],
+                set_={
+                    "quantity": StockLevel.quantity + quantity,
+                    "item_count": StockLevel.item_count + count,
+                    "updated_at": func.now(),
+                },
+            ))
+            continue
+        updated = bind.execute(
+            StockLevel.__table__.update()
+            .where(*(getattr(StockLevel, column) == value for column, value in values.items()))
+            .values(quantity=StockLevel.quantity + quantity, item_count=StockLevel.item_count + count)
+        )
+        if updated.rowcount == 0:
+            bind.execute(insert(StockLevel).values(quantity=quantity, item_count=count, **values))
+
+    bind.execute(delete(StockLevel).where(
+        tuple_(StockLevel.chemical_id, StockLevel.location_id, StockLevel.unit).in_(list(deltas)),
+        StockLevel.item_count <= 0,
+    ))
+
+def adjust_item_quantity(db, item_id, delta, unit):
+    """Atomically add `delta` (in `unit`) to an item's quantity.
+
+    `unit` is the item's unit as the caller read it; if it has changed in the
+    meantime the update is refused rather than applied in the wrong unit.
+    Returns (old quantity, new quantity). The caller commits.
+    """
+    factor, canonical_unit = to_canonical(1.0, unit)
+    row = db.execute(
+        update(InventoryItem)
+        .where(
+            InventoryItem.id == item_id,
+            InventoryItem.unit == unit,
+            InventoryItem.quantity + delta >= 0,
+        )
+        .values(
+            quantity=InventoryItem.quantity + delta,
+            canonical_quantity=func.coalesce(InventoryItem.canonical_quantity, 0) + delta * factor,
+            version=InventoryItem.version + 1,
+            updated_at=func.now(),
+        )
+        .returning(InventoryItem.quantity, InventoryItem.chemical_id, InventoryItem.location_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if row is None:
+        current = db.query(InventoryItem.quantity, InventoryItem.unit).filter(InventoryItem.id == item_id).first()
+        if current is None:
+            raise HTTPException(status_code=404, detail="Inventory item not found")
+        if current.unit != unit:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Inventory item unit changed, please retry"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inventory quantity cannot be negative"
+        )
+
+    # Core UPDATEs bypass the ORM flush hook that maintains stock_levels
+    apply_stock_deltas(db, {(row.chemical_id, row.location_id, canonical_unit): [delta * factor, 0]})
+    return row.quantity - delta, row.quantity
+
+def rebuild_stock_levels(db):
+    """Recompute `stock_levels` from every inventory item. Returns the number of rows."""
+    deltas = defaultdict(lambda: [0.0, 0])
+    rows = db.query(*(getattr(InventoryItem, field) for field in _STOCK_FIELDS)).all()
+    # Converted in one pass, from the raw columns so this also works before
+    # the canonical columns are backfilled
+    converted = convert_many((row.quantity for row in rows), (row.unit for row in rows))
+    for row, (quantity, unit) in zip(rows, converted):
+        if row.chemical_id is not None and row.location_id is not None:
+            key = (row.chemical_id, row.location_id, unit)
+            deltas[key][0] += quantity
+            deltas[key][1] += 1
+    db.execute(delete(StockLevel))
+    if deltas:
+        db.execute(insert(StockLevel), [
+            {"chemical_id": chemical_id, "location_id": location_id, "unit": unit,
+             "quantity": quantity, "item_count": count}
+            for (chemical_id, location_id, unit), (quantity, count) in deltas.items()
+        ])
+    db.commit()
+    return len(deltas)
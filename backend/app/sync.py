@@ -0,0 +1,177 @@
+"""
+Delta sync: which rows changed since a client's last refresh.
+
+Instead of refetching whole lists after a Socket.IO event, clients keep the
+`watermark` returned by `GET /api/sync` and pass it back as `since` on the
+next call. The response lists, per resource, the ids inserted or updated
+after the watermark (answered from the `created_at`/`updated_at` indexes)
+and the ids deleted after it (answered from the `deleted_records` tombstone
+table).
+
+Tombstones are written by a `before_flush` hook for every ORM delete of a
+synced model, so routers do not need to record them by hand. Bulk
+`query.delete()` calls bypass the hook and must not be used on these tables.
+
+Timestamps are set by the database clock when a row is written, but only
+become visible when the transaction commits. Each query therefore looks
+back `SYNC_OVERLAP_SECONDS` before the watermark so rows committed late are
+not missed; clients may see an id again, which is harmless for an upsert.
+
+Tombstones are kept for `SYNC_TOMBSTONE_RETENTION_DAYS`. `TombstonePruner`,
+started from the FastAPI lifespan, deletes older ones every
+`SYNC_PRUNE_INTERVAL_SECONDS`, and a watermark older than the retention
+period gets `reset` for every resource, since deletions before it may
+already be gone.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+import anyio.to_thread
+from fastapi import HTTPException, status
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .ledger import as_utc
+from .models import Chemical, DeletedRecord, InventoryItem, Location
+
+logger = logging.getLogger(__name__)
+
+# "inventory" and "locations" are also the Socket.IO rooms whose events tell
+# clients to sync (see app.websockets); chemicals have no room and are
+# synced on the client's own schedule
+SYNC_RESOURCES = {
+    "inventory": InventoryItem,
+    "chemicals": Chemical,
+    "locations": Location,
+}
+
+SYNC_OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP_SECONDS", "10"))
+# Beyond this many changed ids a resource is reported as `reset` instead
+SYNC_MAX_CHANGES = int(os.getenv("SYNC_MAX_CHANGES", "1000"))
+SYNC_TOMBSTONE_RETENTION_DAYS = float(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+SYNC_PRUNE_INTERVAL_SECONDS = float(os.getenv("SYNC_PRUNE_INTERVAL_SECONDS", "86400"))
+
+_RESOURCE_BY_MODEL = {model: resource for resource, model in SYNC_RESOURCES.items()}
+
+@event.listens_for(Session, "before_flush")
+def _record_deletions(session, flush_context, instances):
+    for obj in list(session.deleted):
+        resource = _RESOURCE_BY_MODEL.get(type(obj))
+        if resource is not None and obj.id is not None:
+            session.add(DeletedRecord(resource=resource, record_id=obj.id))
+
+def parse_watermark(value):
+    """Parse a watermark previously returned by `collect_changes`."""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync watermark")
+
+def _changed_ids(db, model, since, limit):
+    """Ids of rows created or updated after `since`, or None if over `limit`."""
+    ids = set()
+    # Two index range scans rather than one OR over both columns
+    for column in (model.created_at, model.updated_at):
+        rows = db.query(model.id).filter(column > since).limit(limit + 1).all()
+        ids.update(row.id for row in rows)
+        if len(ids) > limit:
+            return None
+    return sorted(ids)
+
+def _deleted_ids(db, resource, since, limit):
+    rows = (
+        db.query(DeletedRecord.record_id)
+        .filter(DeletedRecord.resource == resource, DeletedRecord.deleted_at > since)
+        .distinct()
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        return None
+    return sorted(row.record_id for row in rows)
+
+def collect_changes(db, since=None, resources=None, limit=SYNC_MAX_CHANGES):
+    """Build the delta sync response for `resources` (default: all).
+
+    Without `since`, with a `since` older than the tombstone retention, or
+    when a resource changed more than `limit` rows, that resource is flagged
+    `reset` and the client should reload it in full.
+    """
+    watermark = db.query(func.now()).scalar()
+    lookback = None
+    if since is not None:
+        lookback = since - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        if as_utc(lookback) < as_utc(watermark) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS):
+            lookback = None
+    changes = {}
+    for resource in resources or SYNC_RESOURCES:
+        model = SYNC_RESOURCES[resource]
+        upserted = deleted = None
+        if lookback is not None:
+            upserted = _changed_ids(db, model, lookback, limit)
+            if upserted is not None:
+                deleted = _deleted_ids(db, resource, lookback, limit)
+        if upserted is None or deleted is None:
+            changes[resource] = {"reset": True, "upserted": [], "deleted": []}
+        else:
+            # A row deleted after being updated is only reported as deleted
+            gone = set(deleted)
+            upserted = [record_id for record_id in upserted if record_id not in gone]
+            changes[resource] = {"reset": False, "upserted": upserted, "deleted": deleted}
+    return {"watermark": watermark, "changes": changes}
+
+def prune_tombstones(db, now=None, retention_days=SYNC_TOMBSTONE_RETENTION_DAYS):
+    """Delete tombstones older than the retention period. Returns the number deleted."""
+    cutoff = as_utc(now) - timedelta(days=retention_days)
+    count = db.query(DeletedRecord).filter(DeletedRecord.deleted_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+class TombstonePruner:
+    """Periodically delete expired deletion tombstones."""
+
+    def __init__(self, session_factory=SessionLocal, interval_seconds=SYNC_PRUNE_INTERVAL_SECONDS,
+                 retention_days=SYNC_TOMBSTONE_RETENTION_DAYS):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.retention_days = retention_days
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start pruning on the running event loop. A zero interval disables the pruner."""
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await anyio.to_thread.run_sync(self.prune)
+            except Exception:
+                logger.exception("Tombstone pruning failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def prune(self, now=None) -> int:
+        db = self.session_factory()
+        try:
+            count = prune_tombstones(db, now, self.retention_days)
+        finally:
+            db.close()
+        if count:
+            logger.info("Pruned %d deletion tombstones", count)
+        return count
+
+pruner = TombstonePruner()
@@ -0,0 +1,142 @@
+"""
+Unit registry for inventory quantities.
+
+Inventory units are free-form strings ("g", "Kg", "mL", "liters"). The
+registry maps them onto three dimensions, each with a canonical unit so
+quantities of the same chemical can be summed: grams for mass, millilitres
+for volume and moles for amount of substance. Units that are not
+recognised are kept as their own (normalised) unit and only combine with
+identical units.
+
+Conversion factors between every pair of known units are computed once at
+import. Lookups of raw unit strings are cached, so converting a row costs a
+dictionary lookup and a multiplication. `convert_many` converts a whole
+column of quantities, resolving each distinct unit only once, for reports
+and summaries.
+
+Crossing dimensions needs properties of the chemical: density (g/mL) links
+mass and volume, molecular weight (g/mol) links mass and amount.
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+MASS = "mass"
+VOLUME = "volume"
+AMOUNT = "amount"
+
+class UnitConversionError(ValueError):
+    """Two units cannot be converted with the information available."""
+
+class Unit(NamedTuple):
+    symbol: str
+    dimension: Optional[str]
+    factor: float  # size of one unit in the canonical unit of its dimension
+
+CANONICAL_UNITS = {MASS: "g", VOLUME: "mL", AMOUNT: "mol"}
+
+# symbol, dimension, factor to canonical, aliases
+_DEFINITIONS = [
+    ("g", MASS, 1.0, ("gram", "grams")),
+    ("kg", MASS, 1e3, ("kilogram", "kilograms")),
+    ("mg", MASS, 1e-3, ("milligram", "milligrams")),
+    ("µg", MASS, 1e-6, ("ug", "mcg", "microgram", "micrograms")),
+    ("lb", MASS, 453.59237, ("lbs", "pound", "pounds")),
+    ("oz", MASS, 28.349523125, ("ounce", "ounces")),
+    ("mL", VOLUME, 1.0, ("ml", "cc", "millilitre", "milliliter", "millilitres", "milliliters")),
+    ("L", VOLUME, 1e3, ("l", "litre", "liter", "litres", "liters")),
+    ("µL", VOLUME, 1e-3, ("ul", "microlitre", "microliter", "microlitres", "microliters")),
+    ("dL", VOLUME, 100.0, ("dl",)),
+    ("cL", VOLUME, 10.0, ("cl",)),
+    ("gal", VOLUME, 3785.411784, ("gallon", "gallons")),
+    ("fl oz", VOLUME, 29.5735295625, ("fluid ounce", "fluid ounces")),
+    ("mol", AMOUNT, 1.0, ("mole", "moles")),
+    ("mmol", AMOUNT, 1e-3, ("millimole", "millimoles")),
+    ("µmol", AMOUNT, 1e-6, ("umol", "micromole", "micromoles")),
+]
+
+def normalize_unit(unit):
+    """Lower-cased, whitespace-trimmed form of a unit string."""
+    return " ".join(str(unit or "").split()).lower()
+
+_UNITS: Dict[str, Unit] = {}
+for _symbol, _dimension, _factor, _aliases in _DEFINITIONS:
+    for _alias in (_symbol,) + _aliases:
+        _UNITS[normalize_unit(_alias)] = Unit(_symbol, _dimension, _factor)
+
+# (from symbol, to symbol) -> factor, for every pair within a dimension
+_FACTORS: Dict[Tuple[str, str], float] = {
+    (a.symbol, b.symbol): a.factor / b.factor
+    for a in _UNITS.values()
+    for b in _UNITS.values()
+    if a.dimension == b.dimension
+}
+
+@lru_cache(maxsize=1024)
+def lookup(unit) -> Unit:
+    """Resolve a unit string. Unknown units get no dimension and factor 1."""
+    key = normalize_unit(unit)
+    return _UNITS.get(key) or Unit(key, None, 1.0)
+
+def is_known(unit) -> bool:
+    return lookup(unit).dimension is not None
+
+def to_canonical(quantity, unit):
+    """Return (quantity, unit) expressed in the canonical unit of its dimension."""
+    resolved = lookup(unit)
+    if resolved.dimension is None:
+        return (quantity or 0.0), resolved.symbol
+    return (quantity or 0.0) * resolved.factor, CANONICAL_UNITS[resolved.dimension]
+
+def _bridge(source, target, density, molecular_weight):
+    """Factor from the canonical unit of one dimension to that of another."""
+    # Everything goes through mass (grams)
+    to_grams = {MASS: 1.0, VOLUME: density, AMOUNT: molecular_weight}
+    dimensions = (source.dimension, target.dimension)
+    missing = [name for dimension, name in ((VOLUME, "density"), (AMOUNT, "molecular weight"))
+               if dimension in dimensions and not to_grams[dimension]]
+    if missing:
+        raise UnitConversionError(
+            f"Converting {source.symbol} to {target.symbol} requires the chemical's {' and '.join(missing)}"
+        )
+    return to_grams[source.dimension] / to_grams[target.dimension]
+
+def conversion_factor(from_unit, to_unit, density=None, molecular_weight=None) -> float:
+    """Factor that converts a quantity in `from_unit` to `to_unit`.
+
+    `density` is in g/mL and `molecular_weight` in g/mol; they are only
+    needed when the units measure different dimensions.
+    """
+    source, target = lookup(from_unit), lookup(to_unit)
+    if source.symbol == target.symbol:
+        return 1.0
+    if source.dimension is None or target.dimension is None:
+        raise UnitConversionError(f"Cannot convert {source.symbol or 'unitless'} to {target.symbol or 'unitless'}")
+    if source.dimension == target.dimension:
+        return _FACTORS[(source.symbol, target.symbol)]
+    return source.factor * _bridge(source, target, density, molecular_weight) / target.factor
+
+def convert(quantity, from_unit, to_unit, density=None, molecular_weight=None) -> float:
+    """Convert one quantity. Raises UnitConversionError if it is not possible."""
+    return quantity * conversion_factor(from_unit, to_unit, density, molecular_weight)
+
+def convert_many(quantities: Iterable[float], units: Iterable[str], to_unit=None,
+                 density=None, molecular_weight=None) -> List[Tuple[float, str]]:
+    """Convert a column of quantities, resolving each distinct unit once.
+
+    With `to_unit` every quantity is converted to it (raising
+    UnitConversionError for any that cannot be); otherwise each is converted
+    to the canonical unit of its own dimension. Returns (quantity, unit) pairs.
+    """
+    factors: Dict[str, Tuple[float, str]] = {}
+    results = []
+    for quantity, unit in zip(quantities, units):
+        resolved = factors.get(unit)
+        if resolved is None:
+            if to_unit is not None:
+                resolved = (conversion_factor(unit, to_unit, density, molecular_weight), lookup(to_unit).symbol)
+            else:
+                resolved = to_canonical(1.0, unit)
+            factors[unit] = resolved
+        results.append(((quantity or 0.0) * resolved[0], resolved[1]))
+    return results
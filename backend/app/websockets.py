@@ -1,8 +1,14 @@
 # Make sure python-socketio is installed:
 # pip install "python-socketio[asyncio_client]"
 import socketio
+import json
+import os
+import uuid
+from collections import deque
 from fastapi import FastAPI
-from typing import Dict, Set, List
+from typing import Deque, Dict, Set, List, Optional
+
+from .metrics import register_connected_clients, socket_bytes_out, socket_emits
 
 # Create Socket.IO server
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
@@ -17,6 +23,51 @@ connected_clients: Dict[str, Set[str]] = {
     'users': set(),
     'locations': set(),
 }
+register_connected_clients(connected_clients)
+
+# Recent events kept per resource so reconnecting clients can catch up
+SOCKET_REPLAY_BUFFER_SIZE = int(os.getenv("SOCKET_REPLAY_BUFFER_SIZE", "500"))
+
+class EventLog:
+    """Per-resource sequence numbers and a bounded buffer of recent events.
+
+    Sequence numbers are only meaningful within one server process, which is
+    identified by `stream`. A client resuming against a different stream
+    (another worker, or a restarted one) has to resync in full.
+    """
+
+    def __init__(self, size: int = SOCKET_REPLAY_BUFFER_SIZE):
+        self.size = size
+        self.stream = uuid.uuid4().hex[:12]
+        self._seq: Dict[str, int] = {}
+        self._events: Dict[str, Deque[dict]] = {}
+
+    def current(self, resource: str) -> int:
+        return self._seq.get(resource, 0)
+
+    def append(self, resource: str, payload: dict) -> dict:
+        """Stamp `payload` with the next sequence number and keep it for replay."""
+        seq = self._seq[resource] = self.current(resource) + 1
+        payload = dict(payload, seq=seq, stream=self.stream)
+        events = self._events.get(resource)
+        if events is None:
+            events = self._events[resource] = deque(maxlen=self.size)
+        events.append(payload)
+        return payload
+
+    def since(self, resource: str, last_seq: int, stream: Optional[str] = None) -> Optional[List[dict]]:
+        """Events after `last_seq`, or None if some of them are no longer buffered."""
+        current = self.current(resource)
+        if stream != self.stream or last_seq > current:
+            return None
+        if last_seq == current:
+            return []
+        events = self._events.get(resource) or ()
+        if not events or events[0]['seq'] > last_seq + 1:
+            return None
+        return [event for event in events if event['seq'] > last_seq]
+
+event_log = EventLog()
 
 @sio.event
 async def connect(sid, environ):
@@ -34,24 +85,84 @@ async def disconnect(sid):
 
 @sio.event
 async def subscribe(sid, data):
-    """Subscribe to updates for a specific resource"""
-    resource = data.get('resource')
+    """Subscribe to updates for a specific resource
+
+    Each resource is a Socket.IO room, so updates only reach the clients that
+    asked for them.
+    """
+    resource = (data or {}).get('resource')
     if resource and resource in connected_clients:
+        await sio.enter_room(sid, resource)
         connected_clients[resource].add(sid)
-        await sio.emit('subscription_success', {'resource': resource}, room=sid)
+        await sio.emit('subscription_success', {
+            'resource': resource,
+            'seq': event_log.current(resource),
+            'stream': event_log.stream,
+        }, room=sid)
         print(f"Client {sid} subscribed to {resource}")
     else:
         await sio.emit('subscription_error', {'message': 'Invalid resource'}, room=sid)
 
+@sio.event
+async def resume(sid, data):
+    """Re-subscribe after a reconnect and replay the events missed since `last_seq`
+
+    Clients send the `seq` and `stream` of the last event they saw. If the
+    gap is still buffered the missed `<resource>_updated` events are sent
+    again in order; otherwise `resync_required` tells the client to reload
+    the resource in full.
+    """
+    data = data or {}
+    resource = data.get('resource')
+    if not resource or resource not in connected_clients:
+        await sio.emit('subscription_error', {'message': 'Invalid resource'}, room=sid)
+        return
+    try:
+        last_seq = int(data.get('last_seq', 0))
+    except (TypeError, ValueError):
+        last_seq = -1
+
+    await sio.enter_room(sid, resource)
+    connected_clients[resource].add(sid)
+    # Taken after joining the room: later events reach the client live
+    missed = event_log.since(resource, last_seq, data.get('stream'))
+    status = {'resource': resource, 'seq': event_log.current(resource), 'stream': event_log.stream}
+    if missed is None:
+        await sio.emit('resync_required', status, room=sid)
+        print(f"Client {sid} must resync {resource}")
+        return
+    for payload in missed:
+        await sio.emit(f'{resource}_updated', payload, room=sid)
+    await sio.emit('resume_success', dict(status, replayed=len(missed)), room=sid)
+    print(f"Replayed {len(missed)} {resource} events to client {sid}")
+
+@sio.event
+async def unsubscribe(sid, data):
+    """Stop receiving updates for a specific resource"""
+    resource = (data or {}).get('resource')
+    if resource and resource in connected_clients:
+        await sio.leave_room(sid, resource)
+        connected_clients[resource].discard(sid)
+        await sio.emit('unsubscription_success', {'resource': resource}, room=sid)
+        print(f"Client {sid} unsubscribed from {resource}")
+    else:
+        await sio.emit('subscription_error', {'message': 'Invalid resource'}, room=sid)
+
 async def notify_clients(resource: str, action: str, data: dict):
-    """Notify all clients subscribed to a resource about changes"""
+    """Notify the clients subscribed to a resource about changes
+
+    Every event gets the next sequence number for its resource and is kept in
+    the replay buffer, even when nobody is subscribed right now.
+    """
+    payload = event_log.append(resource, {
+        'action': action,  # 'create', 'update', 'delete', or 'batch' (see app.notifications)
+        'resource': resource,
+        'data': data
+    })
     if resource in connected_clients and connected_clients[resource]:
-        payload = {
-            'action': action,  # 'create', 'update', 'delete'
-            'resource': resource,
-            'data': data
-        }
-        await sio.emit(f'{resource}_updated', payload, room=None)
+        await sio.emit(f'{resource}_updated', payload, room=resource)
+        socket_emits.inc(resource)
+        socket_bytes_out.inc(resource, amount=len(json.dumps(payload)) * len(connected_clients[resource]))
         print(f"Notified {len(connected_clients[resource])} clients about {action} on {resource}")
 
 def setup_socketio(app: FastAPI):
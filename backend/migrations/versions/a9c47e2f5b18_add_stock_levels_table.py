@@ -0,0 +1,45 @@
+"""add_stock_levels_table
+
+Revision ID: a9c47e2f5b18
+Revises: f3b8d21a6c94
+Create Date: 2026-10-16 18:07:35.114206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c47e2f5b18'
+down_revision = 'f3b8d21a6c94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('stock_levels',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('chemical_id', sa.Integer(), nullable=False),
+        sa.Column('location_id', sa.Integer(), nullable=False),
+        sa.Column('unit', sa.String(), nullable=False),
+        sa.Column('quantity', sa.Float(), nullable=False),
+        sa.Column('item_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['chemical_id'], ['chemicals.id'], ),
+        sa.ForeignKeyConstraint(['location_id'], ['locations.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('chemical_id', 'location_id', 'unit', name='uq_stock_levels_chemical_location_unit')
+    )
+    op.create_index(op.f('ix_stock_levels_id'), 'stock_levels', ['id'], unique=False)
+    op.create_index('ix_stock_levels_location_id', 'stock_levels', ['location_id'])
+
+    # Backfill from the existing inventory, using the application's unit table
+    from app.stock import rebuild_stock_levels
+    rebuild_stock_levels(Session(bind=op.get_bind()))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_levels_location_id', table_name='stock_levels')
+    op.drop_index(op.f('ix_stock_levels_id'), table_name='stock_levels')
+    op.drop_table('stock_levels')
@@ -0,0 +1,112 @@
+"""batch_change_notifications
+
+Replace the per-row change notify triggers with statement-level triggers
+that send the ids of all rows touched by a statement, in chunks.
+
+Revision ID: b41f7e2d9c58
+Revises: e7b52c9d1a84
+Create Date: 2026-10-17 09:41:27.118406
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41f7e2d9c58'
+down_revision = 'e7b52c9d1a84'
+branch_labels = None
+depends_on = None
+
+# Must match app.change_bus.CHANGE_CHANNEL
+CHANNEL = 'freelims_changes'
+
+# Ids per notification. An id takes at most 11 bytes in the JSON array, so
+# 500 of them stay well below the 8000 byte NOTIFY payload limit
+IDS_PER_NOTIFICATION = 500
+
+# Tables whose row changes are relayed to Socket.IO, and the resource they belong to
+NOTIFY_TABLES = [
+    ('inventory_items', 'inventory'),
+    ('locations', 'locations'),
+    ('experiments', 'experiments'),
+    ('tests', 'tests'),
+    ('users', 'users'),
+]
+
+# PostgreSQL allows a transition table only on single-event triggers
+EVENTS = [
+    ('insert', 'INSERT', 'NEW'),
+    ('update', 'UPDATE', 'NEW'),
+    ('delete', 'DELETE', 'OLD'),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, _ in NOTIFY_TABLES:
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_notify_change ON {table}')
+
+    # One notification per chunk of ids instead of one per row, so a bulk
+    # import or batch update costs a handful of notifications. Statements
+    # that touch no rows send nothing.
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION freelims_notify_change() RETURNS trigger AS $$
+        DECLARE
+            chunk integer[];
+        BEGIN
+            FOR chunk IN
+                SELECT array_agg(id ORDER BY id)
+                FROM (
+                    SELECT id, (row_number() OVER (ORDER BY id) - 1) / {IDS_PER_NOTIFICATION} AS part
+                    FROM changed_rows
+                ) numbered
+                GROUP BY part
+            LOOP
+                PERFORM pg_notify('{CHANNEL}', json_build_object(
+                    'resource', TG_ARGV[0],
+                    'action', CASE TG_OP WHEN 'INSERT' THEN 'create' WHEN 'UPDATE' THEN 'update' ELSE 'delete' END,
+                    'ids', chunk
+                )::text);
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table, resource in NOTIFY_TABLES:
+        for suffix, event, transition in EVENTS:
+            op.execute(f"""
+                CREATE TRIGGER {table}_notify_{suffix}
+                AFTER {event} ON {table}
+                REFERENCING {transition} TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION freelims_notify_change('{resource}')
+            """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, _ in reversed(NOTIFY_TABLES):
+        for suffix, _, _ in EVENTS:
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_notify_{suffix} ON {table}')
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION freelims_notify_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{CHANNEL}', json_build_object(
+                'resource', TG_ARGV[0],
+                'action', CASE TG_OP WHEN 'INSERT' THEN 'create' WHEN 'UPDATE' THEN 'update' ELSE 'delete' END,
+                'id', CASE TG_OP WHEN 'DELETE' THEN OLD.id ELSE NEW.id END
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table, resource in NOTIFY_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_change
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION freelims_notify_change('{resource}')
+        """)
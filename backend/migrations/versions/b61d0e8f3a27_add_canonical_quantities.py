@@ -0,0 +1,42 @@
+"""add_canonical_quantities
+
+Revision ID: b61d0e8f3a27
+Revises: a9c47e2f5b18
+Create Date: 2026-10-16 19:26:11.640592
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b61d0e8f3a27'
+down_revision = 'a9c47e2f5b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('chemicals', sa.Column('density', sa.Float(), nullable=True))
+    op.add_column('inventory_items', sa.Column('canonical_quantity', sa.Float(), nullable=True))
+    op.add_column('inventory_items', sa.Column('canonical_unit', sa.String(), nullable=True))
+
+    # Backfill with the application's unit registry, one UPDATE per distinct unit
+    from app.units import to_canonical
+    bind = op.get_bind()
+    units = [row[0] for row in bind.execute(sa.text('SELECT DISTINCT unit FROM inventory_items'))]
+    for unit in units:
+        factor, canonical_unit = to_canonical(1.0, unit)
+        bind.execute(
+            sa.text(
+                'UPDATE inventory_items SET canonical_quantity = COALESCE(quantity, 0) * :factor, '
+                'canonical_unit = :canonical_unit WHERE unit IS NOT DISTINCT FROM :unit'
+            ),
+            {'factor': factor, 'canonical_unit': canonical_unit, 'unit': unit},
+        )
+
+
+def downgrade() -> None:
+    op.drop_column('inventory_items', 'canonical_unit')
+    op.drop_column('inventory_items', 'canonical_quantity')
+    op.drop_column('chemicals', 'density')
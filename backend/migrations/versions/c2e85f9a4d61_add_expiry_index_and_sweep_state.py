@@ -0,0 +1,35 @@
+"""add_expiry_index_and_sweep_state
+
+Revision ID: c2e85f9a4d61
+Revises: b61d0e8f3a27
+Create Date: 2026-10-16 20:48:02.377915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e85f9a4d61'
+down_revision = 'b61d0e8f3a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_inventory_items_expiration_date'), 'inventory_items', ['expiration_date'], unique=False)
+
+    state = op.create_table('expiry_sweep_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('expiring_through', sa.DateTime(), nullable=True),
+        sa.Column('expired_through', sa.DateTime(), nullable=True),
+        sa.Column('swept_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # The sweeper locks this row, so it must exist before several workers start
+    op.bulk_insert(state, [{'id': 1}])
+
+
+def downgrade() -> None:
+    op.drop_table('expiry_sweep_state')
+    op.drop_index(op.f('ix_inventory_items_expiration_date'), table_name='inventory_items')
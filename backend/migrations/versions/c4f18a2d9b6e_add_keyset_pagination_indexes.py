@@ -0,0 +1,30 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: c4f18a2d9b6e
+Revises: a7e231584c82
+Create Date: 2026-10-16 09:12:44.201318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f18a2d9b6e'
+down_revision = 'a7e231584c82'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_inventory_changes_timestamp_id', 'inventory_changes', ['timestamp', 'id'])
+    op.create_index('ix_inventory_changes_item_timestamp_id', 'inventory_changes', ['inventory_item_id', 'timestamp', 'id'])
+    op.create_index('ix_inventory_audits_timestamp_id', 'inventory_audits', ['timestamp', 'id'])
+    op.create_index('ix_inventory_audits_item_timestamp_id', 'inventory_audits', ['inventory_item_id', 'timestamp', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_inventory_audits_item_timestamp_id', table_name='inventory_audits')
+    op.drop_index('ix_inventory_audits_timestamp_id', table_name='inventory_audits')
+    op.drop_index('ix_inventory_changes_item_timestamp_id', table_name='inventory_changes')
+    op.drop_index('ix_inventory_changes_timestamp_id', table_name='inventory_changes')
@@ -0,0 +1,24 @@
+"""add_inventory_item_version
+
+Revision ID: d4a93b7c2e50
+Revises: c2e85f9a4d61
+Create Date: 2026-10-16 22:03:19.845120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a93b7c2e50'
+down_revision = 'c2e85f9a4d61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('inventory_items', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('inventory_items', 'version')
@@ -0,0 +1,58 @@
+"""add_search_indexes
+
+Revision ID: d82b5e7c1f30
+Revises: c4f18a2d9b6e
+Create Date: 2026-10-16 11:03:27.519842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd82b5e7c1f30'
+down_revision = 'c4f18a2d9b6e'
+branch_labels = None
+depends_on = None
+
+# Columns searched with substring ILIKE / similarity, indexed with pg_trgm
+TRIGRAM_INDEXES = [
+    ('ix_chemicals_name_trgm', 'chemicals', 'name'),
+    ('ix_chemicals_cas_number_trgm', 'chemicals', 'cas_number'),
+    ('ix_chemicals_formula_trgm', 'chemicals', 'formula'),
+    ('ix_inventory_items_batch_number_trgm', 'inventory_items', 'batch_number'),
+]
+
+
+def upgrade() -> None:
+    # Search indexes are PostgreSQL specific; other backends use the ILIKE fallback
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(name, table, [column], postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+    # Full-text index on the description; must match app.search.description_tsvector()
+    op.create_index(
+        'ix_chemicals_description_fts',
+        'chemicals',
+        [sa.text("to_tsvector('english', coalesce(description, ''))")],
+        postgresql_using='gin',
+    )
+    # Prefix typeahead for terms too short for trigrams
+    op.create_index(
+        'ix_chemicals_name_lower_prefix',
+        'chemicals',
+        [sa.text('lower(name) text_pattern_ops')],
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_chemicals_name_lower_prefix', table_name='chemicals')
+    op.drop_index('ix_chemicals_description_fts', table_name='chemicals')
+    for name, table, _ in reversed(TRIGRAM_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,64 @@
+"""add_change_notify_triggers
+
+Revision ID: e5a19c3f7d42
+Revises: d82b5e7c1f30
+Create Date: 2026-10-16 14:22:08.310457
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a19c3f7d42'
+down_revision = 'd82b5e7c1f30'
+branch_labels = None
+depends_on = None
+
+# Must match app.change_bus.CHANGE_CHANNEL
+CHANNEL = 'freelims_changes'
+
+# Tables whose row changes are relayed to Socket.IO, and the resource they belong to
+NOTIFY_TABLES = [
+    ('inventory_items', 'inventory'),
+    ('locations', 'locations'),
+    ('experiments', 'experiments'),
+    ('tests', 'tests'),
+    ('users', 'users'),
+]
+
+
+def upgrade() -> None:
+    # LISTEN/NOTIFY is PostgreSQL specific; other backends notify in-process
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Payload is kept to the resource, action and id, well below the 8000 byte
+    # NOTIFY limit. Identical notifications in one transaction are folded by
+    # PostgreSQL and delivered only after commit.
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION freelims_notify_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{CHANNEL}', json_build_object(
+                'resource', TG_ARGV[0],
+                'action', CASE TG_OP WHEN 'INSERT' THEN 'create' WHEN 'UPDATE' THEN 'update' ELSE 'delete' END,
+                'id', CASE TG_OP WHEN 'DELETE' THEN OLD.id ELSE NEW.id END
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table, resource in NOTIFY_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify_change
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION freelims_notify_change('{resource}')
+        """)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, _ in reversed(NOTIFY_TABLES):
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_notify_change ON {table}')
+    op.execute('DROP FUNCTION IF EXISTS freelims_notify_change()')
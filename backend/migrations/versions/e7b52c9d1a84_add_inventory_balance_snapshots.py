@@ -0,0 +1,55 @@
+"""add_inventory_balance_snapshots
+
+Revision ID: e7b52c9d1a84
+Revises: d4a93b7c2e50
+Create Date: 2026-10-16 23:12:41.530218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b52c9d1a84'
+down_revision = 'd4a93b7c2e50'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('inventory_balance_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('inventory_item_id', sa.Integer(), nullable=False),
+        sa.Column('taken_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('quantity', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['inventory_item_id'], ['inventory_items.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('inventory_item_id', 'taken_at', name='uq_inventory_balance_snapshots_item_taken_at')
+    )
+    op.create_index(op.f('ix_inventory_balance_snapshots_id'), 'inventory_balance_snapshots', ['id'], unique=False)
+
+    # Items whose history predates the ledger get an opening entry, so the sum
+    # of an item's changes always equals its quantity. It is dated when the
+    # item was created or at its first change, whichever is older, so balances
+    # as of earlier dates include it
+    op.execute("""
+        INSERT INTO inventory_changes (inventory_item_id, change_amount, reason, timestamp)
+        SELECT items.id,
+               COALESCE(items.quantity, 0) - COALESCE(SUM(changes.change_amount), 0),
+               'Opening balance',
+               COALESCE(
+                   CASE WHEN MIN(changes.timestamp) IS NULL OR MIN(changes.timestamp) > items.created_at
+                        THEN items.created_at ELSE MIN(changes.timestamp) END,
+                   CURRENT_TIMESTAMP
+               )
+        FROM inventory_items AS items
+        LEFT JOIN inventory_changes AS changes ON changes.inventory_item_id = items.id
+        GROUP BY items.id, items.quantity, items.created_at
+        HAVING ABS(COALESCE(items.quantity, 0) - COALESCE(SUM(changes.change_amount), 0)) > 1e-9
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM inventory_changes WHERE reason = 'Opening balance' AND user_id IS NULL")
+    op.drop_index(op.f('ix_inventory_balance_snapshots_id'), table_name='inventory_balance_snapshots')
+    op.drop_table('inventory_balance_snapshots')
@@ -0,0 +1,48 @@
+"""add_delta_sync_tables
+
+Revision ID: f3b8d21a6c94
+Revises: e5a19c3f7d42
+Create Date: 2026-10-16 16:41:53.902716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d21a6c94'
+down_revision = 'e5a19c3f7d42'
+branch_labels = None
+depends_on = None
+
+# Tables read by GET /api/sync, indexed on both change timestamps
+SYNC_TABLES = ['inventory_items', 'chemicals', 'locations']
+
+
+def upgrade() -> None:
+    op.add_column('locations', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+    op.add_column('locations', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    for table in SYNC_TABLES:
+        op.create_index(f'ix_{table}_created_at', table, ['created_at'])
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'])
+
+    op.create_table('deleted_records',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('resource', sa.String(), nullable=False),
+        sa.Column('record_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_deleted_records_id'), 'deleted_records', ['id'], unique=False)
+    op.create_index('ix_deleted_records_resource_deleted_at', 'deleted_records', ['resource', 'deleted_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_deleted_records_resource_deleted_at', table_name='deleted_records')
+    op.drop_index(op.f('ix_deleted_records_id'), table_name='deleted_records')
+    op.drop_table('deleted_records')
+    for table in reversed(SYNC_TABLES):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        op.drop_index(f'ix_{table}_created_at', table_name=table)
+    op.drop_column('locations', 'updated_at')
+    op.drop_column('locations', 'created_at')
@@ -1,9 +1,10 @@
-import React, { useEffect } from 'react';
+import React, { useEffect, useRef } from 'react';
 import { Button, Typography, Box, Paper } from '@mui/material';
 import { useSocket } from './contexts/SocketContext';
 
 const SocketDebug: React.FC = () => {
-  const { connected, socket, subscribeToResource } = useSocket();
+  const { connected, socket, subscribeToResource, unsubscribeFromResource } = useSocket();
+  const subscribed = useRef(false);
   
   useEffect(() => {
     // Log API URL from environment
@@ -18,8 +19,18 @@ const SocketDebug: React.FC = () => {
     }
   }, [connected, socket]);
   
+  // Release the subscription made with the button when the page unmounts
+  useEffect(() => () => {
+    if (subscribed.current) {
+      unsubscribeFromResource('inventory');
+    }
+  }, [unsubscribeFromResource]);
+
   const handleSubscribe = () => {
-    subscribeToResource('inventory');
+    if (!subscribed.current) {
+      subscribed.current = true;
+      subscribeToResource('inventory');
+    }
   };
   
   const handleTestEmit = () => {
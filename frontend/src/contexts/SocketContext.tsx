@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useEffect, useState, ReactNode } from 'react';
+import React, { createContext, useCallback, useContext, useEffect, useRef, useState, ReactNode } from 'react';
 import { io, Socket } from 'socket.io-client';
 import { useQueryClient } from 'react-query';
 import { useAuth } from './AuthContext';
@@ -17,6 +17,21 @@ const API_URL = process.env.REACT_APP_API_URL || '';
 const BASE_URL = API_URL.replace(/\/api$/, '');
 const WS_URL = BASE_URL || 'http://localhost:8001';
 
+// Resources whose updates invalidate cached queries, by Socket.IO room
+const RESOURCE_QUERIES: Record<string, string> = {
+  inventory: 'inventory',
+  experiments: 'experiments',
+  tests: 'tests',
+  users: 'users',
+  locations: 'locations',
+};
+
+// Position in a resource's update stream, from `seq`/`stream` in server events
+interface StreamPosition {
+  stream: string;
+  seq: number;
+}
+
 // Create context with default values
 const SocketContext = createContext<SocketContextType | undefined>(undefined);
 
@@ -35,6 +50,13 @@ export const SocketProvider: React.FC<{ children: ReactNode }> = ({ children })
   const [connected, setConnected] = useState(false);
   const { isAuthenticated } = useAuth();
   const queryClient = useQueryClient();
+  // Rooms pages have asked for, with the number of pages holding each one.
+  // The server drops a socket's rooms when it disconnects, so these are
+  // joined again on every connect.
+  const subscriptions = useRef<Map<string, number>>(new Map());
+  // Last event seen per subscribed resource, sent back with `resume` after a
+  // reconnect so the server can replay what was missed
+  const positions = useRef<Map<string, StreamPosition>>(new Map());
 
   // Initialize socket connection when authenticated
   useEffect(() => {
@@ -62,6 +84,14 @@ export const SocketProvider: React.FC<{ children: ReactNode }> = ({ children })
     socketIo.on('connect', () => {
       console.log('Socket.IO connected with ID:', socketIo.id);
       setConnected(true);
+      subscriptions.current.forEach((_, resource) => {
+        const position = positions.current.get(resource);
+        if (position) {
+          socketIo.emit('resume', { resource, last_seq: position.seq, stream: position.stream });
+        } else {
+          socketIo.emit('subscribe', { resource });
+        }
+      });
     });
 
     socketIo.on('disconnect', () => {
@@ -74,30 +104,37 @@ export const SocketProvider: React.FC<{ children: ReactNode }> = ({ children })
       setConnected(false);
     });
 
-    // Set up event listeners for various resource updates
-    socketIo.on('inventory_updated', (data) => {
-      console.log('Inventory updated:', data);
-      queryClient.invalidateQueries('inventory');
-    });
-
-    socketIo.on('experiments_updated', (data) => {
-      console.log('Experiments updated:', data);
-      queryClient.invalidateQueries('experiments');
-    });
-
-    socketIo.on('tests_updated', (data) => {
-      console.log('Tests updated:', data);
-      queryClient.invalidateQueries('tests');
-    });
+    // Remember the newest event of a stream; a new stream starts over
+    const remember = (resource: string, data: any) => {
+      if (!data || typeof data.seq !== 'number' || !data.stream) {
+        return;
+      }
+      const position = positions.current.get(resource);
+      if (!position || position.stream !== data.stream || data.seq > position.seq) {
+        positions.current.set(resource, { stream: data.stream, seq: data.seq });
+      }
+    };
 
-    socketIo.on('users_updated', (data) => {
-      console.log('Users updated:', data);
-      queryClient.invalidateQueries('users');
+    socketIo.on('subscription_success', (data) => remember(data?.resource, data));
+    socketIo.on('resume_success', (data) => remember(data?.resource, data));
+
+    // The missed events are no longer buffered (or the backend restarted), so
+    // reload the resource and continue from the server's current position
+    socketIo.on('resync_required', (data) => {
+      const resource = data?.resource;
+      console.log(`${resource} must be reloaded:`, data);
+      positions.current.delete(resource);
+      remember(resource, data);
+      queryClient.invalidateQueries(RESOURCE_QUERIES[resource] || resource);
     });
 
-    socketIo.on('locations_updated', (data) => {
-      console.log('Locations updated:', data);
-      queryClient.invalidateQueries('locations');
+    // Set up event listeners for various resource updates
+    Object.entries(RESOURCE_QUERIES).forEach(([resource, queryKey]) => {
+      socketIo.on(`${resource}_updated`, (data) => {
+        console.log(`${resource} updated:`, data);
+        remember(resource, data);
+        queryClient.invalidateQueries(queryKey);
+      });
     });
 
     // Store the socket instance
@@ -112,23 +149,37 @@ export const SocketProvider: React.FC<{ children: ReactNode }> = ({ children })
     };
   }, [isAuthenticated, queryClient]);
 
-  // Function to subscribe to updates for a specific resource
-  const subscribeToResource = (resource: string) => {
-    if (socket && connected) {
+  // Function to subscribe to updates for a specific resource. Pages call
+  // this on mount and unsubscribeFromResource on unmount; the room is joined
+  // now if connected, otherwise on the next connect
+  const subscribeToResource = useCallback((resource: string) => {
+    const count = subscriptions.current.get(resource) || 0;
+    subscriptions.current.set(resource, count + 1);
+    if (count === 0 && socket && socket.connected) {
       console.log(`Subscribing to ${resource} updates`);
       socket.emit('subscribe', { resource });
-    } else {
-      console.warn(`Cannot subscribe to ${resource}: socket disconnected`);
     }
-  };
+  }, [socket]);
 
-  // Function to unsubscribe from updates for a specific resource
-  const unsubscribeFromResource = (resource: string) => {
-    if (socket && connected) {
+  // Function to unsubscribe from updates for a specific resource. The room
+  // is left once no page holds it any more
+  const unsubscribeFromResource = useCallback((resource: string) => {
+    const count = subscriptions.current.get(resource) || 0;
+    if (count === 0) {
+      return;
+    }
+    if (count > 1) {
+      subscriptions.current.set(resource, count - 1);
+      return;
+    }
+    subscriptions.current.delete(resource);
+    // Events are missed from here on, so a later subscribe starts afresh
+    positions.current.delete(resource);
+    if (socket && socket.connected) {
       console.log(`Unsubscribing from ${resource} updates`);
       socket.emit('unsubscribe', { resource });
     }
-  };
+  }, [socket]);
 
   return (
     <SocketContext.Provider value={{ socket, connected, subscribeToResource, unsubscribeFromResource }}>
@@ -84,7 +84,7 @@ const Inventory: React.FC = () => {
   const [error, setError] = useState<string | null>(null);
   const [success, setSuccess] = useState<string | null>(null);
   const [apiError, setApiError] = useState<boolean>(false);
-  const { connected, subscribeToResource } = useSocket();
+  const { subscribeToResource, unsubscribeFromResource } = useSocket();
   const queryClient = useQueryClient();
 
   const [newItem, setNewItem] = useState({
@@ -201,13 +201,11 @@ const Inventory: React.FC = () => {
     refreshData();
   }, []);
 
-  // Subscribe to inventory updates when socket is connected
+  // Receive inventory updates while this page is mounted
   useEffect(() => {
-    if (connected) {
-      console.log('Subscribing to inventory updates');
-      subscribeToResource('inventory');
-    }
-  }, [connected, subscribeToResource]);
+    subscribeToResource('inventory');
+    return () => unsubscribeFromResource('inventory');
+  }, [subscribeToResource, unsubscribeFromResource]);
 
   // Use React Query for inventory data
   const { isLoading: inventoryLoading, error: inventoryError, data: inventoryData } = useQuery(
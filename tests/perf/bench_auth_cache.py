@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Requests/sec on GET /api/inventory/items with the authenticated-user cache
+on and off.
+
+Requests carry a real JWT, so every request goes through get_current_user.
+With the cache off each request pays an extra `users` query; with it on the
+principal is reused for AUTH_CACHE_TTL_SECONDS. A small per-statement delay
+(--latency-ms) stands in for the network round trip to PostgreSQL.
+
+Usage:
+    python tests/perf/bench_auth_cache.py [--clients 20] [--requests 50] [--latency-ms 1]
+"""
+
+import argparse
+import asyncio
+import json
+
+import benchlib
+from app.auth import create_access_token, user_cache
+from app.database import configure_db_threadpool
+from app.models import Chemical, InventoryItem, Location, User
+from app.routers.inventory import router as inventory_router
+
+
+def seed(SessionLocal, items):
+    db = SessionLocal()
+    db.add(User(email="bench@example.com", username="bench", full_name="Bench", hashed_password="x"))
+    db.add(Chemical(name="Acetone", cas_number="67-64-1"))
+    db.add(Location(name="Flammables cabinet"))
+    db.flush()
+    db.add_all([InventoryItem(chemical_id=1, location_id=1, quantity=1.0, unit="L") for _ in range(items)])
+    db.commit()
+    db.close()
+
+
+async def measure(app, headers, clients, requests_per_client):
+    configure_db_threadpool()
+    latencies, elapsed = await benchlib.run_clients(
+        app, ["/api/inventory/items?limit=20"], clients, requests_per_client, headers=headers
+    )
+    return benchlib.summarize(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="simulated DB latency per statement")
+    args = parser.parse_args()
+
+    engine = benchlib.create_sqlite_engine()
+    app, SessionLocal = benchlib.build_app(engine, (inventory_router, "/api/inventory"), authenticate=True)
+    seed(SessionLocal, 100)
+    benchlib.add_query_latency(engine, args.latency_ms)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench'})}"}
+
+    results = {}
+    for label, ttl in (("cache_off", 0), ("cache_on", 30)):
+        user_cache.ttl_seconds = ttl
+        user_cache.clear()
+        results[label] = asyncio.run(measure(app, headers, args.clients, args.requests))
+        results[label]["cache"] = user_cache.stats()
+
+    print(json.dumps({"clients": args.clients, "latency_ms": args.latency_ms, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
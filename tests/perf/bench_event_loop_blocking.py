@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tail latency of the API under 50 parallel clients, before and after moving
+blocking SQLAlchemy work off the event loop.
+
+"before" mounts an `async def` copy of the old location audit log handler,
+which runs the synchronous Session query directly on the event loop.
+"after" mounts the real `app.routers.locations` router, whose handlers are
+plain `def` functions executed in the configured DB thread pool.
+
+Each client alternates between the audit log listing and `/api/health`, so
+the health-check latency shows how much unrelated requests stall.
+
+Usage:
+    python tests/perf/bench_event_loop_blocking.py [--clients 50] [--latency-ms 20]
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+import benchlib
+from app.database import get_db, configure_db_threadpool
+from app.models import Location, LocationAudit, User
+from app.routers.locations import router as locations_router
+from app.schemas import LocationAudit as LocationAuditSchema
+
+legacy_router = APIRouter()
+
+
+@legacy_router.get("/audit-logs/", response_model=List[LocationAuditSchema])
+async def legacy_get_location_audit_logs(
+    location_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+):
+    """The pre-threadpool handler: blocking query inside a coroutine."""
+    query = db.query(LocationAudit).join(User, LocationAudit.user_id == User.id)
+    if location_id:
+        query = query.filter(LocationAudit.location_id == location_id)
+    return query.order_by(LocationAudit.timestamp.desc()).offset(skip).limit(limit).all()
+
+
+def seed(SessionLocal, audit_rows):
+    db = SessionLocal()
+    user = User(email="bench@example.com", username="bench", full_name="Bench", hashed_password="x")
+    location = Location(name="Freezer 3", description="Benchmark location")
+    db.add_all([user, location])
+    db.flush()
+    db.add_all([
+        LocationAudit(location_id=location.id, user_id=user.id, field_name="description",
+                      old_value=str(n), new_value=str(n + 1), action="UPDATE")
+        for n in range(audit_rows)
+    ])
+    db.commit()
+    db.close()
+
+
+async def measure(app, clients, requests_per_client):
+    configure_db_threadpool()
+    paths = ["/api/locations/audit-logs/?limit=50", "/api/health"]
+    latencies, elapsed = await benchlib.run_clients(app, paths, clients, requests_per_client)
+    return benchlib.summarize(latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated DB latency per statement")
+    parser.add_argument("--audit-rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = {}
+    for label, router in (("before", legacy_router), ("after", locations_router)):
+        engine = benchlib.create_sqlite_engine()
+        app, SessionLocal = benchlib.build_app(engine, (router, "/api/locations"))
+        seed(SessionLocal, args.audit_rows)
+        benchlib.add_query_latency(engine, args.latency_ms)
+        results[label] = asyncio.run(measure(app, args.clients, args.requests))
+
+    print(json.dumps({"clients": args.clients, "latency_ms": args.latency_ms, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Offset versus keyset paging of GET /api/inventory/audit.
+
+Seeds `--rows` inventory audit rows, then times page 1 and page `--page`
+(default 10,000) of the newest-first audit listing, once with `skip` and once
+with the `after` cursor. The cursor for the deep page is read from the row at
+that offset, which is what a client would hold after walking there.
+
+Usage:
+    python tests/perf/bench_keyset_pagination.py --rows 5000000
+    python tests/perf/bench_keyset_pagination.py --database-url postgresql://user:pw@localhost/freelims_bench
+
+Point --database-url at a scratch database: the FreeLIMS tables are created
+and filled there.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import create_engine, insert, select, func
+
+import benchlib
+from app.database import Base
+from app.models import Chemical, InventoryAudit, InventoryItem, Location, User
+from app.pagination import encode_cursor
+from app.routers.inventory import router as inventory_router
+
+
+def seed(engine, rows, chunk=20000):
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(InventoryAudit)).scalar() >= rows:
+            return
+        user_id = conn.execute(insert(User).values(
+            email="bench@example.com", username="bench", full_name="Bench", hashed_password="x"
+        ).returning(User.id)).scalar()
+        chemical_id = conn.execute(insert(Chemical).values(name="Acetone", cas_number="67-64-1").returning(Chemical.id)).scalar()
+        location_id = conn.execute(insert(Location).values(name="Freezer 3").returning(Location.id)).scalar()
+        item_id = conn.execute(insert(InventoryItem).values(
+            chemical_id=chemical_id, location_id=location_id, quantity=1.0, unit="L"
+        ).returning(InventoryItem.id)).scalar()
+
+    start = datetime(2020, 1, 1)
+    for offset in range(0, rows, chunk):
+        batch = [
+            {
+                "inventory_item_id": item_id,
+                "user_id": user_id,
+                "field_name": "quantity",
+                "old_value": str(n),
+                "new_value": str(n + 1),
+                "action": "UPDATE",
+                "timestamp": start + timedelta(seconds=n),
+            }
+            for n in range(offset, min(offset + chunk, rows))
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(InventoryAudit), batch)
+
+
+def cursor_at(engine, offset):
+    """The cursor a client would hold after reading `offset` rows."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(InventoryAudit.timestamp, InventoryAudit.id)
+            .order_by(InventoryAudit.timestamp.desc(), InventoryAudit.id.desc())
+            .offset(offset - 1).limit(1)
+        ).one()
+    return encode_cursor([row.timestamp, row.id])
+
+
+async def time_requests(app, paths, repeat):
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, path in paths.items():
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = await client.get(path)
+                samples.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+            results[label] = {"median_ms": round(statistics.median(samples), 2), "min_ms": round(min(samples), 2)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000000)
+    parser.add_argument("--page", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+        Base.metadata.create_all(bind=engine)
+    else:
+        engine = benchlib.create_sqlite_engine()
+
+    seed(engine, args.rows)
+    app, _ = benchlib.build_app(engine, (inventory_router, "/api/inventory"))
+
+    deep_offset = (args.page - 1) * args.limit
+    if deep_offset >= args.rows:
+        parser.error("--page is past the end of the seeded rows")
+    cursor = cursor_at(engine, deep_offset)
+    paths = {
+        "offset_page_1": f"/api/inventory/audit?limit={args.limit}",
+        f"offset_page_{args.page}": f"/api/inventory/audit?limit={args.limit}&skip={deep_offset}",
+        "keyset_page_1": f"/api/inventory/audit?limit={args.limit}",
+        f"keyset_page_{args.page}": f"/api/inventory/audit?limit={args.limit}&after={cursor}",
+    }
+    results = asyncio.run(time_requests(app, paths, args.repeat))
+    print(json.dumps({"rows": args.rows, "limit": args.limit, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Bytes sent per inventory update with Socket.IO broadcast versus per-resource
+rooms.
+
+Registers --clients fake connections with the real Socket.IO server, of which
+--subscribers join the `inventory` room, then emits --updates inventory
+updates both ways. Outgoing Engine.IO packets are counted instead of written
+to a socket, so the numbers are exactly what the server would put on the wire.
+
+Usage:
+    python tests/perf/bench_socketio_fanout.py [--clients 150] [--subscribers 10] [--updates 100]
+"""
+
+import argparse
+import asyncio
+import json
+
+import benchlib  # noqa: F401  (puts the backend on sys.path)
+from app import websockets
+
+
+class PacketCounter:
+    def __init__(self):
+        self.packets = 0
+        self.bytes = 0
+
+    async def __call__(self, eio_sid, eio_pkt):
+        encoded = eio_pkt.encode()
+        self.packets += 1
+        self.bytes += len(encoded.encode() if isinstance(encoded, str) else encoded)
+
+
+async def connect_clients(clients, subscribers):
+    websockets.sio._send_eio_packet = PacketCounter()
+    sids = [await websockets.sio.manager.connect(f"eio-{n}", "/") for n in range(clients)]
+    for sid in sids[:subscribers]:
+        await websockets.subscribe(sid, {"resource": "inventory"})
+    return sids
+
+
+async def measure(updates, room):
+    counter = PacketCounter()
+    websockets.sio._send_eio_packet = counter
+    payload = {
+        "action": "update",
+        "resource": "inventory",
+        "data": {"id": 42, "chemical_id": 7, "location_id": 3, "quantity": 12.5, "unit": "L"},
+    }
+    for _ in range(updates):
+        await websockets.sio.emit("inventory_updated", payload, room=room)
+    return {
+        "packets": counter.packets,
+        "bytes": counter.bytes,
+        "bytes_per_update": round(counter.bytes / updates, 1),
+    }
+
+
+async def run(args):
+    await connect_clients(args.clients, args.subscribers)
+    return {
+        "clients": args.clients,
+        "subscribers": args.subscribers,
+        "updates": args.updates,
+        "broadcast": await measure(args.updates, None),
+        "rooms": await measure(args.updates, "inventory"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=150)
+    parser.add_argument("--subscribers", type=int, default=10, help="clients subscribed to inventory")
+    parser.add_argument("--updates", type=int, default=100)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the FreeLIMS backend benchmarks.
+
+The benchmarks drive the real routers in-process through httpx's ASGI
+transport against a throwaway SQLite database, so they can run on a laptop
+without PostgreSQL. Use the numbers to compare code paths, not as absolute
+capacity figures for the production server.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Make the backend package importable
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, get_db
+from app.auth import get_current_user, get_current_active_user, get_current_admin_user
+
+
+def create_sqlite_engine(path=None):
+    """Create a file-backed SQLite engine with the full FreeLIMS schema."""
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="freelims_bench_", suffix=".db")
+        os.close(fd)
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=64,
+        max_overflow=0,
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def add_query_latency(engine, latency_ms):
+    """Simulate a slow database server by sleeping before every statement."""
+    delay = latency_ms / 1000.0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _sleep(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(delay)
+
+
+def bench_user(user_id=1, is_admin=True):
+    """A stand-in for the authenticated user so benchmarks skip JWT handling."""
+    return SimpleNamespace(id=user_id, username="bench", is_active=True, is_admin=is_admin)
+
+
+def build_app(engine, *routers, authenticate=False):
+    """Build a FastAPI app with the given (router, prefix) pairs bound to `engine`."""
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def _get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    for router, prefix in routers:
+        app.include_router(router, prefix=prefix)
+
+    @app.get("/api/health")
+    def health_check():
+        return {"status": "healthy"}
+
+    app.dependency_overrides[get_db] = _get_db
+    if not authenticate:
+        user = bench_user()
+        app.dependency_overrides[get_current_user] = lambda: user
+        app.dependency_overrides[get_current_active_user] = lambda: user
+        app.dependency_overrides[get_current_admin_user] = lambda: user
+    return app, SessionLocal
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies, elapsed=None):
+    """Latency summary in milliseconds."""
+    ms = [value * 1000 for value in latencies]
+    summary = {
+        "requests": len(ms),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "max_ms": round(max(ms), 2) if ms else 0.0,
+    }
+    if elapsed:
+        summary["requests_per_sec"] = round(len(ms) / elapsed, 1)
+    return summary
+
+
+async def run_clients(app, paths, clients=50, requests_per_client=10, headers=None):
+    """Run `clients` concurrent workers, each issuing `requests_per_client` GETs.
+
+    `paths` is cycled per worker so mixed workloads can be expressed as a list.
+    Returns (latencies_in_seconds, elapsed_seconds).
+    """
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        async def worker(index):
+            for n in range(requests_per_client):
+                path = paths[(index + n) % len(paths)]
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, elapsed
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Mixed-workload load test of the REST API.
+
+A pool of `--clients` asyncio workers share one httpx connection pool. Each
+logs in as its own seeded user, then issues requests back to back (closed
+loop, optionally with `--think-ms` between them) for `--duration` seconds,
+picking each operation at random with the `--mix` weights:
+
+    typeahead  GET  /api/chemicals/search?q=<stem prefix>
+    search     GET  /api/inventory/items?search=<stem>
+    list       GET  /api/inventory/items, by location, following X-Next-Cursor
+    audit      GET  /api/inventory/audit, following X-Next-Cursor
+    change     POST /api/inventory/changes, +1 then -1 on the same item
+    login      POST /api/token (bcrypt)
+
+Requests started during the first `--warmup` seconds are not measured. The
+JSON report has throughput and p50/p95/p99 latency overall and per
+operation, error counts by status, the git revision and the run settings.
+Write it with `--output` and pass an earlier report as `--baseline` to add
+the relative change of every figure, e.g. between two releases run against
+the same seeded database.
+
+The target is either a running server (`--base-url`) or the routers mounted
+in-process against `--database-url`. Both need a database seeded by
+seed_loadtest.py at `--scale`. Without either, a temporary SQLite database
+is seeded at `--scale` (use `smoke`) for a quick check of the harness.
+
+Usage:
+    python tests/perf/loadtest.py --duration 10
+    python tests/perf/loadtest.py --base-url http://localhost:8000 --scale 100k --clients 100 --output v1.4.json
+    python tests/perf/loadtest.py --base-url http://localhost:8000 --scale 100k --clients 100 --baseline v1.4.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import create_engine
+
+import benchlib
+from app.database import configure_db_threadpool
+from app.routers.auth import router as auth_router
+from app.routers.chemicals import router as chemicals_router
+from app.routers.inventory import router as inventory_router
+from seed_loadtest import GRADES, LOADTEST_PASSWORD, SCALES, STEMS, seed
+
+DEFAULT_MIX = "typeahead=15,search=15,list=25,audit=20,change=20,login=5"
+
+# Pages a worker follows through a listing before starting over
+LIST_PAGES = 5
+AUDIT_PAGES = 10
+
+
+def parse_mix(value):
+    """'name=weight,...' -> {name: weight}, checked against the known operations."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"weight of {name!r} is not a number")
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("at least one operation needs a positive weight")
+    return mix
+
+
+class Worker:
+    """One simulated user: its token, RNG and position in paged listings."""
+
+    def __init__(self, index, scale, users, seed):
+        self.index = index
+        self.scale = scale
+        self.username = f"load{index % users}"
+        self.users = users
+        self.rng = random.Random(seed * 100003 + index)
+        self.headers = {}
+        self.list_cursor = None
+        self.list_location = None
+        self.list_pages = 0
+        self.audit_cursor = None
+        self.audit_item = None
+        self.audit_pages = 0
+        # Item that got +1 and is owed a -1, so quantities do not drift
+        self.pending_item = None
+
+    def item_id(self):
+        return 1 + self.rng.randrange(self.scale["items"])
+
+    async def login(self, client, username=None):
+        return await client.post(
+            "/api/token", data={"username": username or self.username, "password": LOADTEST_PASSWORD}
+        )
+
+
+async def op_typeahead(client, worker):
+    stem = worker.rng.choice(STEMS)
+    term = stem[:worker.rng.randint(3, len(stem))]
+    return await client.get("/api/chemicals/search", params={"q": term}, headers=worker.headers)
+
+
+async def op_search(client, worker):
+    term = worker.rng.choice(STEMS)
+    if worker.rng.random() < 0.5:
+        term = f"{term} {worker.rng.choice(GRADES)}"
+    return await client.get("/api/inventory/items", params={"search": term, "limit": 50}, headers=worker.headers)
+
+
+async def op_list(client, worker):
+    if worker.list_cursor is None:
+        worker.list_location = 1 + worker.rng.randrange(worker.scale["locations"])
+        worker.list_pages = 0
+    params = {"limit": 50, "location_id": worker.list_location}
+    if worker.list_cursor:
+        params["after"] = worker.list_cursor
+    response = await client.get("/api/inventory/items", params=params, headers=worker.headers)
+    worker.list_pages += 1
+    next_cursor = response.headers.get("x-next-cursor")
+    worker.list_cursor = next_cursor if next_cursor and worker.list_pages < LIST_PAGES else None
+    return response
+
+
+async def op_audit(client, worker):
+    if worker.audit_cursor is None:
+        # A third of the browsing is one item's history, the rest the whole log
+        worker.audit_item = worker.item_id() if worker.rng.random() < 1 / 3 else None
+        worker.audit_pages = 0
+    params = {"limit": 100}
+    if worker.audit_item:
+        params["inventory_item_id"] = worker.audit_item
+    if worker.audit_cursor:
+        params["after"] = worker.audit_cursor
+    response = await client.get("/api/inventory/audit", params=params, headers=worker.headers)
+    worker.audit_pages += 1
+    next_cursor = response.headers.get("x-next-cursor")
+    worker.audit_cursor = next_cursor if next_cursor and worker.audit_pages < AUDIT_PAGES else None
+    return response
+
+
+async def op_change(client, worker):
+    if worker.pending_item is None:
+        item_id, amount = worker.item_id(), 1.0
+    else:
+        item_id, amount = worker.pending_item, -1.0
+    response = await client.post("/api/inventory/changes", headers=worker.headers, json={
+        "inventory_item_id": item_id, "change_amount": amount, "reason": "Load test",
+    })
+    if response.is_success:
+        worker.pending_item = item_id if amount > 0 else None
+    return response
+
+
+async def op_login(client, worker):
+    return await worker.login(client, f"load{worker.rng.randrange(worker.users)}")
+
+
+OPERATIONS = {
+    "typeahead": op_typeahead,
+    "search": op_search,
+    "list": op_list,
+    "audit": op_audit,
+    "change": op_change,
+    "login": op_login,
+}
+
+
+class Recorder:
+    """Latencies of successful requests and failures, per operation."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+
+    def record(self, name, seconds, response=None, error=None):
+        if response is not None and response.is_success:
+            self.latencies[name].append(seconds)
+        else:
+            self.errors[name][str(response.status_code) if response is not None else type(error).__name__] += 1
+
+    def report(self, elapsed, names):
+        operations = {}
+        for name in names:
+            operations[name] = {
+                **benchlib.summarize(self.latencies[name], elapsed),
+                "errors": dict(self.errors[name]),
+            }
+        everything = [value for name in names for value in self.latencies[name]]
+        errors = sum(sum(self.errors[name].values()) for name in names)
+        total = {**benchlib.summarize(everything, elapsed), "errors": errors}
+        total["error_rate"] = round(errors / max(len(everything) + errors, 1), 4)
+        return total, operations
+
+
+async def run_load(transport_kwargs, scale, mix, clients, duration, warmup, users, seed, think_ms=0.0, timeout=30.0):
+    """Run the workload; returns (total, per-operation) report sections."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout, **transport_kwargs) as client:
+        workers = [Worker(index, scale, users, seed) for index in range(clients)]
+        for worker in workers:
+            response = await worker.login(client)
+            response.raise_for_status()
+            worker.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        started = time.perf_counter()
+        measure_from = started + warmup
+        deadline = measure_from + duration
+
+        async def drive(worker):
+            while True:
+                start = time.perf_counter()
+                if start >= deadline:
+                    return
+                name = worker.rng.choices(names, weights)[0]
+                response = error = None
+                try:
+                    response = await OPERATIONS[name](client, worker)
+                except httpx.HTTPError as exc:
+                    error = exc
+                if start >= measure_from:
+                    recorder.record(name, time.perf_counter() - start, response, error)
+                if think_ms:
+                    await asyncio.sleep(worker.rng.expovariate(1000.0 / think_ms))
+
+        await asyncio.gather(*(drive(worker) for worker in workers))
+        elapsed = time.perf_counter() - measure_from
+
+    return recorder.report(elapsed, names)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--tags", "--dirty"], cwd=benchlib.PROJECT_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Relative change of each figure against a baseline report (0.1 = 10% higher)."""
+    def changes(current, previous):
+        return {
+            key: round(current[key] / previous[key] - 1, 3)
+            for key in ("requests_per_sec", "p50_ms", "p95_ms", "p99_ms")
+            if previous.get(key) and key in current
+        }
+
+    return {
+        "revision": baseline.get("run", {}).get("revision"),
+        "total": changes(report["total"], baseline["total"]),
+        "operations": {
+            name: changes(stats, baseline["operations"][name])
+            for name, stats in report["operations"].items()
+            if name in baseline.get("operations", {})
+        },
+    }
+
+
+def build_target(args):
+    """httpx client arguments for the target, and a description of it for the report."""
+    if args.base_url:
+        return {"base_url": args.base_url}, args.base_url
+
+    if args.database_url:
+        engine = create_engine(args.database_url, pool_size=args.clients, max_overflow=0)
+        target = engine.url.render_as_string(hide_password=True)
+    else:
+        engine = benchlib.create_sqlite_engine()
+        seed(engine, SCALES[args.scale], args.users, args.seed)
+        target = "in-process sqlite"
+    app, _ = benchlib.build_app(
+        engine,
+        (auth_router, "/api"),
+        (chemicals_router, "/api/chemicals"),
+        (inventory_router, "/api/inventory"),
+        authenticate=True,
+    )
+    return {"transport": httpx.ASGITransport(app=app), "base_url": "http://loadtest"}, f"{target} (in-process)"
+
+
+async def _run(args, transport_kwargs):
+    if "transport" in transport_kwargs:
+        # Sized like the server's lifespan does
+        configure_db_threadpool()
+    return await run_load(
+        transport_kwargs, SCALES[args.scale], args.mix, args.clients, args.duration, args.warmup,
+        args.users, args.seed, args.think_ms, args.timeout,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="a running server, e.g. http://localhost:8000")
+    parser.add_argument("--database-url", help="mount the routers in-process against this seeded database")
+    parser.add_argument("--scale", choices=SCALES, default="smoke", help="scale the database was seeded at")
+    parser.add_argument("--users", type=int, default=50, help="users the database was seeded with")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before that")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a worker's requests")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"default {DEFAULT_MIX}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args()
+    if args.base_url and args.database_url:
+        parser.error("--base-url and --database-url are exclusive")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    transport_kwargs, target = build_target(args)
+    started_at = datetime.now(timezone.utc)
+    total, operations = asyncio.run(_run(args, transport_kwargs))
+
+    report = {
+        "run": {
+            "revision": git_revision(),
+            "started_at": started_at.isoformat(),
+            "target": target,
+            "scale": args.scale,
+            "clients": args.clients,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "think_ms": args.think_ms,
+            "mix": args.mix,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "total": total,
+        "operations": operations,
+    }
+    if baseline is not None:
+        report["baseline"] = compare(report, baseline)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    if total["errors"]:
+        print(f"{total['errors']} requests failed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
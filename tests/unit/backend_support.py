@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Shared setup for unit tests that exercise the FastAPI backend.
+
+Tests run the real routers against an in-memory SQLite database, with the
+database and authentication dependencies overridden, so no PostgreSQL
+server or login is required.
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+# Root of the project (parent directory of tests)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, get_db
+from app.auth import get_current_user, get_current_active_user, get_current_admin_user
+
+
+def create_test_engine():
+    """In-memory SQLite engine shared across threads, with the full schema."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def create_test_app(engine, *routers, user=None):
+    """Build an app from (router, prefix) pairs bound to `engine`.
+
+    Returns (app, SessionLocal). Requests are authenticated as `user`, which
+    defaults to an active admin with id 1.
+    """
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def _get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    if user is None:
+        user = SimpleNamespace(id=1, username="tester", is_active=True, is_admin=True)
+
+    app = FastAPI()
+    for router, prefix in routers:
+        app.include_router(router, prefix=prefix)
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    app.dependency_overrides[get_current_admin_user] = lambda: user
+    return app, SessionLocal
+
+
+@contextmanager
+def count_queries(engine):
+    """Collect the SQL statements executed on `engine` inside the block."""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+@contextmanager
+def assert_max_queries(engine, limit):
+    """Fail if more than `limit` SQL statements are executed inside the block.
+
+    Used to check that list endpoints load their nested relationships up
+    front instead of issuing a lazy load per row.
+    """
+    with count_queries(engine) as statements:
+        yield statements
+    if len(statements) > limit:
+        raise AssertionError(
+            f"{len(statements)} SQL statements executed, expected at most {limit}:\n" + "\n".join(statements)
+        )
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the streaming audit trail export endpoints.
+"""
+
+import csv
+import gzip
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.models import ChemicalAudit, InventoryAudit, Location, LocationAudit, User
+from app.routers.chemicals import router as chemicals_router
+from app.routers.inventory import router as inventory_router
+from app.routers.locations import router as locations_router
+
+
+class TestAuditExport(unittest.TestCase):
+    """Test cases for the CSV/NDJSON audit exports."""
+
+    def setUp(self):
+        """Seed audit rows for every exported table."""
+        engine = create_test_engine()
+        app, SessionLocal = create_test_app(
+            engine,
+            (inventory_router, "/api/inventory"),
+            (locations_router, "/api/locations"),
+            (chemicals_router, "/api/chemicals"),
+        )
+        self.client = TestClient(app)
+
+        db = SessionLocal()
+        db.add(User(id=1, email="tester@example.com", username="tester", full_name="Tester", hashed_password="x"))
+        db.add(Location(id=1, name="Freezer 3"))
+        db.add_all([
+            InventoryAudit(inventory_item_id=n % 3 + 1, user_id=1, field_name="quantity",
+                           old_value=str(n), new_value=str(n - 1), action="UPDATE")
+            for n in range(25)
+        ])
+        db.add_all([
+            LocationAudit(location_id=1, user_id=1, field_name="name", old_value="", new_value="Freezer 3", action="CREATE"),
+            LocationAudit(location_id=1, user_id=1, field_name="description", old_value="", new_value="-80C", action="UPDATE"),
+        ])
+        db.add(ChemicalAudit(chemical_id=7, user_id=1, field_name="name", old_value="", new_value="Acetone", action="CREATE"))
+        db.commit()
+        db.close()
+
+    def test_csv_export_streams_all_rows(self):
+        """CSV export returns a header plus every row, across several fetch batches."""
+        with patch('app.export.EXPORT_BATCH_SIZE', 4):
+            response = self.client.get("/api/inventory/audit/export")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/csv"))
+        self.assertIn('filename="inventory_audits.csv"', response.headers["content-disposition"])
+
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual([int(row["id"]) for row in rows], list(range(1, 26)))
+
+    def test_ndjson_export_with_filters(self):
+        """NDJSON export applies the same filters as the list endpoint."""
+        response = self.client.get("/api/inventory/audit/export", params={"format": "ndjson", "inventory_item_id": 2})
+        records = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(len(records), 8)
+        self.assertTrue(all(record["inventory_item_id"] == 2 for record in records))
+        self.assertIn("timestamp", records[0])
+
+    def test_gzip_export(self):
+        """gzip=true returns a compressed download."""
+        response = self.client.get("/api/locations/audit-logs/export", params={"gzip": "true", "action": "UPDATE"})
+        self.assertEqual(response.headers["content-type"], "application/gzip")
+        self.assertIn('filename="location_audits.csv.gz"', response.headers["content-disposition"])
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode("utf-8"))))
+        self.assertEqual([row["new_value"] for row in rows], ["-80C"])
+
+    def test_chemical_audit_export(self):
+        """Chemical audits can be exported too."""
+        response = self.client.get("/api/chemicals/audit-logs/export", params={"format": "ndjson"})
+        self.assertEqual(json.loads(response.text)["new_value"], "Acetone")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the authenticated user cache in app.auth.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from backend_support import create_test_engine
+from app.auth import PrincipalCache, UserPrincipal, create_access_token, user_cache
+from app.database import get_db
+from app.models import User
+from app.routers.users import router as users_router
+
+
+class TestPrincipalCache(unittest.TestCase):
+    """Test cases for PrincipalCache."""
+
+    def test_ttl_expiry(self):
+        """Entries expire after the TTL and count as misses."""
+        cache = PrincipalCache(ttl_seconds=30)
+        principal = UserPrincipal(id=1, username="alice", is_active=True, is_admin=False)
+        with patch('app.auth.time.monotonic', return_value=100.0):
+            cache.put("alice", principal)
+            self.assertIs(cache.get("alice"), principal)
+        with patch('app.auth.time.monotonic', return_value=131.0):
+            self.assertIsNone(cache.get("alice"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_disabled(self):
+        """A TTL of zero disables caching."""
+        cache = PrincipalCache(ttl_seconds=0)
+        cache.put("alice", UserPrincipal(id=1, username="alice", is_active=True, is_admin=False))
+        self.assertIsNone(cache.get("alice"))
+
+
+class TestCachedAuthentication(unittest.TestCase):
+    """Test cases for get_current_user with the cache enabled."""
+
+    def setUp(self):
+        """Create a user and an app that authenticates real tokens."""
+        engine = create_test_engine()
+        SessionLocal = sessionmaker(bind=engine)
+        db = SessionLocal()
+        db.add(User(id=1, email="alice@example.com", username="alice", full_name="Alice",
+                    hashed_password="x", is_active=True, is_admin=True))
+        db.add(User(id=2, email="bob@example.com", username="bob", full_name="Bob",
+                    hashed_password="x", is_active=True, is_admin=False))
+        db.commit()
+        db.close()
+
+        def _get_db():
+            session = SessionLocal()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(users_router, prefix="/api/users")
+        app.dependency_overrides[get_db] = _get_db
+        self.client = TestClient(app)
+
+        self.user_queries = 0
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count_user_lookups(conn, cursor, statement, parameters, context, executemany):
+            if "WHERE users.username" in statement:
+                self.user_queries += 1
+
+        self.ttl = user_cache.ttl_seconds
+        user_cache.ttl_seconds = 30
+        user_cache.clear()
+
+    def tearDown(self):
+        user_cache.ttl_seconds = self.ttl
+        user_cache.clear()
+
+    def auth(self, username):
+        return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+    def test_user_is_queried_once(self):
+        """Repeated requests with the same token reuse the cached principal."""
+        for _ in range(3):
+            response = self.client.get("/api/users/me", headers=self.auth("alice"))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["username"], "alice")
+        self.assertEqual(self.user_queries, 1)
+        self.assertEqual(user_cache.stats()["hits"], 2)
+
+    def test_deactivation_invalidates_cache(self):
+        """Deactivating a user takes effect on their next request."""
+        self.assertEqual(self.client.get("/api/users/me", headers=self.auth("bob")).status_code, 200)
+        response = self.client.put("/api/users/2", json={"is_active": False}, headers=self.auth("alice"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/api/users/me", headers=self.auth("bob")).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the PostgreSQL change bus listener in app.change_bus.
+"""
+
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import psycopg2
+
+import backend_support  # noqa: F401
+from app.auth import UserPrincipal, user_cache
+from app.change_bus import NOTIFY_IDS_PER_PAYLOAD, ChangeListener, publish_in_transaction
+from app.notifications import NotificationDispatcher
+
+
+class FakeConnection:
+    """Stands in for a psycopg2 connection with pending notifications."""
+
+    def __init__(self, payloads=(), error=None):
+        self.notifies = [SimpleNamespace(payload=payload) for payload in payloads]
+        self.error = error
+        self.closed = False
+
+    def poll(self):
+        if self.error:
+            raise self.error
+
+    def fileno(self):
+        return -1
+
+    def close(self):
+        self.closed = True
+
+
+class TestChangeListener(unittest.IsolatedAsyncioTestCase):
+    """Test cases for ChangeListener."""
+
+    async def asyncSetUp(self):
+        patcher = patch('app.notifications.notify_clients', new_callable=AsyncMock)
+        self.notify = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dispatcher = NotificationDispatcher(window_seconds=0.02)
+        self.dispatcher.start()
+        self.listener = ChangeListener(bind=SimpleNamespace(dialect=SimpleNamespace(name="postgresql")),
+                                       dispatcher=self.dispatcher, reconnect_seconds=60)
+        self.listener._loop = asyncio.get_running_loop()
+
+    async def asyncTearDown(self):
+        await self.listener.stop()
+        await self.dispatcher.stop()
+
+    def attach(self, connection):
+        self.listener.connection = connection
+        self.dispatcher.bus_active = True
+
+    async def test_relays_notifications(self):
+        """Notifications from any worker are merged and sent to local clients."""
+        self.attach(FakeConnection([
+            json.dumps({"resource": "inventory", "action": "update", "ids": [4, 5]}),
+            json.dumps({"resource": "inventory", "action": "update", "ids": [5, 6]}),
+            json.dumps({"resource": "inventory", "action": "update", "id": 7}),
+            json.dumps({"resource": "inventory", "action": "update", "ids": 8}),
+            "not json",
+        ]))
+        self.listener._on_readable()
+        await asyncio.sleep(0.05)
+        self.notify.assert_awaited_once_with(
+            'inventory', 'batch', {'changes': [{'action': 'update', 'ids': [4, 5, 6, 7]}], 'count': 4}
+        )
+
+    async def test_user_changes_invalidate_cached_principals(self):
+        """A user changed on another worker is dropped from this worker's auth cache."""
+        user_cache.put("alice", UserPrincipal(id=3, username="alice", is_active=True, is_admin=True))
+        user_cache.put("bob", UserPrincipal(id=4, username="bob", is_active=True, is_admin=False))
+        self.addCleanup(user_cache.clear)
+        self.listener.relay(json.dumps({"resource": "users", "action": "update", "ids": [3]}))
+        self.assertIsNone(user_cache.get("alice"))
+        self.assertIsNotNone(user_cache.get("bob"))
+
+    async def test_local_publish_skipped_while_active(self):
+        """In-process publishes are left to the database trigger while the bus is up."""
+        self.attach(FakeConnection())
+        self.dispatcher.publish('inventory', 'create', [1])
+        await asyncio.sleep(0.05)
+        self.notify.assert_not_awaited()
+
+    async def test_connection_loss_falls_back(self):
+        """A lost connection re-enables in-process publishing and schedules a reconnect."""
+        connection = FakeConnection(error=psycopg2.OperationalError("server closed the connection"))
+        self.attach(connection)
+        with patch.object(self.listener._loop, 'remove_reader'):
+            self.listener._on_readable()
+        self.assertTrue(connection.closed)
+        self.assertFalse(self.listener.active)
+        self.assertFalse(self.dispatcher.bus_active)
+        self.assertIsNotNone(self.listener._reconnect_task)
+        self.dispatcher.publish('inventory', 'create', [1])
+        await asyncio.sleep(0.05)
+        self.notify.assert_awaited_once()
+
+    async def test_publish_in_transaction_chunks_ids(self):
+        """Explicit notifications carry chunks of ids and take one statement."""
+        db = SimpleNamespace(execute=Mock())
+        publish_in_transaction(db, "inventory", "expired", range(1, NOTIFY_IDS_PER_PAYLOAD + 3))
+        db.execute.assert_called_once()
+        payloads = [json.loads(payload) for payload in db.execute.call_args.args[1]["payloads"]]
+        self.assertEqual([len(payload["ids"]) for payload in payloads], [NOTIFY_IDS_PER_PAYLOAD, 2])
+        self.assertEqual(payloads[1], {"resource": "inventory", "action": "expired",
+                                       "ids": [NOTIFY_IDS_PER_PAYLOAD + 1, NOTIFY_IDS_PER_PAYLOAD + 2]})
+        db.execute.reset_mock()
+        publish_in_transaction(db, "inventory", "expired", [])
+        db.execute.assert_not_called()
+
+    async def test_disabled_for_sqlite(self):
+        """Only PostgreSQL supports LISTEN/NOTIFY."""
+        listener = ChangeListener(bind=SimpleNamespace(dialect=SimpleNamespace(name="sqlite")),
+                                  dispatcher=self.dispatcher)
+        self.assertFalse(await listener.start())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the expiring inventory endpoint and sweeper in app.expiry.
+"""
+
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.expiry import ExpirySweeper, parse_window
+from app.models import Chemical, ExpirySweepState, InventoryItem, Location
+from app.routers.inventory import router as inventory_router
+
+
+class TestExpiringInventory(unittest.TestCase):
+    """Test cases for GET /api/inventory/expiring and the sweeper."""
+
+    def setUp(self):
+        """Seed items that expired, expire soon, expire later and never expire."""
+        engine = create_test_engine()
+        app, self.SessionLocal = create_test_app(engine, (inventory_router, "/api/inventory"))
+        self.client = TestClient(app)
+
+        self.now = datetime.utcnow()
+        db = self.SessionLocal()
+        db.add_all([Chemical(name="Acetone", cas_number="67-64-1"), Location(name="Shelf A")])
+        db.flush()
+        for days in (-3, 5, 20, 90, None):
+            db.add(InventoryItem(
+                chemical_id=1, location_id=1, quantity=1, unit="L",
+                expiration_date=self.now + timedelta(days=days) if days is not None else None,
+            ))
+        db.commit()
+        db.close()
+
+    def test_parse_window(self):
+        """Windows accept hours, days and weeks."""
+        self.assertEqual(parse_window("30d"), timedelta(days=30))
+        self.assertEqual(parse_window("12h"), timedelta(hours=12))
+        self.assertEqual(parse_window("2w"), timedelta(weeks=2))
+        self.assertEqual(parse_window("7"), timedelta(days=7))
+        with self.assertRaises(ValueError):
+            parse_window("soon")
+
+    def test_expiring_endpoint(self):
+        """Items are listed soonest first, optionally without expired ones."""
+        response = self.client.get("/api/inventory/expiring", params={"within": "30d"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.json()], [1, 2, 3])
+
+        response = self.client.get("/api/inventory/expiring", params={"within": "1w", "include_expired": False})
+        self.assertEqual([item["id"] for item in response.json()], [2])
+
+        response = self.client.get("/api/inventory/expiring", params={"within": "soon"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_sweeper_reports_each_item_once(self):
+        """Each sweep only reports items past the stored high-water marks."""
+        dispatcher = MagicMock(bus_active=False)
+        sweeper = ExpirySweeper(self.SessionLocal, dispatcher, warning_days=30)
+
+        self.assertEqual(sweeper.sweep(now=self.now), {"expiring": [2, 3], "expired": [1]})
+        self.assertEqual(dispatcher.publish.call_count, 2)
+
+        # Nothing new an hour later
+        dispatcher.reset_mock()
+        self.assertEqual(sweeper.sweep(now=self.now + timedelta(hours=1)), {})
+        dispatcher.publish.assert_not_called()
+
+        # Six days on, item 2 has expired; 90-day item is still outside the window
+        found = sweeper.sweep(now=self.now + timedelta(days=6))
+        self.assertEqual(found, {"expired": [2]})
+        dispatcher.publish.assert_called_once_with("inventory", "expired", [2])
+
+    def test_sweeper_reports_items_added_behind_the_marks(self):
+        """Items created or edited since the last sweep are reported even inside swept ranges."""
+        dispatcher = MagicMock(bus_active=False)
+        sweeper = ExpirySweeper(self.SessionLocal, dispatcher, warning_days=30)
+        sweeper.sweep(now=self.now)
+
+        later = self.now + timedelta(minutes=30)
+        db = self.SessionLocal()
+        db.add_all([
+            # Imported already expired, and created expiring within the window
+            InventoryItem(chemical_id=1, location_id=1, quantity=1, unit="L",
+                          expiration_date=self.now - timedelta(days=1), created_at=later),
+            InventoryItem(chemical_id=1, location_id=1, quantity=1, unit="L",
+                          expiration_date=self.now + timedelta(days=10), created_at=later),
+        ])
+        # The 90-day item is edited to expire within the window
+        item = db.get(InventoryItem, 4)
+        item.expiration_date = self.now + timedelta(days=12)
+        item.updated_at = later
+        db.commit()
+        db.close()
+
+        found = sweeper.sweep(now=self.now + timedelta(hours=1))
+        self.assertEqual(found, {"expiring": [7, 4], "expired": [6]})
+
+        # Reported once
+        self.assertEqual(sweeper.sweep(now=self.now + timedelta(hours=2)), {})
+
+    def test_sweeper_with_an_offset_clock(self):
+        """A clock with a UTC offset sweeps the same instants as UTC."""
+        dispatcher = MagicMock(bus_active=False)
+        sweeper = ExpirySweeper(self.SessionLocal, dispatcher, warning_days=30)
+        plus_five = timezone(timedelta(hours=5))
+
+        def local(at):
+            return at.replace(tzinfo=timezone.utc).astimezone(plus_five)
+
+        self.assertEqual(sweeper.sweep(now=local(self.now)), {"expiring": [2, 3], "expired": [1]})
+        db = self.SessionLocal()
+        state = db.get(ExpirySweepState, 1)
+        self.assertEqual(state.expired_through, self.now)
+        self.assertEqual(state.swept_at.replace(tzinfo=None), self.now)
+        db.close()
+
+        # An item created after the sweep (stored as UTC) is reported, once
+        db = self.SessionLocal()
+        db.add(InventoryItem(chemical_id=1, location_id=1, quantity=1, unit="L",
+                             expiration_date=self.now + timedelta(days=10),
+                             created_at=self.now + timedelta(minutes=30)))
+        db.commit()
+        db.close()
+        self.assertEqual(sweeper.sweep(now=local(self.now + timedelta(hours=1))), {"expiring": [6]})
+        self.assertEqual(sweeper.sweep(now=local(self.now + timedelta(hours=2))), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Unit tests for POST /api/inventory/changes/batch.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.models import Chemical, Experiment, InventoryAudit, InventoryChange, InventoryItem, Location, User
+from app.routers.inventory import router as inventory_router
+
+
+@patch('app.routers.inventory.dispatcher')
+class TestInventoryChangeBatch(unittest.TestCase):
+    """Test cases for batch consumption."""
+
+    def setUp(self):
+        """Seed three reagents and an experiment."""
+        engine = create_test_engine()
+        app, self.SessionLocal = create_test_app(engine, (inventory_router, "/api/inventory"))
+        self.client = TestClient(app)
+
+        db = self.SessionLocal()
+        db.add_all([
+            User(id=1, email="tester@example.com", username="tester", full_name="Tester", hashed_password="x"),
+            Chemical(name="Acetone", cas_number="67-64-1", density=0.784),
+            Chemical(name="Sodium chloride", cas_number="7647-14-5"),
+            Location(name="Shelf A"),
+            Experiment(title="Titration", user_id=1, status="in-progress"),
+        ])
+        db.flush()
+        db.add_all([
+            InventoryItem(chemical_id=1, location_id=1, quantity=1.0, unit="L"),
+            InventoryItem(chemical_id=2, location_id=1, quantity=500.0, unit="g"),
+        ])
+        db.commit()
+        db.close()
+
+    def post(self, lines, **extra):
+        return self.client.post("/api/inventory/changes/batch", json={"reason": "Experiment", "lines": lines, **extra})
+
+    def quantities(self):
+        db = self.SessionLocal()
+        values = {item.id: item.quantity for item in db.query(InventoryItem)}
+        db.close()
+        return values
+
+    def test_batch_applied(self, mock_dispatcher):
+        """All lines are applied, with running quantities per line and one notification."""
+        response = self.post([
+            {"inventory_item_id": 1, "change_amount": -100, "unit": "mL"},
+            {"inventory_item_id": 2, "change_amount": -20},
+            {"inventory_item_id": 1, "change_amount": -0.2, "reason": "Rinse"},
+        ], experiment_id=1)
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body["experiment_id"], 1)
+        lines = body["changes"]
+        self.assertEqual([line["line"] for line in lines], [0, 1, 2])
+        self.assertAlmostEqual(lines[0]["old_quantity"], 1.0)
+        self.assertAlmostEqual(lines[0]["new_quantity"], 0.9)
+        self.assertAlmostEqual(lines[2]["old_quantity"], 0.9)
+        self.assertAlmostEqual(lines[2]["new_quantity"], 0.7)
+
+        quantities = self.quantities()
+        self.assertAlmostEqual(quantities[1], 0.7)
+        self.assertAlmostEqual(quantities[2], 480.0)
+
+        db = self.SessionLocal()
+        changes = db.query(InventoryChange).order_by(InventoryChange.id).all()
+        self.assertEqual([change.reason for change in changes], ["Experiment", "Experiment", "Rinse"])
+        self.assertTrue(all(change.experiment_id == 1 for change in changes))
+        self.assertEqual(db.query(InventoryAudit).count(), 3)
+        db.close()
+        mock_dispatcher.publish.assert_called_once_with('inventory', 'update', [1, 2])
+
+    def test_batch_rejected_as_a_whole(self, mock_dispatcher):
+        """One bad line rejects the batch, reporting every failing line."""
+        response = self.post([
+            {"inventory_item_id": 2, "change_amount": -20},
+            {"inventory_item_id": 99, "change_amount": -1},
+            {"inventory_item_id": 1, "change_amount": -2},
+            {"inventory_item_id": 2, "change_amount": -1, "unit": "mL"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["detail"]["errors"]
+        self.assertEqual([error["line"] for error in errors], [1, 2, 3])
+        self.assertEqual(self.quantities(), {1: 1.0, 2: 500.0})
+
+        db = self.SessionLocal()
+        self.assertEqual(db.query(InventoryChange).count(), 0)
+        db.close()
+        mock_dispatcher.publish.assert_not_called()
+
+    def test_unknown_experiment(self, mock_dispatcher):
+        """The experiment is checked once for the whole batch."""
+        response = self.post([{"inventory_item_id": 1, "change_amount": -0.1}], experiment_id=42)
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
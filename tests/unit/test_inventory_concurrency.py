@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Concurrency tests for inventory quantity changes and optimistic locking of
+inventory item updates.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm.exc import StaleDataError
+
+from backend_support import create_test_app, create_test_engine
+from app.database import Base
+from app.models import Chemical, InventoryChange, InventoryItem, Location, StockLevel, User
+from app.routers.inventory import router as inventory_router
+
+
+def seed(SessionLocal, quantity):
+    db = SessionLocal()
+    db.add_all([
+        User(id=1, email="tester@example.com", username="tester", full_name="Tester", hashed_password="x"),
+        Chemical(name="Acetone", cas_number="67-64-1"),
+        Location(name="Flammables cabinet"),
+    ])
+    db.flush()
+    db.add(InventoryItem(chemical_id=1, location_id=1, quantity=quantity, unit="mL"))
+    db.commit()
+    db.close()
+
+
+@patch('app.routers.inventory.dispatcher')
+class TestConcurrentChanges(unittest.TestCase):
+    """Concurrent consumption of one item never loses an update."""
+
+    def setUp(self):
+        # A file database, so every worker thread gets its own connection
+        self.tmpdir = tempfile.mkdtemp()
+        engine = create_engine(
+            f"sqlite:///{os.path.join(self.tmpdir, 'stress.db')}",
+            connect_args={"check_same_thread": False, "timeout": 30},
+            pool_size=20,
+        )
+        Base.metadata.create_all(bind=engine)
+        self.addCleanup(engine.dispose)
+        app, self.SessionLocal = create_test_app(engine, (inventory_router, "/api/inventory"))
+        self.client = TestClient(app)
+        seed(self.SessionLocal, 150)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def consume(self, amount):
+        return self.client.post("/api/inventory/changes", json={
+            "inventory_item_id": 1, "change_amount": -amount, "reason": "Stress test",
+        }).status_code
+
+    def test_concurrent_decrements_are_exact(self, mock_dispatcher):
+        """100 concurrent decrements leave exactly the expected balance."""
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            statuses = list(pool.map(self.consume, [1] * 100))
+        self.assertEqual(statuses, [201] * 100)
+
+        db = self.SessionLocal()
+        item = db.get(InventoryItem, 1)
+        self.assertEqual(item.quantity, 50)
+        self.assertEqual(item.canonical_quantity, 50)
+        self.assertEqual(item.version, 101)
+        self.assertEqual(db.query(InventoryChange).count(), 100)
+        self.assertEqual(db.query(StockLevel.quantity).scalar(), 50)
+        db.close()
+
+    def test_never_goes_negative(self, mock_dispatcher):
+        """When demand exceeds stock, the surplus requests are refused."""
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            statuses = list(pool.map(self.consume, [10] * 20))
+        self.assertEqual(statuses.count(201), 15)
+        self.assertEqual(statuses.count(400), 5)
+
+        db = self.SessionLocal()
+        self.assertEqual(db.get(InventoryItem, 1).quantity, 0)
+        db.close()
+
+
+@patch('app.routers.inventory.dispatcher')
+class TestOptimisticLocking(unittest.TestCase):
+    """Item updates honour If-Match and detect concurrent writes."""
+
+    def setUp(self):
+        engine = create_test_engine()
+        app, self.SessionLocal = create_test_app(engine, (inventory_router, "/api/inventory"))
+        self.client = TestClient(app)
+        seed(self.SessionLocal, 100)
+
+    def test_if_match(self, mock_dispatcher):
+        """A stale ETag is rejected with 412; the current one is accepted."""
+        etag = self.client.get("/api/inventory/items/1").headers["ETag"]
+        self.client.post("/api/inventory/changes", json={
+            "inventory_item_id": 1, "change_amount": -5, "reason": "Used",
+        })
+
+        stale = self.client.put("/api/inventory/items/1", json={"quantity": 80}, headers={"If-Match": etag})
+        self.assertEqual(stale.status_code, 412)
+
+        current = self.client.get("/api/inventory/items/1").headers["ETag"]
+        self.assertNotEqual(current, etag)
+        response = self.client.put("/api/inventory/items/1", json={"quantity": 80}, headers={"If-Match": current})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["quantity"], 80)
+        self.assertNotEqual(response.headers["ETag"], current)
+
+    def test_concurrent_write_detected(self, mock_dispatcher):
+        """A write made after the item was loaded makes the ORM update fail."""
+        db = self.SessionLocal()
+        item = db.get(InventoryItem, 1)
+        other = self.SessionLocal()
+        other.get(InventoryItem, 1).quantity = 90
+        other.commit()
+        other.close()
+
+        item.quantity = 70
+        with self.assertRaises(StaleDataError):
+            db.commit()
+        db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the bulk inventory import endpoint.
+"""
+
+import io
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.models import Chemical, InventoryAudit, InventoryChange, InventoryItem, Location, User
+from app.routers.inventory import router as inventory_router
+
+
+class TestInventoryImport(unittest.TestCase):
+    """Test cases for POST /api/inventory/import."""
+
+    def setUp(self):
+        """Seed chemicals and locations referenced by the import files."""
+        engine = create_test_engine()
+        app, self.SessionLocal = create_test_app(engine, (inventory_router, "/api/inventory"))
+        self.client = TestClient(app)
+
+        db = self.SessionLocal()
+        db.add_all([
+            User(id=1, email="tester@example.com", username="tester", full_name="Tester", hashed_password="x"),
+            Chemical(name="Acetone", cas_number="67-64-1"),
+            Chemical(name="Ethanol", cas_number="64-17-5"),
+            Location(name="Flammables cabinet"),
+        ])
+        db.commit()
+        db.close()
+
+    def upload(self, content, filename="stock.csv"):
+        return self.client.post(
+            "/api/inventory/import",
+            files={"file": (filename, content.encode("utf-8"), "text/csv")},
+        )
+
+    @patch('app.routers.inventory.dispatcher')
+    def test_import_with_row_errors(self, mock_notify):
+        """Valid rows are imported in batches and bad rows are reported individually."""
+        content = (
+            "CAS Number,Location,Quantity,Unit,Batch Number,Expiration Date\n"
+            "67-64-1,Flammables cabinet,2.5,L,ACE-1,2027-01-31\n"
+            "64-17-5,Flammables cabinet,1,L,,\n"
+            "\n"
+            "00-00-0,Flammables cabinet,1,L,,\n"
+            "67-64-1,Nowhere,1,L,,\n"
+            "67-64-1,Flammables cabinet,lots,L,,\n"
+            "67-64-1,Flammables cabinet,3,L,ACE-2,\n"
+        )
+        with patch('app.inventory_import.IMPORT_BATCH_SIZE', 2):
+            response = self.upload(content)
+
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report["total_rows"], 6)
+        self.assertEqual(report["imported"], 3)
+        self.assertEqual([error["row"] for error in report["errors"]], [5, 6, 7])
+        self.assertIn("CAS number 00-00-0", report["errors"][0]["error"])
+
+        db = self.SessionLocal()
+        self.assertEqual(db.query(InventoryItem).count(), 3)
+        self.assertEqual(db.query(InventoryChange).count(), 3)
+        self.assertEqual(db.query(InventoryAudit).filter(InventoryAudit.action == "CREATE").count(), 3)
+        self.assertEqual(db.query(InventoryItem).filter(InventoryItem.batch_number == "ACE-1").one().expiration_date.year, 2027)
+        db.close()
+
+        # One coalesced notification for the whole upload
+        mock_notify.publish.assert_called_once()
+        self.assertEqual(len(mock_notify.publish.call_args[0][2]), 3)
+
+    def test_non_finite_quantities_are_row_errors(self):
+        """NaN and infinite quantities are reported instead of imported."""
+        content = (
+            "cas_number,location,quantity,unit\n"
+            "67-64-1,Flammables cabinet,nan,L\n"
+            "67-64-1,Flammables cabinet,inf,L\n"
+            "67-64-1,Flammables cabinet,-Infinity,L\n"
+            "67-64-1,Flammables cabinet,1,L\n"
+        )
+        report = self.upload(content).json()
+        self.assertEqual(report["imported"], 1)
+        self.assertEqual([error["row"] for error in report["errors"]], [2, 3, 4])
+        self.assertEqual(report["errors"][0]["error"], "Invalid quantity 'nan'")
+
+    def test_file_that_is_not_utf8(self):
+        """A CSV in another encoding is rejected before anything is imported."""
+        content = "cas_number,location,quantity,unit\n67-64-1,Flammables cabinet,1,L\n67-64-1,Kühlraum,1,L\n"
+        response = self.client.post(
+            "/api/inventory/import",
+            files={"file": ("stock.csv", content.encode("latin-1"), "text/csv")},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("UTF-8", response.json()["detail"])
+
+        db = self.SessionLocal()
+        self.assertEqual(db.query(InventoryItem).count(), 0)
+        db.close()
+
+    def test_corrupt_xlsx(self):
+        """A file named .xlsx that is not a workbook is a 400."""
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            self.skipTest("openpyxl is not installed")
+        for content in (b"cas_number,location\n", self.zip_without_workbook()):
+            response = self.client.post(
+                "/api/inventory/import",
+                files={"file": ("stock.xlsx", content,
+                                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["detail"], "File is not a valid XLSX workbook")
+
+    @staticmethod
+    def zip_without_workbook():
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("readme.txt", "not a workbook")
+        return buffer.getvalue()
+
+    def test_missing_columns(self):
+        """A file without the required columns is rejected up front."""
+        response = self.upload("cas_number,quantity\n67-64-1,1\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("location", response.json()["detail"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Unit tests for as-of balances and ledger snapshots in app.ledger.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.ledger import LedgerSnapshotter, balances_at, take_snapshots
+from app.models import Chemical, InventoryBalanceSnapshot, InventoryChange, InventoryItem, Location
+from app.routers.inventory import router as inventory_router
+
+
+class TestInventoryLedger(unittest.TestCase):
+    """Test cases for balances reconstructed from snapshots and changes."""
+
+    def setUp(self):
+        """Seed two items with a week of ledger history."""
+        engine = create_test_engine()
+        app, self.SessionLocal = create_test_app(engine, (inventory_router, "/api/inventory"))
+        self.client = TestClient(app)
+
+        self.start = datetime(2026, 10, 1, 12, 0)
+        db = self.SessionLocal()
+        db.add_all([Chemical(name="Acetone", cas_number="67-64-1"), Location(name="Shelf A")])
+        db.flush()
+        db.add_all([
+            InventoryItem(chemical_id=1, location_id=1, quantity=7.0, unit="L"),
+            InventoryItem(chemical_id=1, location_id=1, quantity=250.0, unit="mL"),
+            InventoryItem(chemical_id=1, location_id=1, quantity=0.0, unit="L"),
+        ])
+        db.flush()
+        # Item 1: +10 on day 0, then -1 every day; item 2: +250 on day 3
+        db.add(InventoryChange(inventory_item_id=1, change_amount=10.0, timestamp=self.day(0)))
+        for day in range(1, 4):
+            db.add(InventoryChange(inventory_item_id=1, change_amount=-1.0, timestamp=self.day(day)))
+        db.add(InventoryChange(inventory_item_id=2, change_amount=250.0, timestamp=self.day(3)))
+        db.commit()
+        db.close()
+
+    def day(self, number):
+        return self.start + timedelta(days=number)
+
+    def balances(self, at):
+        db = self.SessionLocal()
+        rows = {row["inventory_item_id"]: row for row in balances_at(db, at)}
+        db.close()
+        return rows
+
+    def test_balance_from_changes(self):
+        """Without snapshots the balance is the sum of changes up to `at`."""
+        rows = self.balances(self.day(2))
+        self.assertEqual(set(rows), {1})
+        self.assertEqual(rows[1]["quantity"], 8.0)
+        self.assertEqual(rows[1]["tail_changes"], 3)
+        self.assertIsNone(rows[1]["snapshot_at"])
+
+        rows = self.balances(self.day(5))
+        self.assertEqual((rows[1]["quantity"], rows[2]["quantity"]), (7.0, 250.0))
+
+    def test_snapshots_bound_the_tail(self):
+        """Balances start from the latest snapshot and give the same result."""
+        db = self.SessionLocal()
+        self.assertEqual(take_snapshots(db, self.day(1)), 1)
+        # Nothing changed since, so no new checkpoint is written
+        self.assertEqual(take_snapshots(db, self.day(1) + timedelta(hours=1)), 0)
+        self.assertEqual(take_snapshots(db, self.day(3)), 2)
+        self.assertEqual(db.query(InventoryBalanceSnapshot).count(), 3)
+        db.close()
+
+        rows = self.balances(self.day(2))
+        self.assertEqual(rows[1]["quantity"], 8.0)
+        self.assertEqual(rows[1]["tail_changes"], 1)
+        self.assertIsNotNone(rows[1]["snapshot_at"])
+
+        rows = self.balances(self.day(5))
+        self.assertEqual((rows[1]["quantity"], rows[2]["quantity"]), (7.0, 250.0))
+        self.assertEqual(rows[1]["tail_changes"], 0)
+
+        # Before the first snapshot the history is summed as before
+        self.assertEqual(self.balances(self.day(0))[1]["quantity"], 10.0)
+
+    def test_snapshotter_checkpoints_in_the_past(self):
+        """The snapshotter leaves a delay for transactions still committing."""
+        snapshotter = LedgerSnapshotter(self.SessionLocal, interval_seconds=0, delay_seconds=86400)
+        self.assertEqual(snapshotter.snapshot(now=self.day(2) + timedelta(hours=1)), 1)
+        db = self.SessionLocal()
+        snapshot = db.query(InventoryBalanceSnapshot).one()
+        self.assertEqual(snapshot.quantity, 9.0)
+        db.close()
+
+    def test_balance_endpoint(self):
+        """GET /items/{id}/balance answers as of a date, and zero before any stock."""
+        response = self.client.get("/api/inventory/items/1/balance", params={"at": self.day(1).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["quantity"], body["unit"]), (9.0, "L"))
+
+        response = self.client.get("/api/inventory/items/2/balance", params={"at": self.day(1).isoformat()})
+        self.assertEqual(response.json()["quantity"], 0.0)
+
+        response = self.client.get("/api/inventory/items/99/balance")
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_report_and_snapshot_endpoint(self):
+        """GET /balances reports every item with stock; admins can force a snapshot."""
+        response = self.client.post("/api/inventory/balances/snapshot", params={"at": self.day(2).isoformat()})
+        self.assertEqual(response.json(), {"snapshots": 1})
+
+        response = self.client.get("/api/inventory/balances", params={"at": self.day(4).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual([(row["inventory_item_id"], row["quantity"]) for row in report], [(1, 7.0), (2, 250.0)])
+        self.assertEqual(report[0]["tail_changes"], 1)
+
+    def test_ledger_matches_item_quantities(self):
+        """Writes through the API keep the ledger head equal to the item quantity."""
+        self.client.post("/api/inventory/changes", json={"inventory_item_id": 1, "change_amount": -2.0, "reason": "Used"})
+        self.client.put("/api/inventory/items/2", json={"quantity": 100.0})
+        response = self.client.get("/api/inventory/balances", params={"at": (datetime.utcnow() + timedelta(minutes=1)).isoformat()})
+        balances = {row["inventory_item_id"]: row["quantity"] for row in response.json()}
+        self.assertEqual(balances, {1: 5.0, 2: 100.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the event-loop blocking-call detector in app.loop_monitor.
+"""
+
+import asyncio
+import time
+import unittest
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.loop_monitor import LoopLagMonitor
+from app.routers import diagnostics
+
+
+class TestBlockingCallDetector(unittest.IsolatedAsyncioTestCase):
+    """Test cases for capturing what blocked the event loop."""
+
+    async def asyncSetUp(self):
+        self.app = FastAPI()
+
+        @self.app.get("/slow")
+        async def blocking_route():
+            time.sleep(0.3)  # Blocks the event loop, as sync work in a coroutine does
+            return {}
+
+        @self.app.get("/fast")
+        async def fast_route():
+            return {}
+
+        self.monitor = LoopLagMonitor(interval_seconds=0.02, threshold_seconds=0.05)
+        self.monitor.start(self.app)
+        self.addAsyncCleanup(self.monitor.stop)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://test")
+        self.addAsyncCleanup(self.client.aclose)
+
+    async def test_blocking_handler_is_reported(self):
+        with self.assertLogs("app.loop_monitor", level="WARNING") as logs:
+            await self.client.get("/slow")
+            await self.client.get("/fast")
+            await self.wait_for_ticks(3)
+        self.assertIn("handler blocking_route", logs.output[0])
+
+        stats = self.monitor.stats()
+        self.assertTrue(stats["running"])
+        self.assertGreaterEqual(stats["max_lag_ms"], 200)
+        [site] = stats["blocking_calls"]
+        self.assertEqual((site["route"], site["handler"], site["count"]), ("/slow", "blocking_route", 1))
+        self.assertGreaterEqual(site["total_ms"], 200)
+        self.assertIn("time.sleep(0.3)", site["stack"])
+
+    async def test_idle_loop_reports_nothing(self):
+        await self.client.get("/fast")
+        await self.wait_for_ticks(3)
+        self.assertEqual(self.monitor.stats()["blocking_calls"], [])
+
+    async def wait_for_ticks(self, ticks):
+        await asyncio.sleep(self.monitor.interval_seconds * ticks + 0.02)
+
+
+class TestEventLoopDiagnostics(unittest.TestCase):
+    """Test cases for GET /api/diagnostics/event-loop."""
+
+    def test_endpoint(self):
+        app, _ = create_test_app(create_test_engine(), (diagnostics.router, "/api/diagnostics"))
+        response = TestClient(app).get("/api/diagnostics/event-loop")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("blocking_calls", response.json())
+        self.assertIn("threshold_ms", response.json())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Prometheus metrics in app.metrics.
+"""
+
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app import metrics
+from app.loop_monitor import LoopLagMonitor
+from app.metrics import MetricsMiddleware, Registry
+from app.models import Location
+from app.notifications import NotificationDispatcher
+from app.query_stats import QueryStatsMiddleware, instrument_engine
+from app.routers.locations import router as locations_router
+import app.websockets  # noqa: F401  registers the connected clients gauge
+
+
+class TestRegistry(unittest.TestCase):
+    """Test cases for the text exposition format."""
+
+    def test_counter_and_histogram(self):
+        registry = Registry()
+        counter = registry.counter("requests_total", "Requests.", ("route",))
+        histogram = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+        counter.inc('/a"b')
+        counter.inc('/a"b', amount=2)
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, "/x")
+
+        text = registry.render()
+        self.assertIn("# TYPE requests_total counter", text)
+        self.assertIn('requests_total{route="/a\\"b"} 3.0', text)
+        self.assertIn('latency_seconds_bucket{route="/x",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="/x",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="/x",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count{route="/x"} 3', text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_process_pool_and_socket_metrics(self):
+        """Scrape-time gauges are rendered from live state."""
+        text = metrics.registry.render()
+        names = ["freelims_db_pool_checkout_wait_seconds_bucket", "freelims_db_pool_connections"]
+        if metrics.resource is not None:
+            names += ["process_resident_memory_bytes", "process_cpu_seconds_total"]
+        for name in names:
+            self.assertIn(name, text)
+        self.assertIn('freelims_socketio_connected_clients{resource="inventory"} 0', text)
+
+    def test_process_metrics_without_resource_module(self):
+        """Without the `resource` module (Windows) CPU time is left out instead of failing."""
+        with patch.object(metrics, "resource", None):
+            self.assertEqual(metrics._cpu_seconds(), [])
+            metrics.registry.render()
+
+
+class TestMetricsMiddleware(unittest.TestCase):
+    """Test cases for per-route HTTP and SQL metrics."""
+
+    def setUp(self):
+        engine = instrument_engine(create_test_engine())
+        app, SessionLocal = create_test_app(engine, (locations_router, "/api/locations"))
+        app.add_middleware(MetricsMiddleware)
+        app.add_middleware(QueryStatsMiddleware, slow_request_ms=10_000, slow_query_ms=10_000)
+        self.client = TestClient(app)
+        db = SessionLocal()
+        db.add(Location(name="Shelf A"))
+        db.commit()
+        db.close()
+
+    def test_requests_are_labelled_by_route(self):
+        route = "/api/locations/{location_id}"
+        before = metrics.http_requests.value("GET", route, "200")
+        queries_before = metrics.db_queries.value(route)
+        for location_id in (1, 1, 2):
+            self.client.get(f"/api/locations/{location_id}")
+
+        self.assertEqual(metrics.http_requests.value("GET", route, "200") - before, 2)
+        self.assertGreaterEqual(metrics.http_requests.value("GET", route, "404"), 1)
+        self.assertEqual(metrics.db_queries.value(route) - queries_before, 3)
+        self.assertGreaterEqual(metrics.http_request_duration.count("GET", route), 3)
+
+        self.client.get("/no/such/path/12345")
+        self.assertGreaterEqual(metrics.http_requests.value("GET", "<unmatched>", "404"), 1)
+        self.assertNotIn("12345", metrics.registry.render())
+
+
+class TestAsyncMetrics(unittest.IsolatedAsyncioTestCase):
+    """Test cases for notification latency and event-loop lag."""
+
+    async def test_notify_latency(self):
+        with patch('app.notifications.notify_clients', new_callable=AsyncMock):
+            dispatcher = NotificationDispatcher(window_seconds=0.01)
+            dispatcher.start()
+            before = metrics.notify_latency.count("experiments")
+            dispatcher.publish("experiments", "update", [1])
+            await asyncio.sleep(0.05)
+            await dispatcher.stop()
+        self.assertEqual(metrics.notify_latency.count("experiments") - before, 1)
+
+    async def test_loop_lag_monitor(self):
+        """A blocked loop shows up as lag."""
+        monitor = LoopLagMonitor(interval_seconds=0.01)
+        before = metrics.event_loop_lag.count()
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.05)
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+        self.assertGreater(metrics.event_loop_lag.count(), before)
+        self.assertGreaterEqual(monitor.max_lag, 0.03)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the coalescing notification dispatcher in app.notifications.
+"""
+
+import asyncio
+import threading
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import backend_support  # noqa: F401
+from app.notifications import NotificationDispatcher
+
+
+class TestNotificationDispatcher(unittest.IsolatedAsyncioTestCase):
+    """Test cases for NotificationDispatcher."""
+
+    async def asyncSetUp(self):
+        patcher = patch('app.notifications.notify_clients', new_callable=AsyncMock)
+        self.notify = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.dispatcher = NotificationDispatcher(window_seconds=0.05)
+        self.dispatcher.start()
+
+    async def test_events_are_merged_per_resource(self):
+        """Events inside the window become one message per resource."""
+        for item_id in range(500):
+            self.dispatcher.publish('inventory', 'update', [item_id])
+        self.dispatcher.publish('inventory', 'update', [7])
+        self.dispatcher.publish('inventory', 'create', [500, 501])
+        self.dispatcher.publish('locations', 'update', [3])
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(self.notify.await_count, 2)
+        messages = {call.args[0]: call.args for call in self.notify.await_args_list}
+        resource, action, data = messages['inventory']
+        self.assertEqual(action, 'batch')
+        self.assertEqual(data['count'], 502)
+        self.assertEqual(data['changes'][0], {'action': 'update', 'ids': list(range(500))})
+        self.assertEqual(data['changes'][1], {'action': 'create', 'ids': [500, 501]})
+        self.assertEqual(messages['locations'][2]['changes'], [{'action': 'update', 'ids': [3]}])
+
+    async def test_publish_from_worker_thread(self):
+        """Sync route handlers can publish from the thread pool without blocking on the emit."""
+        thread = threading.Thread(target=self.dispatcher.publish, args=('inventory', 'create', [1]))
+        thread.start()
+        thread.join()
+        self.notify.assert_not_awaited()
+        await asyncio.sleep(0.1)
+        self.notify.assert_awaited_once_with('inventory', 'batch', {'changes': [{'action': 'create', 'ids': [1]}], 'count': 1})
+
+    async def test_stop_flushes_pending(self):
+        """Shutdown sends events still inside the window."""
+        self.dispatcher.window_seconds = 60
+        self.dispatcher.publish('inventory', 'update', [1])
+        await self.dispatcher.stop()
+        self.notify.assert_awaited_once()
+        self.dispatcher.publish('inventory', 'update', [2])
+        self.notify.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Unit tests for keyset pagination (app.pagination) on the inventory list endpoints.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.models import Chemical, InventoryAudit, InventoryChange, InventoryItem, Location, User
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor
+from app.routers.inventory import router as inventory_router
+
+ROWS = 23
+START = datetime(2024, 1, 1, 12, 0)
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """Test cases for following X-Next-Cursor through /items, /changes and /audit."""
+
+    def setUp(self):
+        """Seed items, changes and audit rows; changes and audits share timestamps in threes."""
+        engine = create_test_engine()
+        app, SessionLocal = create_test_app(engine, (inventory_router, "/api/inventory"))
+        self.client = TestClient(app)
+
+        db = SessionLocal()
+        db.add(User(id=1, email="tester@example.com", username="tester", full_name="Tester", hashed_password="x"))
+        db.add_all([Chemical(name="Acetone", cas_number="67-64-1"), Location(name="Shelf A")])
+        db.flush()
+        db.add_all([
+            InventoryItem(chemical_id=1, location_id=1, quantity=n, unit="L") for n in range(ROWS)
+        ])
+        db.flush()
+        db.add_all([
+            InventoryChange(inventory_item_id=n % 3 + 1, user_id=1, change_amount=1, reason="Used",
+                            timestamp=START + timedelta(minutes=n // 3))
+            for n in range(ROWS)
+        ])
+        db.add_all([
+            InventoryAudit(inventory_item_id=n % 3 + 1, user_id=1, field_name="quantity",
+                           old_value=str(n), new_value=str(n - 1), action="UPDATE",
+                           timestamp=START + timedelta(minutes=n // 3))
+            for n in range(ROWS)
+        ])
+        db.commit()
+        db.close()
+
+    def follow(self, path, limit):
+        """Fetch every page of `path` by cursor; returns the ids in order and the page count."""
+        ids, pages, params = [], 0, {"limit": limit}
+        while True:
+            response = self.client.get(path, params=params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.json())
+            pages += 1
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if cursor is None:
+                return ids, pages
+            params = {"limit": limit, "after": cursor}
+
+    def test_items_pages_cover_every_row_once(self):
+        """Items are paged by id, ascending, without duplicates or gaps."""
+        ids, pages = self.follow("/api/inventory/items", 5)
+        self.assertEqual(ids, list(range(1, ROWS + 1)))
+        self.assertEqual(pages, 5)
+
+    def test_changes_and_audit_pages_cover_every_row_once(self):
+        """Newest first, with rows sharing a timestamp split across page boundaries."""
+        expected = sorted(range(1, ROWS + 1), key=lambda n: ((n - 1) // 3, n), reverse=True)
+        for path in ("/api/inventory/changes", "/api/inventory/audit"):
+            with self.subTest(path=path):
+                for limit in (4, 5):
+                    ids, _ = self.follow(path, limit)
+                    self.assertEqual(ids, expected)
+
+    def test_after_overrides_skip(self):
+        """With a cursor, skip is ignored."""
+        first = self.client.get("/api/inventory/items", params={"limit": 5})
+        cursor = first.headers[NEXT_CURSOR_HEADER]
+        response = self.client.get("/api/inventory/items", params={"limit": 5, "after": cursor, "skip": 10})
+        self.assertEqual([row["id"] for row in response.json()], [6, 7, 8, 9, 10])
+
+        # Offset paging still works without one
+        response = self.client.get("/api/inventory/items", params={"limit": 5, "skip": 10})
+        self.assertEqual([row["id"] for row in response.json()], [11, 12, 13, 14, 15])
+
+    def test_no_cursor_on_the_last_page(self):
+        """A page that reaches the end, even exactly, has no next cursor."""
+        response = self.client.get("/api/inventory/items", params={"limit": ROWS})
+        self.assertEqual(len(response.json()), ROWS)
+        self.assertNotIn(NEXT_CURSOR_HEADER, response.headers)
+
+        response = self.client.get("/api/inventory/items", params={"limit": 5, "skip": 20})
+        self.assertEqual([row["id"] for row in response.json()], [21, 22, 23])
+        self.assertNotIn(NEXT_CURSOR_HEADER, response.headers)
+
+    def test_invalid_cursors_are_rejected(self):
+        """Malformed cursors and cursors for another sort key are a 400, not a 500."""
+        cases = {
+            "/api/inventory/items": [
+                "!!!", "bm90IGpzb24", encode_cursor([]), encode_cursor([1, 2]), encode_cursor([None]),
+                encode_cursor([[1]]),
+            ],
+            "/api/inventory/changes": [
+                "%%%", encode_cursor([5]), encode_cursor(["yesterday", 1]), encode_cursor([5, 1]),
+                encode_cursor([START, "x"]),
+            ],
+            "/api/inventory/audit": [encode_cursor({"id": 1}), encode_cursor([START, 1, 2])],
+        }
+        for path, cursors in cases.items():
+            for cursor in cursors:
+                with self.subTest(path=path, cursor=cursor):
+                    response = self.client.get(path, params={"after": cursor})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json()["detail"], "Invalid pagination cursor")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the password hashing worker pool and login rehashing.
+A cheap passlib scheme stands in for bcrypt to keep the tests fast.
+"""
+
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from passlib.context import CryptContext
+from passlib.exc import MissingBackendError
+from passlib.hash import bcrypt
+from sqlalchemy.orm import sessionmaker
+
+from backend_support import create_test_engine
+from app.auth import PasswordHasher, authenticate_user
+from app.models import User
+
+# md5_crypt plays the part of a hash made with an outdated cost factor
+TEST_CONTEXT = CryptContext(schemes=["sha256_crypt", "md5_crypt"], deprecated=["md5_crypt"],
+                            sha256_crypt__rounds=1000)
+
+
+class TestPasswordHasher(unittest.TestCase):
+    """Test cases for PasswordHasher."""
+
+    def test_queue_depth_is_bounded_by_workers(self):
+        """Work beyond the worker count waits in the queue and is reported."""
+        hasher = PasswordHasher(workers=2)
+        release = threading.Event()
+        futures = [hasher.submit(release.wait) for _ in range(5)]
+        try:
+            # Wait until both workers have picked up a job
+            for _ in range(100):
+                if hasher.stats()["running"] == 2:
+                    break
+                threading.Event().wait(0.01)
+            stats = hasher.stats()
+            self.assertEqual(stats["running"], 2)
+            self.assertEqual(stats["queue_depth"], 3)
+        finally:
+            release.set()
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(hasher.stats()["completed"], 5)
+        self.assertGreaterEqual(hasher.stats()["max_queue_depth"], 3)
+
+    def test_run_from_coroutine(self):
+        """The async entry point returns the function result."""
+        hasher = PasswordHasher(workers=1)
+        self.assertEqual(asyncio.run(hasher.run(pow, 2, 10)), 1024)
+
+
+@patch('app.auth.pwd_context', TEST_CONTEXT)
+class TestAuthenticateUser(unittest.TestCase):
+    """Test cases for authenticate_user."""
+
+    def setUp(self):
+        """Create a user whose password hash uses the deprecated scheme."""
+        self.SessionLocal = sessionmaker(bind=create_test_engine())
+        db = self.SessionLocal()
+        db.add(User(id=1, email="alice@example.com", username="alice", full_name="Alice",
+                    hashed_password=TEST_CONTEXT.handler("md5_crypt").hash("s3cret")))
+        db.commit()
+        db.close()
+
+    def authenticate(self, username, password):
+        """Return the authenticated username, or False."""
+        db = self.SessionLocal()
+        try:
+            user = asyncio.run(authenticate_user(db, username, password))
+            return user and user.username
+        finally:
+            db.close()
+
+    def test_wrong_password_and_unknown_user(self):
+        """Bad credentials are rejected without touching the stored hash."""
+        self.assertFalse(self.authenticate("alice", "wrong"))
+        self.assertFalse(self.authenticate("mallory", "s3cret"))
+
+    def test_outdated_hash_is_upgraded_on_login(self):
+        """A successful login rehashes a password stored with outdated settings."""
+        self.assertEqual(self.authenticate("alice", "s3cret"), "alice")
+
+        db = self.SessionLocal()
+        stored = db.query(User).filter(User.id == 1).one().hashed_password
+        db.close()
+        self.assertTrue(stored.startswith("$5$"))
+        self.assertTrue(self.authenticate("alice", "s3cret"))
+
+
+class TestBcryptRoundsUpgrade(unittest.TestCase):
+    """Raising the bcrypt cost rehashes stored passwords on the next login."""
+
+    ROUNDS = 4  # bcrypt's minimum, to keep the test fast
+
+    def setUp(self):
+        """Store a hash made with ROUNDS, then configure ROUNDS + 1."""
+        try:
+            old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=self.ROUNDS).hash("s3cret")
+        except (MissingBackendError, ValueError) as exc:
+            self.skipTest(f"bcrypt backend unavailable: {exc}")
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=self.ROUNDS + 1)
+
+        self.SessionLocal = sessionmaker(bind=create_test_engine())
+        db = self.SessionLocal()
+        db.add(User(id=1, email="alice@example.com", username="alice", full_name="Alice",
+                    hashed_password=old_hash))
+        db.commit()
+        db.close()
+
+    def stored_rounds(self):
+        db = self.SessionLocal()
+        try:
+            stored = db.query(User).filter(User.id == 1).one().hashed_password
+        finally:
+            db.close()
+        return bcrypt.from_string(stored).rounds
+
+    def test_login_rehashes_with_the_configured_rounds(self):
+        """The stored hash has the new cost after a successful login."""
+        self.assertEqual(self.stored_rounds(), self.ROUNDS)
+
+        db = self.SessionLocal()
+        try:
+            with patch('app.auth.pwd_context', self.context):
+                user = asyncio.run(authenticate_user(db, "alice", "s3cret"))
+        finally:
+            db.close()
+        self.assertEqual(user.username, "alice")
+        self.assertEqual(self.stored_rounds(), self.ROUNDS + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
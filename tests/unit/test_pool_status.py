@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the connection pool metrics and status in app.database.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import backend_support  # noqa: F401
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.database import MeteredQueuePool, PoolMetrics, get_pool_status, pool_metrics
+
+
+class TestPoolMetrics(unittest.TestCase):
+    """Test cases for the PoolMetrics wait histogram."""
+
+    def test_waits_are_bucketed(self):
+        """Each wait lands in the first bucket whose bound it does not exceed."""
+        metrics = PoolMetrics(buckets_ms=[1, 10])
+        metrics.observe_wait(0.0005)
+        metrics.observe_wait(0.001)
+        metrics.observe_wait(0.005)
+        metrics.observe_wait(2.0, timed_out=True)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["checkouts_total"], 3)
+        self.assertEqual(snapshot["timeouts_total"], 1)
+        self.assertEqual(snapshot["wait_histogram_ms"], [
+            {"le": 1, "count": 2}, {"le": 10, "count": 1}, {"le": "+Inf", "count": 1},
+        ])
+        self.assertEqual(snapshot["wait_ms_max"], 2000.0)
+        self.assertAlmostEqual(snapshot["wait_seconds_total"], 2.0065)
+
+        metrics.reset()
+        self.assertEqual(metrics.snapshot()["checkouts_total"], 0)
+
+
+class TestPoolStatus(unittest.TestCase):
+    """Test cases for get_pool_status on a small MeteredQueuePool."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.temp_dir, 'pool.db')}",
+            poolclass=MeteredQueuePool, pool_size=1, max_overflow=1, pool_timeout=0.05,
+        )
+        pool_metrics.reset()
+
+    def tearDown(self):
+        self.engine.dispose()
+        pool_metrics.reset()
+        shutil.rmtree(self.temp_dir)
+
+    def test_status_tracks_checkouts_overflow_and_timeouts(self):
+        """Checked out connections, overflow and a timed out checkout are reported."""
+        status = get_pool_status(self.engine)
+        self.assertEqual(status["class"], "MeteredQueuePool")
+        self.assertEqual(status["size"], 1)
+        self.assertEqual(status["max_overflow"], 1)
+        self.assertEqual(status["checked_out"], 0)
+
+        first = self.engine.connect()
+        second = self.engine.connect()
+        status = get_pool_status(self.engine)
+        self.assertEqual(status["checked_out"], 2)
+        self.assertEqual(status["overflow"], 1)
+        self.assertEqual(status["checkouts_total"], 2)
+
+        with self.assertRaises(PoolTimeoutError):
+            self.engine.connect()
+        status = get_pool_status(self.engine)
+        self.assertEqual(status["timeouts_total"], 1)
+        self.assertEqual(sum(bucket["count"] for bucket in status["wait_histogram_ms"]), 3)
+        # The timed out checkout waited the full pool timeout
+        self.assertGreaterEqual(status["wait_ms_max"], 50)
+
+        second.close()
+        first.close()
+        status = get_pool_status(self.engine)
+        self.assertEqual(status["checked_out"], 0)
+        self.assertEqual(status["checked_in"], 1)
+
+    def test_max_overflow_is_read_from_the_pool(self):
+        """The configured overflow of the pool passed in is reported, also after recreate()."""
+        engine = create_engine(
+            f"sqlite:///{os.path.join(self.temp_dir, 'other.db')}",
+            poolclass=MeteredQueuePool, pool_size=2, max_overflow=7,
+        )
+        self.assertEqual(get_pool_status(engine)["max_overflow"], 7)
+        engine.dispose()
+        self.assertEqual(get_pool_status(engine)["max_overflow"], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the sampling profiler in app.profiler.
+"""
+
+import json
+import threading
+import time
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from backend_support import create_test_app, create_test_engine
+from app.auth import create_access_token, user_cache
+from app.models import User
+from app.profiler import ProfileRequestMiddleware, SamplingProfiler, profile_lock
+from app.routers import diagnostics
+
+
+def busy_loop(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test cases for sampling and exporting stacks."""
+
+    def profile_busy_thread(self):
+        thread = threading.Thread(target=busy_loop, args=(0.3,), name="busy")
+        thread.start()
+        profiler = SamplingProfiler(interval_seconds=0.005).run(0.15)
+        thread.join()
+        return profiler
+
+    def test_collapsed_stacks(self):
+        profiler = self.profile_busy_thread()
+        self.assertGreater(profiler.sample_count, 5)
+        busy = [line for line in profiler.collapsed().splitlines() if line.startswith("busy;")]
+        self.assertTrue(busy)
+        stack, count = busy[0].rsplit(" ", 1)
+        self.assertIn("busy_loop (test_profiler.py:", stack.split(";")[-1])
+        self.assertGreater(int(count), 0)
+
+    def test_speedscope(self):
+        document = self.profile_busy_thread().speedscope()
+        frames = document["shared"]["frames"]
+        profile = next(profile for profile in document["profiles"] if profile["name"] == "busy")
+        self.assertEqual(profile["type"], "sampled")
+        self.assertEqual(len(profile["samples"]), len(profile["weights"]))
+        leaf = frames[profile["samples"][0][-1]]
+        self.assertEqual(leaf["name"], "busy_loop")
+        self.assertTrue(all(0 <= index < len(frames) for sample in profile["samples"] for index in sample))
+
+
+class TestProfileEndpoint(unittest.TestCase):
+    """Test cases for GET /api/diagnostics/profile."""
+
+    def setUp(self):
+        app, _ = create_test_app(create_test_engine(), (diagnostics.router, "/api/diagnostics"))
+        self.client = TestClient(app)
+
+    def test_collapsed_and_speedscope(self):
+        response = self.client.get("/api/diagnostics/profile", params={"seconds": 0.05})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn(".collapsed.txt", response.headers["content-disposition"])
+        self.assertGreater(int(response.headers["x-profile-samples"]), 0)
+
+        response = self.client.get("/api/diagnostics/profile", params={"seconds": 0.05, "format": "speedscope"})
+        self.assertIn("profiles", json.loads(response.content))
+
+    def test_limits(self):
+        self.assertEqual(self.client.get("/api/diagnostics/profile", params={"seconds": 3600}).status_code, 422)
+        with profile_lock:
+            self.assertEqual(self.client.get("/api/diagnostics/profile", params={"seconds": 0.05}).status_code, 409)
+
+
+class TestProfileRequestMiddleware(unittest.TestCase):
+    """Test cases for profiling a single request with ?__profile=1."""
+
+    def setUp(self):
+        app = FastAPI()
+
+        @app.get("/slow")
+        def slow_handler():
+            busy_loop(0.1)
+            return {"ok": True}
+
+        engine = create_test_engine()
+        SessionLocal = sessionmaker(bind=engine)
+        db = SessionLocal()
+        db.add_all([
+            User(username="admin", email="admin@example.com", is_active=True, is_admin=True),
+            User(username="analyst", email="analyst@example.com", is_active=True, is_admin=False),
+        ])
+        db.commit()
+        db.close()
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+
+        app.add_middleware(ProfileRequestMiddleware, enabled=True, interval_seconds=0.002,
+                           session_factory=SessionLocal)
+        self.client = TestClient(app)
+        self.admin = {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+
+    def test_profiled_request(self):
+        response = self.client.get("/slow", params={"__profile": "1"}, headers=self.admin)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["x-profiled-status"], "200")
+        lines = response.text.splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all("slow_handler" in line for line in lines))
+        self.assertTrue(any("busy_loop" in line for line in lines))
+
+        response = self.client.get("/slow", params={"__profile": "speedscope"}, headers=self.admin)
+        self.assertEqual(response.json()["exporter"], "freelims")
+
+    def test_normal_request(self):
+        self.assertEqual(self.client.get("/slow").json(), {"ok": True})
+
+    def test_requires_admin_token(self):
+        """Without an admin's token the request is served, not profiled."""
+        analyst = {"Authorization": f"Bearer {create_access_token({'sub': 'analyst'})}"}
+        for headers in ({}, analyst, {"Authorization": "Bearer not-a-jwt"}):
+            response = self.client.get("/slow", params={"__profile": "1"}, headers=headers)
+            self.assertEqual(response.json(), {"ok": True})
+            self.assertNotIn("x-profiled-status", response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Query-count tests for list endpoints whose response models nest relationships.
+
+Each endpoint must load a page with a fixed number of SQL statements,
+however many rows the page holds, instead of lazy loading per row.
+"""
+
+import unittest
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from backend_support import assert_max_queries, create_test_app, create_test_engine
+from app.models import Chemical, Experiment, ExperimentNote, InventoryItem, Location, User
+from app.models import Test as LabTest  # a Test* name would be collected by pytest
+from app.routers.experiments import router as experiments_router
+from app.routers.inventory import router as inventory_router
+from app.routers.tests import router as tests_router
+
+ROWS = 20
+
+
+class TestListQueryCounts(unittest.TestCase):
+    """Test cases for the statement count of list endpoints."""
+
+    def setUp(self):
+        """Seed rows that each reference their own related rows."""
+        self.engine = create_test_engine()
+        app, self.SessionLocal = create_test_app(
+            self.engine,
+            (experiments_router, "/api/experiments"),
+            (inventory_router, "/api/inventory"),
+            (tests_router, ""),
+        )
+        self.client = TestClient(app)
+
+        now = datetime.utcnow()
+        db = self.SessionLocal()
+        users = [
+            User(email=f"user{n}@example.com", username=f"user{n}", full_name=f"User {n}", hashed_password="x")
+            for n in range(ROWS)
+        ]
+        chemicals = [Chemical(name=f"Chemical {n}", cas_number=f"{n}-00-0") for n in range(ROWS)]
+        locations = [Location(name=f"Shelf {n}") for n in range(ROWS)]
+        db.add_all(users + chemicals + locations)
+        db.flush()
+        for n in range(ROWS):
+            db.add(Experiment(
+                title=f"Experiment {n}", user_id=users[0].id, status="planned", start_date=now,
+                chemicals=[chemicals[n], chemicals[(n + 1) % ROWS]],
+                notes=[ExperimentNote(content="Started"), ExperimentNote(content="Done")],
+            ))
+            db.add(LabTest(
+                internal_id=f"T-{n}", test_id=f"{n}", sample_id=f"S-{n}", test_type="HPLC", method="USP",
+                status="Pending", start_date=now, test_date=now, analysts=[users[n]],
+            ))
+            db.add(InventoryItem(
+                chemical_id=chemicals[n].id, location_id=locations[n].id, quantity=1, unit="L",
+                expiration_date=now,
+            ))
+        db.commit()
+        db.close()
+
+    def assert_constant_queries(self, url, limit, expected_rows=ROWS):
+        """The page size must not change the number of statements."""
+        for page_size in (2, ROWS):
+            with assert_max_queries(self.engine, limit):
+                response = self.client.get(url, params={"limit": page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()), min(page_size, expected_rows))
+
+    def test_experiments(self):
+        """Experiments load their notes and chemicals with one query each."""
+        self.assert_constant_queries("/api/experiments/", 3)
+        body = self.client.get("/api/experiments/").json()
+        self.assertTrue(all(len(experiment["notes"]) == 2 for experiment in body))
+        self.assertTrue(all(len(experiment["chemicals"]) == 2 for experiment in body))
+
+    def test_tests(self):
+        """Tests load their analysts with one query."""
+        self.assert_constant_queries("/api/tests/", 2)
+        body = self.client.get("/api/tests/").json()
+        self.assertTrue(all(len(test["analysts"]) == 1 for test in body))
+
+    def test_inventory_items(self):
+        """Inventory items are joined to their chemical and location."""
+        self.assert_constant_queries("/api/inventory/items", 1)
+        self.assert_constant_queries("/api/inventory/expiring", 1)
+
+    def test_detail_endpoints(self):
+        """Single-row endpoints use the same loaders."""
+        with assert_max_queries(self.engine, 3):
+            self.assertEqual(self.client.get("/api/experiments/1").status_code, 200)
+        with assert_max_queries(self.engine, 2):
+            self.assertEqual(self.client.get("/api/tests/1").status_code, 200)
+        with assert_max_queries(self.engine, 1):
+            self.assertEqual(self.client.get("/api/inventory/items/1").status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Unit tests for per-request SQL instrumentation in app.query_stats.
+"""
+
+import json
+import unittest
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.models import Location
+from app.query_stats import QueryStatsMiddleware, instrument_engine, normalize_sql, param_shape
+from app.routers.locations import router as locations_router
+
+
+class TestQueryStats(unittest.TestCase):
+    """Test cases for statement counting, Server-Timing and the slow log."""
+
+    def setUp(self):
+        engine = instrument_engine(create_test_engine())
+        self.app, SessionLocal = create_test_app(engine, (locations_router, "/api/locations"))
+        db = SessionLocal()
+        db.add_all([Location(name=f"Shelf {n}") for n in range(3)])
+        db.commit()
+        db.close()
+
+    def client(self, **options):
+        self.app.user_middleware.clear()
+        self.app.middleware_stack = None
+        self.app.add_middleware(QueryStatsMiddleware, **options)
+        return TestClient(self.app)
+
+    def test_normalize_sql(self):
+        """Whitespace, literals and IN lists are collapsed."""
+        self.assertEqual(
+            normalize_sql("SELECT *\n  FROM items WHERE id IN (%(id_1_1)s, %(id_1_2)s) AND name = 'x' LIMIT 10"),
+            "SELECT * FROM items WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+        self.assertEqual(normalize_sql("SELECT id_1 FROM t WHERE a = ?"), "SELECT id_1 FROM t WHERE a = ?")
+
+    def test_param_shape(self):
+        """Only the types of bind parameters are reported."""
+        self.assertEqual(param_shape({"name": "secret", "id": 3, "x": None}), {"name": "str", "id": "int", "x": "null"})
+        self.assertEqual(param_shape(("secret", 1.5)), ["str", "float"])
+        self.assertEqual(param_shape([{"a": 1}, {"a": 2}], executemany=True), {"rows": 2, "row": {"a": "int"}})
+
+    def test_server_timing_header(self):
+        """Responses report the request's statement count and database time."""
+        client = self.client(slow_request_ms=10_000, slow_query_ms=10_000)
+        response = client.get("/api/locations/", headers={"Origin": "http://localhost:3001"})
+        self.assertEqual(response.status_code, 200)
+        timing = response.headers["server-timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="1 queries", db-slowest;dur=[\d.]+, app;dur=[\d.]+$')
+        self.assertEqual(response.headers["timing-allow-origin"], "http://localhost:3001")
+
+    def test_slow_request_log(self):
+        """Requests over the threshold are logged as JSON with normalized SQL."""
+        client = self.client(slow_request_ms=0, slow_query_ms=10_000)
+        with self.assertLogs("app.query_stats.slow", level="WARNING") as logs:
+            client.get("/api/locations/1")
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["route"], "/api/locations/{location_id}")
+        self.assertEqual(record["handler"], "read_location")
+        self.assertEqual((record["method"], record["status"], record["queries"]), ("GET", 200, 1))
+        self.assertIn("FROM locations", record["slowest"]["sql"])
+        self.assertTrue(all(shape == "int" for shape in record["slowest"]["params"]))
+
+    def test_fast_requests_not_logged(self):
+        client = self.client(slow_request_ms=10_000, slow_query_ms=10_000)
+        with self.assertNoLogs("app.query_stats.slow", level="WARNING"):
+            client.get("/api/locations/")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the chemical and inventory search endpoints.
+These run the SQLite fallback of app.search; the PostgreSQL trigram and
+full-text paths share the same endpoints and ordering contract.
+"""
+
+import unittest
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.models import Chemical, InventoryItem, Location
+from app.routers.chemicals import router as chemicals_router
+from app.routers.inventory import router as inventory_router
+
+
+class TestChemicalSearch(unittest.TestCase):
+    """Test cases for ranked chemical search."""
+
+    def setUp(self):
+        """Seed a handful of chemicals and inventory."""
+        engine = create_test_engine()
+        app, self.SessionLocal = create_test_app(
+            engine,
+            (chemicals_router, "/api/chemicals"),
+            (inventory_router, "/api/inventory"),
+        )
+        self.client = TestClient(app)
+
+        db = self.SessionLocal()
+        db.add_all([
+            Chemical(name="Acetonitrile", cas_number="75-05-8", formula="C2H3N"),
+            Chemical(name="Acetone", cas_number="67-64-1", formula="C3H6O"),
+            Chemical(name="Sodium acetate", cas_number="127-09-3", formula="C2H3NaO2"),
+            Chemical(name="Ethanol", cas_number="64-17-5", formula="C2H6O",
+                     description="Common solvent, miscible with acetone"),
+            Location(name="Flammables cabinet"),
+        ])
+        db.flush()
+        db.add(InventoryItem(chemical_id=2, location_id=1, quantity=2.5, unit="L", batch_number="ACE-2024"))
+        db.commit()
+        db.close()
+
+    def test_exact_name_ranks_first(self):
+        """An exact name match outranks prefix and substring matches."""
+        response = self.client.get("/api/chemicals/", params={"search": "acetone"})
+        self.assertEqual(response.status_code, 200)
+        names = [chemical["name"] for chemical in response.json()]
+        self.assertEqual(names[0], "Acetone")
+        # The description-only match is still returned, but last
+        self.assertEqual(names[-1], "Ethanol")
+
+    def test_cas_number_search(self):
+        """Searching by CAS number finds the chemical."""
+        response = self.client.get("/api/chemicals/", params={"search": "67-64"})
+        self.assertEqual([c["name"] for c in response.json()], ["Acetone"])
+
+    def test_like_wildcards_are_literal(self):
+        """Percent and underscore in the search term do not act as wildcards."""
+        response = self.client.get("/api/chemicals/", params={"search": "%"})
+        self.assertEqual(response.json(), [])
+
+    def test_typeahead(self):
+        """Typeahead returns lightweight ranked rows, using prefix match for short terms."""
+        response = self.client.get("/api/chemicals/search", params={"q": "ace", "limit": 2})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual(len(results), 2)
+        self.assertEqual(set(results[0]), {"id", "name", "cas_number", "formula", "score"})
+        self.assertGreaterEqual(results[0]["score"], results[1]["score"])
+
+        short = self.client.get("/api/chemicals/search", params={"q": "ac"}).json()
+        self.assertEqual([c["name"] for c in short], ["Acetone", "Acetonitrile"])
+
+    def test_inventory_search(self):
+        """Inventory search matches chemical names and batch numbers."""
+        by_name = self.client.get("/api/inventory/items", params={"search": "aceton"}).json()
+        by_batch = self.client.get("/api/inventory/items", params={"search": "ACE-20"}).json()
+        self.assertEqual(len(by_name), 1)
+        self.assertEqual(by_name, by_batch)
+
+    def test_inventory_search_is_ranked(self):
+        """Items are ordered by their chemical's relevance, then id, and paged by offset."""
+        db = self.SessionLocal()
+        db.add_all([
+            InventoryItem(chemical_id=1, location_id=1, quantity=1, unit="L", batch_number="ACN-1"),
+            InventoryItem(chemical_id=3, location_id=1, quantity=1, unit="kg", batch_number="NA-1"),
+            InventoryItem(chemical_id=2, location_id=1, quantity=1, unit="L", batch_number="ACE-2025"),
+        ])
+        db.commit()
+        db.close()
+
+        response = self.client.get("/api/inventory/items", params={"search": "acetone"})
+        self.assertEqual([item["id"] for item in response.json()], [1, 4])
+        response = self.client.get("/api/inventory/items", params={"search": "aceto"})
+        # Prefix matches on Acetone and Acetonitrile, by id
+        self.assertEqual([item["id"] for item in response.json()], [1, 2, 4])
+        response = self.client.get("/api/inventory/items", params={"search": "aceto", "skip": 1, "limit": 1})
+        self.assertEqual([item["id"] for item in response.json()], [2])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+        # An exact batch number comes first
+        response = self.client.get("/api/inventory/items", params={"search": "acn-1"})
+        self.assertEqual([item["id"] for item in response.json()], [2])
+
+        response = self.client.get("/api/inventory/items", params={"search": "aceto", "after": "MQ"})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
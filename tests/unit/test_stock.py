@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the current-stock aggregates in app.stock and the
+/api/inventory/summary endpoints.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.models import Chemical, InventoryItem, Location, StockLevel, User
+from app.routers.inventory import router as inventory_router
+from app.stock import rebuild_stock_levels
+
+
+@patch('app.routers.inventory.dispatcher')
+class TestStockLevels(unittest.TestCase):
+    """Stock aggregates follow every inventory write."""
+
+    def setUp(self):
+        """Seed two chemicals and two locations."""
+        engine = create_test_engine()
+        app, self.SessionLocal = create_test_app(engine, (inventory_router, "/api/inventory"))
+        self.client = TestClient(app)
+
+        db = self.SessionLocal()
+        db.add_all([
+            User(id=1, email="tester@example.com", username="tester", full_name="Tester", hashed_password="x"),
+            Chemical(name="Acetone", cas_number="67-64-1"),
+            Chemical(name="Sodium chloride", cas_number="7647-14-5"),
+            Location(name="Flammables cabinet"),
+            Location(name="Shelf B"),
+        ])
+        db.commit()
+        db.close()
+
+    def create_item(self, chemical_id, location_id, quantity, unit):
+        response = self.client.post("/api/inventory/items", json={
+            "chemical_id": chemical_id, "location_id": location_id, "quantity": quantity, "unit": unit,
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json()["id"]
+
+    def by_chemical(self, **params):
+        response = self.client.get("/api/inventory/summary/chemicals", params=params)
+        self.assertEqual(response.status_code, 200)
+        return {(row["chemical_name"], row["unit"]): row for row in response.json()}
+
+    def stock_rows(self):
+        db = self.SessionLocal()
+        rows = sorted((row.chemical_id, row.location_id, row.unit, round(row.quantity, 6), row.item_count)
+                      for row in db.query(StockLevel))
+        db.close()
+        return rows
+
+    def test_totals_in_canonical_units(self, mock_dispatcher):
+        """Items in different units of one dimension are summed in the canonical unit."""
+        self.create_item(1, 1, 500, "mL")
+        self.create_item(1, 2, 1.5, "L")
+        self.create_item(2, 2, 0.25, "kg")
+
+        totals = self.by_chemical()
+        self.assertEqual(totals[("Acetone", "mL")]["quantity"], 2000)
+        self.assertEqual(totals[("Acetone", "mL")]["item_count"], 2)
+        self.assertEqual(totals[("Acetone", "mL")]["location_count"], 2)
+        self.assertEqual(totals[("Sodium chloride", "g")]["quantity"], 250)
+        self.assertEqual(list(self.by_chemical(unit="L")), [("Acetone", "mL")])
+
+        shelf = self.client.get("/api/inventory/summary/locations", params={"location_id": 2}).json()
+        self.assertEqual([(row["chemical_name"], row["quantity"]) for row in shelf],
+                         [("Acetone", 1500), ("Sodium chloride", 250)])
+
+    def test_changes_and_updates(self, mock_dispatcher):
+        """Consumption, moves and unit changes adjust the aggregates incrementally."""
+        item_id = self.create_item(1, 1, 1, "L")
+        self.client.post("/api/inventory/changes", json={
+            "inventory_item_id": item_id, "change_amount": -0.25, "reason": "Used",
+        })
+        self.assertEqual(self.stock_rows(), [(1, 1, "mL", 750, 1)])
+
+        self.client.put(f"/api/inventory/items/{item_id}", json={"location_id": 2, "quantity": 0.5})
+        self.assertEqual(self.stock_rows(), [(1, 2, "mL", 500, 1)])
+
+        self.client.put(f"/api/inventory/items/{item_id}", json={"unit": "bottles"})
+        self.assertEqual(self.stock_rows(), [(1, 2, "bottles", 0.5, 1)])
+
+        db = self.SessionLocal()
+        db.delete(db.get(InventoryItem, item_id))
+        db.commit()
+        db.close()
+        self.assertEqual(self.stock_rows(), [])
+
+    def test_import_and_rebuild(self, mock_dispatcher):
+        """Bulk imports are aggregated, and a rebuild gives the same totals."""
+        content = (
+            "cas_number,location,quantity,unit\n"
+            "67-64-1,Flammables cabinet,2,L\n"
+            "67-64-1,Flammables cabinet,250,ml\n"
+        )
+        response = self.client.post(
+            "/api/inventory/import",
+            files={"file": ("stock.csv", content.encode("utf-8"), "text/csv")},
+        )
+        self.assertEqual(response.json()["imported"], 2)
+        incremental = self.stock_rows()
+        self.assertEqual(incremental, [(1, 1, "mL", 2250, 2)])
+
+        db = self.SessionLocal()
+        self.assertEqual(rebuild_stock_levels(db), 1)
+        db.close()
+        self.assertEqual(self.stock_rows(), incremental)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the delta sync endpoint in app.routers.sync.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.models import Chemical, DeletedRecord, InventoryItem, Location
+from app.routers.sync import router as sync_router
+from app.sync import SYNC_TOMBSTONE_RETENTION_DAYS, collect_changes, prune_tombstones
+
+# A day ago: after the seeded rows, within the tombstone retention period
+SINCE = (datetime.utcnow() - timedelta(days=1)).isoformat()
+
+
+class TestDeltaSync(unittest.TestCase):
+    """Test cases for GET /api/sync."""
+
+    def setUp(self):
+        """Seed rows last changed well before the test watermark."""
+        engine = create_test_engine()
+        app, self.SessionLocal = create_test_app(engine, (sync_router, "/api/sync"))
+        self.client = TestClient(app)
+
+        old = datetime(2020, 1, 1)
+        db = self.SessionLocal()
+        db.add_all([
+            Chemical(name="Acetone", created_at=old),
+            Location(name="Shelf A", created_at=old),
+            Location(name="Shelf B", created_at=old),
+        ])
+        db.flush()
+        db.add_all([
+            InventoryItem(chemical_id=1, location_id=1, quantity=1.0, unit="L", created_at=old),
+            InventoryItem(chemical_id=1, location_id=1, quantity=2.0, unit="L", created_at=old),
+        ])
+        db.commit()
+        db.close()
+
+    def test_without_watermark_resets(self):
+        """The first sync returns a watermark and asks for a full load."""
+        response = self.client.get("/api/sync")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body["watermark"])
+        self.assertEqual(set(body["changes"]), {"inventory", "chemicals", "locations"})
+        self.assertTrue(all(change["reset"] for change in body["changes"].values()))
+
+    def test_reports_upserts_and_deletes(self):
+        """Updated and deleted rows are reported by id; untouched resources are empty."""
+        db = self.SessionLocal()
+        db.get(InventoryItem, 2).quantity = 1.5
+        db.delete(db.get(Location, 2))
+        db.commit()
+        self.assertEqual(db.query(DeletedRecord).count(), 1)
+        db.close()
+
+        response = self.client.get("/api/sync", params={"since": SINCE})
+        changes = response.json()["changes"]
+        self.assertEqual(changes["inventory"], {"reset": False, "upserted": [2], "deleted": []})
+        self.assertEqual(changes["locations"], {"reset": False, "upserted": [], "deleted": [2]})
+        self.assertEqual(changes["chemicals"], {"reset": False, "upserted": [], "deleted": []})
+
+    def test_resource_filter(self):
+        """Only the requested resources are returned; unknown names are rejected."""
+        response = self.client.get("/api/sync", params={"since": SINCE, "resource": "locations"})
+        self.assertEqual(list(response.json()["changes"]), ["locations"])
+        response = self.client.get("/api/sync", params={"resource": "reagents"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_watermark(self):
+        """A malformed watermark is a client error."""
+        response = self.client.get("/api/sync", params={"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_too_many_changes_resets(self):
+        """A resource with more changes than the limit is flagged for a full reload."""
+        db = self.SessionLocal()
+        for item in db.query(InventoryItem):
+            item.quantity += 1
+        db.commit()
+        result = collect_changes(db, since=datetime.fromisoformat(SINCE), resources=["inventory"], limit=1)
+        db.close()
+        self.assertTrue(result["changes"]["inventory"]["reset"])
+
+    def test_watermark_older_than_retention_resets(self):
+        """Tombstones may have been pruned, so an old watermark means a full reload."""
+        stale = (datetime.utcnow() - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS + 1)).isoformat()
+        response = self.client.get("/api/sync", params={"since": stale})
+        self.assertTrue(all(change["reset"] for change in response.json()["changes"].values()))
+
+    def test_prune_tombstones(self):
+        """Only tombstones older than the retention period are deleted."""
+        now = datetime.utcnow()
+        db = self.SessionLocal()
+        db.add_all([
+            DeletedRecord(resource="locations", record_id=7, deleted_at=now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS + 1)),
+            DeletedRecord(resource="locations", record_id=8, deleted_at=now - timedelta(days=1)),
+        ])
+        db.commit()
+        self.assertEqual(prune_tombstones(db, now), 1)
+        self.assertEqual([row.record_id for row in db.query(DeletedRecord)], [8])
+        db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
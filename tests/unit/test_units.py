@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the unit registry in app.units and its use by inventory changes.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from backend_support import create_test_app, create_test_engine
+from app.models import Chemical, InventoryItem, Location, User
+from app.routers.inventory import router as inventory_router
+from app.units import UnitConversionError, convert, convert_many, lookup, to_canonical
+
+
+class TestUnitRegistry(unittest.TestCase):
+    """Test cases for unit lookup and conversion."""
+
+    def test_aliases_and_canonical_units(self):
+        """Spelling and case variants resolve to the same unit."""
+        self.assertEqual(lookup(" Liters ").symbol, "L")
+        self.assertEqual(to_canonical(2.5, "KG"), (2500.0, "g"))
+        self.assertEqual(to_canonical(250, "uL"), (0.25, "mL"))
+        self.assertEqual(to_canonical(3, "Bottles"), (3, "bottles"))
+
+    def test_conversions(self):
+        """Same-dimension conversions need nothing else; crossing dimensions uses chemical data."""
+        self.assertAlmostEqual(convert(1500, "mg", "g"), 1.5)
+        self.assertAlmostEqual(convert(100, "mL", "g", density=0.791), 79.1)
+        self.assertAlmostEqual(convert(2, "mmol", "mg", molecular_weight=58.08), 116.16)
+        self.assertAlmostEqual(convert(1, "L", "mol", density=0.791, molecular_weight=58.08), 13.619, places=3)
+        with self.assertRaises(UnitConversionError):
+            convert(1, "L", "kg")
+        with self.assertRaises(UnitConversionError):
+            convert(1, "g", "bottles")
+
+    def test_convert_many(self):
+        """Batch conversion handles mixed units, to canonical or to a target unit."""
+        self.assertEqual(convert_many([1, 500, 2], ["L", "ml", "vials"]),
+                         [(1000.0, "mL"), (500.0, "mL"), (2.0, "vials")])
+        self.assertEqual(convert_many([1, 500], ["kg", "g"], to_unit="kg"), [(1.0, "kg"), (0.5, "kg")])
+
+
+@patch('app.routers.inventory.dispatcher')
+class TestUnitAwareChanges(unittest.TestCase):
+    """Inventory changes and items use the registry."""
+
+    def setUp(self):
+        engine = create_test_engine()
+        app, self.SessionLocal = create_test_app(engine, (inventory_router, "/api/inventory"))
+        self.client = TestClient(app)
+
+        db = self.SessionLocal()
+        db.add_all([
+            User(id=1, email="tester@example.com", username="tester", full_name="Tester", hashed_password="x"),
+            Chemical(name="Ethanol", cas_number="64-17-5", molecular_weight=46.07, density=0.789),
+            Location(name="Flammables cabinet"),
+        ])
+        db.flush()
+        db.add(InventoryItem(chemical_id=1, location_id=1, quantity=2.5, unit="L"))
+        db.commit()
+        db.close()
+
+    def item(self):
+        db = self.SessionLocal()
+        item = db.get(InventoryItem, 1)
+        db.close()
+        return item
+
+    def test_canonical_columns(self, mock_dispatcher):
+        """Items store their quantity in canonical units as well."""
+        item = self.item()
+        self.assertEqual((item.canonical_quantity, item.canonical_unit), (2500.0, "mL"))
+
+    def test_change_in_other_unit(self, mock_dispatcher):
+        """A change given in another unit is converted to the item's unit."""
+        response = self.client.post("/api/inventory/changes", json={
+            "inventory_item_id": 1, "change_amount": -250, "unit": "mL", "reason": "Used",
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertAlmostEqual(response.json()["change_amount"], -0.25)
+
+        response = self.client.post("/api/inventory/changes", json={
+            "inventory_item_id": 1, "change_amount": -78.9, "unit": "g", "reason": "Weighed out",
+        })
+        self.assertEqual(response.status_code, 201)
+        item = self.item()
+        self.assertAlmostEqual(item.quantity, 2.15)
+        self.assertAlmostEqual(item.canonical_quantity, 2150.0)
+
+    def test_incompatible_unit(self, mock_dispatcher):
+        """Units that cannot be converted are rejected."""
+        response = self.client.post("/api/inventory/changes", json={
+            "inventory_item_id": 1, "change_amount": -1, "unit": "bottles", "reason": "Used",
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.item().quantity, 2.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the per-resource Socket.IO rooms in app.websockets.
+"""
+
+import unittest
+from unittest.mock import patch
+
+import backend_support  # noqa: F401
+from app import websockets
+
+
+class TestResourceRooms(unittest.IsolatedAsyncioTestCase):
+    """Updates only reach the clients subscribed to the resource."""
+
+    async def asyncSetUp(self):
+        self.sent = []
+
+        async def capture(eio_sid, eio_pkt):
+            self.sent.append((eio_sid, eio_pkt.data))
+
+        patcher = patch.object(websockets.sio, '_send_eio_packet', capture)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sids = {}
+        for eio_sid in ("eio-a", "eio-b", "eio-c"):
+            self.sids[eio_sid] = await websockets.sio.manager.connect(eio_sid, "/")
+
+    async def asyncTearDown(self):
+        for sid in self.sids.values():
+            await websockets.sio.manager.disconnect(sid, "/")
+            await websockets.disconnect(sid)
+
+    def updates_for(self, event):
+        return [eio_sid for eio_sid, data in self.sent if isinstance(data, str) and f'"{event}"' in data]
+
+    async def test_emit_targets_subscribers(self):
+        """Only subscribed clients receive inventory updates."""
+        await websockets.subscribe(self.sids["eio-a"], {"resource": "inventory"})
+        await websockets.subscribe(self.sids["eio-b"], {"resource": "inventory"})
+        await websockets.notify_clients("inventory", "update", {"id": 1})
+        self.assertEqual(sorted(self.updates_for("inventory_updated")), ["eio-a", "eio-b"])
+
+    async def test_unsubscribe_leaves_room(self):
+        """Unsubscribed clients stop receiving updates."""
+        await websockets.subscribe(self.sids["eio-a"], {"resource": "inventory"})
+        await websockets.subscribe(self.sids["eio-b"], {"resource": "inventory"})
+        await websockets.unsubscribe(self.sids["eio-b"], {"resource": "inventory"})
+        self.assertNotIn(self.sids["eio-b"], websockets.connected_clients["inventory"])
+        await websockets.notify_clients("inventory", "update", {"id": 1})
+        self.assertEqual(self.updates_for("inventory_updated"), ["eio-a"])
+        self.assertEqual(self.updates_for("unsubscription_success"), ["eio-b"])
+
+    async def test_invalid_resource(self):
+        """Unknown resources are rejected."""
+        await websockets.subscribe(self.sids["eio-c"], {"resource": "bogus"})
+        self.assertEqual(self.updates_for("subscription_error"), ["eio-c"])
+
+
+class TestEventReplay(unittest.IsolatedAsyncioTestCase):
+    """Reconnecting clients get the events they missed, or are told to resync."""
+
+    async def asyncSetUp(self):
+        self.sent = []
+
+        async def capture(eio_sid, eio_pkt):
+            self.sent.append((eio_sid, eio_pkt.data))
+
+        patchers = [
+            patch.object(websockets.sio, '_send_eio_packet', capture),
+            patch.object(websockets, 'event_log', websockets.EventLog(size=3)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.sid = await websockets.sio.manager.connect("eio-r", "/")
+
+    async def asyncTearDown(self):
+        await websockets.sio.manager.disconnect(self.sid, "/")
+        await websockets.disconnect(self.sid)
+
+    def events(self, event):
+        return [data for _, data in self.sent if isinstance(data, str) and f'"{event}"' in data]
+
+    async def test_sequence_numbers(self):
+        """Events carry increasing per-resource sequence numbers."""
+        await websockets.notify_clients("inventory", "update", {"id": 1})
+        await websockets.notify_clients("inventory", "update", {"id": 2})
+        await websockets.notify_clients("locations", "update", {"id": 1})
+        self.assertEqual(websockets.event_log.current("inventory"), 2)
+        self.assertEqual(websockets.event_log.current("locations"), 1)
+
+    async def test_resume_replays_gap(self):
+        """Only the events after last_seq are replayed."""
+        for item_id in range(3):
+            await websockets.notify_clients("inventory", "update", {"id": item_id})
+        stream = websockets.event_log.stream
+        await websockets.resume(self.sid, {"resource": "inventory", "last_seq": 1, "stream": stream})
+        replayed = self.events("inventory_updated")
+        self.assertEqual(len(replayed), 2)
+        self.assertIn('"seq":2', replayed[0].replace(" ", ""))
+        self.assertEqual(len(self.events("resume_success")), 1)
+        self.assertIn(self.sid, websockets.connected_clients["inventory"])
+
+    async def test_resume_after_gap_aged_out(self):
+        """A gap older than the buffer, or another stream, requires a full resync."""
+        for item_id in range(5):
+            await websockets.notify_clients("inventory", "update", {"id": item_id})
+        stream = websockets.event_log.stream
+        await websockets.resume(self.sid, {"resource": "inventory", "last_seq": 1, "stream": stream})
+        await websockets.resume(self.sid, {"resource": "inventory", "last_seq": 4, "stream": "other"})
+        self.assertEqual(len(self.events("resync_required")), 2)
+        self.assertEqual(self.events("inventory_updated"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()